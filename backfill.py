@@ -0,0 +1,117 @@
+from src.storage import connection, init_db, existing_dates, bulk_insert, close_connections
+from src.analytics import rebuild as rebuild_analytics
+from src.fetch import get_price_history
+from src.parallel import run_sources
+from src.config import ticker, BACKFILL_DEADLINE
+from datetime import date, timedelta
+import argparse
+import csv
+import logging
+import time
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def missing_weekdays(start, end, present):
+    """
+    Lists the weekdays in [start, end] that have no stored row, oldest first.
+    """
+    day, last = date.fromisoformat(start), date.fromisoformat(end)
+    missing = []
+    while day <= last:
+        if day.weekday() < 5 and day.isoformat() not in present:
+            missing.append(day.isoformat())
+        day += timedelta(days=1)
+    return missing
+
+def year_windows(days):
+    """
+    Groups missing days into one (start, end) window per calendar year, so each
+    window costs a single history request.
+    """
+    windows = {}
+    for day in days:
+        first, last = windows.get(day[:4], (day, day))
+        windows[day[:4]] = (min(first, day), max(last, day))
+    return list(windows.values())
+
+def load_rates_csv(path):
+    """
+    Reads archived mortgage rates from a CSV with `date` and `rate` columns.
+    """
+    with open(path, newline="") as f:
+        return {row["date"][:10]: float(row["rate"]) for row in csv.DictReader(f)}
+
+def backfill(start, end, rates=None):
+    """
+    Fills missing days in the rates table with historical closing prices.
+
+    Only days without a stored row are fetched and written, so re-running over
+    the same range is safe. Days stored without a mortgage rate count as missing
+    when `rates` has one for them; their backfill row is upserted with the rate.
+    Returns the number of rows inserted.
+    """
+    rates = rates or {}
+    with connection() as conn:
+        init_db(conn)
+        present = existing_dates(conn, start, end)
+        rated = existing_dates(conn, start, end, with_rate=True)
+    present -= {day for day in present - rated if day in rates}
+    missing = missing_weekdays(start, end, present)
+    if not missing:
+        logger.info(f"No missing days between {start} and {end}")
+        return 0
+
+    # Fetch each year window in parallel
+    windows = year_windows(missing)
+    logger.info(f"Backfilling {len(missing)} missing days in {len(windows)} windows")
+    results, errors, timings = run_sources(
+        {
+            f"{first}..{last}": (lambda first=first, last=last: get_price_history(ticker, first, last))
+            for first, last in windows
+        },
+        timeouts={},
+        deadline=BACKFILL_DEADLINE,
+    )
+    for name, e in errors.items():
+        logger.error(f"Failed to fetch {ticker} history for {name}: {e}")
+
+    prices = {}
+    for history in results.values():
+        prices.update(history)
+    rows = [
+        (f"{day} 00:00:00", rates.get(day), prices[day])
+        for day in missing if day in prices
+    ]
+
+    start_time = time.monotonic()
+    with connection() as conn:
+        inserted = bulk_insert(conn, rows, source="backfill")
+    elapsed = time.monotonic() - start_time
+    rate = inserted / elapsed if elapsed > 0 else float("inf")
+    logger.info(f"Inserted {inserted} rows in {elapsed:.3f}s ({rate:,.0f} rows/s)")
+
+    # Backfilled days are older than the incrementally maintained analytics
+    if inserted:
+        with connection() as conn:
+            rebuild_analytics(conn)
+    return inserted
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill missing days of historical data.")
+    parser.add_argument("--start", required=True, help="First day to fill, YYYY-MM-DD")
+    parser.add_argument("--end", default=date.today().isoformat(), help="Last day to fill, YYYY-MM-DD")
+    parser.add_argument("--rates-csv", help="Archived mortgage rates (date,rate) to merge in")
+    args = parser.parse_args(argv)
+
+    rates = load_rates_csv(args.rates_csv) if args.rates_csv else None
+    try:
+        backfill(args.start, args.end, rates)
+    finally:
+        close_connections()
+
+if __name__ == "__main__":
+    main()
+
+# Created with AI assistance
@@ -0,0 +1,307 @@
+"""
+End-to-end benchmarks that replay the recorded MND page, Freddie Mac PMMS CSV
+and Yahoo chart payload from a local stub upstream: parse time, job latency, insert throughput (SQLite,
+plus PostgreSQL when POSTGRES_* is configured) and peak memory.
+
+Results are compared against a machine-readable baseline file and the run fails
+when a metric is worse than the baseline by more than the tolerance.
+
+Usage: python -m benchmarks.bench_e2e [--iterations N] [--rows N]
+                                      [--baseline PATH] [--write-baseline]
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from urllib.parse import unquote, urlsplit
+
+import src.fetch as fetch
+import src.migrations as migrations
+import src.quotes as quotes
+import src.rates as rates
+import src.retry as retry
+import src.spool as spool
+import src.storage as storage
+import tasks
+from benchmarks.bench_extract import measure
+from tests.stub_server import StubServer
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "..", "tests", "fixtures")
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baseline.json")
+# A metric more than this factor worse than its baseline counts as a regression
+TOLERANCE = 1.5
+
+def _read_fixture(name, mode="r"):
+    with open(os.path.join(FIXTURE_DIR, name), mode) as f:
+        return f.read()
+
+class StubUpstream(StubServer):
+    """
+    Serves the recorded MND page at /mnd, the PMMS CSV at /pmms and the recorded
+    chart payload at /chart/<symbol> over keep-alive connections. The two pages
+    carry an ETag and answer a matching If-None-Match with 304.
+    """
+    def __init__(self):
+        self.page = _read_fixture("mnd_rates.html", "rb")
+        self.pmms = _read_fixture("pmms_history.csv", "rb")
+        self.chart = json.loads(_read_fixture("yahoo_chart_mbb.json"))
+        super().__init__(keep_alive=True)
+
+    def respond(self, request):
+        path = urlsplit(request.path).path
+        etag = None
+        if path == "/mnd":
+            body, content_type, etag = self.page, "text/html; charset=utf-8", '"mnd-1"'
+        elif path == "/pmms":
+            body, content_type, etag = self.pmms, "text/csv", '"pmms-1"'
+        else:
+            self.chart["chart"]["result"][0]["meta"]["symbol"] = unquote(path.rsplit("/", 1)[-1])
+            body, content_type = json.dumps(self.chart).encode(), "application/json"
+        if etag is not None and request.headers.get("If-None-Match") == etag:
+            return 304, {"ETag": etag}, b""
+        headers = {"Content-Type": content_type}
+        if etag is not None:
+            headers["ETag"] = etag
+        return 200, headers, body
+
+@contextmanager
+def _peak_memory():
+    """
+    Yields a dict whose "kib" key holds the traced allocation peak on exit.
+    """
+    result = {}
+    tracemalloc.start()
+    try:
+        yield result
+    finally:
+        result["kib"] = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+
+def _cold_parse(html):
+    fetch._last_table = None
+    return fetch.parse_rate_table(html)
+
+def bench_parse(iterations):
+    """
+    Mean time and peak memory of parsing the recorded page, and mean time of
+    parsing it again unchanged, which only hashes the table fragments.
+    """
+    html = _read_fixture("mnd_rates.html")
+    mean_s, peak = measure(_cold_parse, html, iterations)
+    unchanged_s, _ = measure(fetch.parse_rate_table, html, iterations)
+    return {
+        "parse_ms": mean_s * 1000,
+        "parse_peak_kib": peak / 1024,
+        "parse_unchanged_ms": unchanged_s * 1000,
+    }
+
+def bench_job(iterations):
+    """
+    Wall-clock latency of the whole job against the stub upstream, spooling to a
+    temporary file; call inside _bench_tables, which receives the job_runs rows.
+    """
+    upstream = StubUpstream()
+    tmpdir = tempfile.TemporaryDirectory()
+    saved = (dict(rates.PROVIDERS), quotes.PROVIDERS["chart"], spool._spool, tasks._last_stored,
+             fetch.HTTP_CACHE_DIR, tasks.FETCH_LOCK_FILE)
+    # Same parsers and TTLs as the real providers, pointed at the stub
+    for name, path in (("mnd", "/mnd"), ("freddiemac", "/pmms")):
+        provider = saved[0][name]
+        rates.PROVIDERS[name] = rates.RateProvider(
+            name, f"{upstream.url}{path}", provider.parse, provider.ttl
+        )
+    quotes.PROVIDERS["chart"] = quotes.ChartProvider(base_url=f"{upstream.url}/chart/")
+    spool._spool = spool.Spool(os.path.join(tmpdir.name, "spool.ndjson"))
+    fetch.HTTP_CACHE_DIR = os.path.join(tmpdir.name, "http_cache")
+    tasks.FETCH_LOCK_FILE = os.path.join(tmpdir.name, "fetch.lock")
+    tasks._last_stored = None
+    retry.reset_breakers()
+    try:
+        if not tasks.fetch_and_store_data():
+            raise RuntimeError("Benchmark job did not store a complete row")
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            tasks.fetch_and_store_data()
+            timings.append(time.perf_counter() - start)
+        with _peak_memory() as peak:
+            tasks.fetch_and_store_data()
+    finally:
+        (providers, quotes.PROVIDERS["chart"], spool._spool, tasks._last_stored,
+         fetch.HTTP_CACHE_DIR, tasks.FETCH_LOCK_FILE) = saved
+        rates.PROVIDERS.update(providers)
+        upstream.close()
+        tmpdir.cleanup()
+
+    timings.sort()
+    return {
+        "job_p50_ms": statistics.median(timings) * 1000,
+        "job_p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000,
+        "job_peak_kib": peak["kib"],
+    }
+
+@contextmanager
+def _bench_tables(postgres, sqlite_file=None):
+    """
+    Points storage at throwaway tables (and, for SQLite, a throwaway file).
+    """
+    saved = (storage.USE_POSTGRES, storage.SQLITE_FILE, storage.TABLE_NAME,
+             storage.QUOTES_TABLE, storage.JOB_RUNS_TABLE, storage.PROVIDER_RATES_TABLE,
+             migrations.SCHEMA_TABLE)
+    storage.close_connections()
+    storage.USE_POSTGRES = postgres
+    storage.TABLE_NAME, storage.QUOTES_TABLE = "bench_rates", "bench_quotes"
+    storage.JOB_RUNS_TABLE = "bench_job_runs"
+    storage.PROVIDER_RATES_TABLE = "bench_provider_rates"
+    migrations.SCHEMA_TABLE = "bench_schema_version"
+    if sqlite_file:
+        storage.SQLITE_FILE = sqlite_file
+    try:
+        with storage.connection() as conn:
+            storage.init_db(conn)
+        yield
+    finally:
+        if postgres:
+            with storage.connection() as conn:
+                for table in ("bench_rates", "bench_quotes", "bench_job_runs",
+                              "bench_provider_rates", "bench_schema_version"):
+                    conn.execute(f"DROP TABLE IF EXISTS {table}")
+                conn.commit()
+        storage.close_connections()
+        (storage.USE_POSTGRES, storage.SQLITE_FILE, storage.TABLE_NAME,
+         storage.QUOTES_TABLE, storage.JOB_RUNS_TABLE, storage.PROVIDER_RATES_TABLE,
+         migrations.SCHEMA_TABLE) = saved
+
+def _rows(count, offset):
+    start = datetime(2000, 1, 3, 6, 40) + timedelta(minutes=offset)
+    return [
+        ((start + timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S"),
+         6.0 + (i % 100) / 100, 95.0 + (i % 50) / 10)
+        for i in range(count)
+    ]
+
+def _throughput(write, rows):
+    start = time.perf_counter()
+    with storage.connection() as conn:
+        write(conn, rows)
+    return len(rows) / (time.perf_counter() - start)
+
+def bench_inserts(engine, rows):
+    """
+    Rows per second for bulk_insert, spool-style write_batch and per-row update_table.
+    """
+    single = max(1, rows // 20)
+
+    def per_row(conn, batch):
+        for timestamp, rate, price in batch:
+            storage.update_table(conn, timestamp, rate, price)
+
+    def batch_write(conn, batch):
+        storage.write_batch(
+            conn,
+            [(timestamp, rate, price, "bench") for timestamp, rate, price in batch],
+            [(timestamp, "MBB", price) for timestamp, _, price in batch],
+        )
+
+    results = {
+        f"{engine}_bulk_rows_per_s":
+            _throughput(lambda conn, b: storage.bulk_insert(conn, b, source="bench"), _rows(rows, 0)),
+        f"{engine}_batch_rows_per_s": _throughput(batch_write, _rows(rows, rows)),
+        f"{engine}_row_rows_per_s": _throughput(per_row, _rows(single, 2 * rows)),
+    }
+    with _peak_memory() as peak:
+        with storage.connection() as conn:
+            storage.bulk_insert(conn, _rows(rows, 3 * rows), source="bench")
+    results[f"{engine}_bulk_peak_kib"] = peak["kib"]
+    return results
+
+def run(iterations=50, rows=20000):
+    """
+    Runs every benchmark and returns {metric: value}.
+    """
+    results = {}
+    # The job and migrations log every step; keep only real problems
+    logging.disable(logging.INFO)
+    try:
+        results.update(bench_parse(iterations * 5))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with _bench_tables(False, os.path.join(tmpdir, "bench.sqlite3")):
+                results.update(bench_job(iterations))
+                results.update(bench_inserts("sqlite", rows))
+        if storage.USE_POSTGRES:
+            with _bench_tables(True):
+                results.update(bench_inserts("postgres", rows))
+    finally:
+        logging.disable(logging.NOTSET)
+    return results
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """
+    Returns (metric, baseline, current) for every metric worse than tolerance allows.
+
+    Throughput metrics (*_per_s) regress downwards, all others upwards.
+    """
+    regressions = []
+    for metric, expected in baseline.items():
+        current = results.get(metric)
+        if current is None or not expected:
+            continue
+        if metric.endswith("_per_s"):
+            worse = current * tolerance < expected
+        else:
+            worse = current > expected * tolerance
+        if worse:
+            regressions.append((metric, expected, current))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=50, help="job runs to time")
+    parser.add_argument("--rows", type=int, default=20000, help="rows per insert benchmark")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline JSON file")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--write-baseline", action="store_true",
+                        help="store these results as the new baseline")
+    args = parser.parse_args()
+
+    results = run(args.iterations, args.rows)
+    for metric, value in results.items():
+        print(f"{metric:<32}{value:>14.3f}")
+
+    if args.write_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "iterations": args.iterations,
+                "rows": args.rows,
+                "results": results,
+            }, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --write-baseline first")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, args.tolerance)
+    for metric, expected, current in regressions:
+        print(f"REGRESSION {metric}: {current:.3f} vs baseline {expected:.3f}")
+    if regressions:
+        sys.exit(1)
+    print(f"No regressions beyond {args.tolerance}x of {args.baseline}")
+
+if __name__ == "__main__":
+    main()
+
+# Created with AI assistance
@@ -0,0 +1,91 @@
+"""
+Compares the streaming rate-table parser against the original BeautifulSoup
+extractor on the saved HTML fixtures.
+
+Usage: python -m benchmarks.bench_extract [iterations]
+"""
+import glob
+import os
+import sys
+import time
+import tracemalloc
+from bs4 import BeautifulSoup
+import src.fetch as fetch
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "..", "tests", "fixtures")
+
+def legacy_extract_30yr_rate(html):
+    """
+    The original full-tree BeautifulSoup extractor, kept as the baseline.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    for row in soup.find_all("tr"):
+        header = row.find("th")
+        if header and "30 Yr. Fixed" in header.get_text():
+            rate_cell = row.find("td")
+            if rate_cell:
+                raw_rate = rate_cell.get_text(strip=True)
+                try:
+                    return float(raw_rate.replace("%", ""))
+                except ValueError:
+                    return raw_rate
+    return None
+
+def measure(func, html, iterations):
+    """
+    Returns (mean seconds per call, peak bytes allocated during one call).
+    """
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(html)
+    mean_s = (time.perf_counter() - start) / iterations
+
+    tracemalloc.start()
+    func(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return mean_s, peak
+
+def cold_parse_rate_table(html):
+    """
+    parse_rate_table without the reuse of an unchanged previous result.
+    """
+    fetch._last_table = None
+    return fetch.parse_rate_table(html)
+
+def compare(iterations=50):
+    """
+    Runs both extractors over every fixture and returns one result row per fixture.
+    """
+    results = []
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "mnd_*.html"))):
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        legacy_s, legacy_peak = measure(legacy_extract_30yr_rate, html, iterations)
+        new_s, new_peak = measure(cold_parse_rate_table, html, iterations)
+        results.append({
+            "fixture": os.path.basename(path),
+            "bytes": len(html),
+            "legacy_ms": legacy_s * 1000,
+            "legacy_peak_kib": legacy_peak / 1024,
+            "table_ms": new_s * 1000,
+            "table_peak_kib": new_peak / 1024,
+        })
+    return results
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    print(f"{'fixture':<24}{'bytes':>9}{'legacy ms':>12}{'legacy KiB':>12}"
+          f"{'table ms':>11}{'table KiB':>11}{'speedup':>9}")
+    for r in compare(iterations):
+        print(
+            f"{r['fixture']:<24}{r['bytes']:>9}"
+            f"{r['legacy_ms']:>12.3f}{r['legacy_peak_kib']:>12.1f}"
+            f"{r['table_ms']:>11.3f}{r['table_peak_kib']:>11.1f}"
+            f"{r['legacy_ms'] / r['table_ms']:>8.1f}x"
+        )
+
+if __name__ == "__main__":
+    main()
+
+# Created with AI assistance
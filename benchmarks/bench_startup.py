@@ -0,0 +1,82 @@
+"""
+Reports what importing the service costs before the scheduler starts: a
+`python -X importtime` breakdown, total import time and resident memory.
+
+Usage: python -m benchmarks.bench_startup [module] [top]
+"""
+import os
+import subprocess
+import sys
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), "..")
+
+# Only a running job may load these
+HEAVY_MODULES = ("yfinance", "pandas", "numpy", "bs4")
+
+# Regression limits checked by tests/test_startup.py
+STARTUP_BUDGET_MS = 1000
+IDLE_RSS_BUDGET_MIB = 96
+
+# Prints the resident set after the import; ru_maxrss would also count the memory of
+# the process that forked the probe, so it is only the fallback without /proc
+_PROBE = (
+    "import {module}, sys\n"
+    "try:\n"
+    "    with open('/proc/self/status') as f:\n"
+    "        print(next(line.split()[1] for line in f if line.startswith('VmRSS:')))\n"
+    "except OSError:\n"
+    "    import resource\n"
+    "    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)\n"
+    "print(' '.join(sorted(sys.modules)))\n"
+)
+
+def parse_importtime(stderr):
+    """
+    Parses `-X importtime` output into {module: (self_us, cumulative_us)}.
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header line
+        modules[fields[2].strip()] = (int(fields[0]), int(fields[1]))
+    return modules
+
+def import_report(module="main"):
+    """
+    Imports `module` in a fresh interpreter and returns its import cost:
+    {"total_ms", "rss_mib", "modules", "heavy"}.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE.format(module=module)],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+    )
+    rss_kib, loaded = result.stdout.splitlines()[-2:]
+    modules = parse_importtime(result.stderr)
+    loaded = set(loaded.split())
+    return {
+        "total_ms": modules[module][1] / 1000,
+        "rss_mib": int(rss_kib) / 1024,
+        "modules": modules,
+        "heavy": sorted(name for name in HEAVY_MODULES if name in loaded),
+    }
+
+def main():
+    module = sys.argv[1] if len(sys.argv) > 1 else "main"
+    top = int(sys.argv[2]) if len(sys.argv) > 2 else 15
+    report = import_report(module)
+    print(f"import {module}: {report['total_ms']:.1f} ms "
+          f"(budget {STARTUP_BUDGET_MS} ms), "
+          f"RSS {report['rss_mib']:.1f} MiB (budget {IDLE_RSS_BUDGET_MIB} MiB)")
+    print(f"heavy modules loaded: {', '.join(report['heavy']) or 'none'}")
+    print(f"{'module':<48}{'self ms':>10}{'cumul ms':>10}")
+    slowest = sorted(report["modules"].items(), key=lambda item: item[1][0], reverse=True)
+    for name, (self_us, cumulative_us) in slowest[:top]:
+        print(f"{name:<48}{self_us / 1000:>10.1f}{cumulative_us / 1000:>10.1f}")
+
+if __name__ == "__main__":
+    main()
+
+# Created with AI assistance
@@ -0,0 +1,201 @@
+from src.storage import connection, iter_rows, revision_marks, close_connections, ROW_COLUMNS
+from src.config import EXPORT_CHUNK_SIZE, EXPORT_STATE_FILE
+from datetime import datetime, timezone
+import argparse
+import csv
+import gzip
+import json
+import logging
+import os
+import time
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TS_INDEX = ROW_COLUMNS.index("ts")
+
+def _epoch(ts):
+    """
+    Converts a stored ts (epoch seconds on SQLite, aware datetime on Postgres) to epoch seconds.
+    """
+    return int(ts.timestamp()) if isinstance(ts, datetime) else ts
+
+def _iso(ts):
+    if ts is None:
+        return None
+    return datetime.fromtimestamp(_epoch(ts), timezone.utc).isoformat()
+
+def _open_text(path, compression):
+    if compression == "gzip":
+        return gzip.open(path, "wt", newline="", encoding="utf-8")
+    if compression is not None:
+        raise ValueError(f"{compression} compression is not supported for text formats")
+    return open(path, "w", newline="", encoding="utf-8")
+
+class CsvWriter:
+    """
+    Writes chunks as CSV with a header row; ts is ISO-8601 UTC.
+    """
+    def __init__(self, path, compression=None):
+        self._file = _open_text(path, compression)
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(ROW_COLUMNS)
+
+    def write(self, rows):
+        self._writer.writerows(
+            row[:TS_INDEX] + (_iso(row[TS_INDEX]),) + row[TS_INDEX + 1:] for row in rows
+        )
+
+    def close(self):
+        self._file.close()
+
+class NdjsonWriter:
+    """
+    Writes one JSON object per line; ts is ISO-8601 UTC.
+    """
+    def __init__(self, path, compression=None):
+        self._file = _open_text(path, compression)
+
+    def write(self, rows):
+        for row in rows:
+            record = dict(zip(ROW_COLUMNS, row))
+            record["ts"] = _iso(record["ts"])
+            self._file.write(json.dumps(record) + "\n")
+
+    def close(self):
+        self._file.close()
+
+class ParquetWriter:
+    """
+    Writes each chunk as a Parquet row group; needs the optional pyarrow package.
+    """
+    def __init__(self, path, compression=None):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+        self._pa = pa
+        self._schema = pa.schema([
+            ("id", pa.int64()),
+            ("timestamp", pa.string()),
+            ("ts", pa.timestamp("s", tz="UTC")),
+            ("source", pa.string()),
+            ("mortgage_rate", pa.float64()),
+            ("mbb_price", pa.float64()),
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema, compression=compression or "snappy")
+
+    def write(self, rows):
+        pa = self._pa
+        columns = list(zip(*rows))
+        columns[TS_INDEX] = [None if ts is None else _epoch(ts) for ts in columns[TS_INDEX]]
+        arrays = [
+            pa.array(values, type=pa.int64()).cast(field.type) if name == "ts"
+            else pa.array(values, type=field.type)
+            for name, field, values in zip(ROW_COLUMNS, self._schema, columns)
+        ]
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+WRITERS = {"csv": CsvWriter, "ndjson": NdjsonWriter, "parquet": ParquetWriter}
+
+def load_state(path):
+    """
+    Returns the previous incremental export's state: the epoch seconds of the
+    newest row exported ("last_ts") and the table's (id, revision) marks at the
+    time ("last_id", "last_revision"). Empty before the first export.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_state(path, state):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+def export(fmt, output, start=None, end=None, incremental=False, compression=None,
+           chunk_size=EXPORT_CHUNK_SIZE, state_file=EXPORT_STATE_FILE):
+    """
+    Streams the rates table to `output` one chunk at a time and returns the row count.
+
+    The file is written under a temporary name and renamed once complete. In
+    incremental mode only rows added or rewritten since the last export are
+    written, including rows stored with an older ts than ones already exported,
+    and the state file is advanced after the file is in place. A rewritten row
+    is exported again with its id, so readers keep the newest copy per id.
+    """
+    after = after_marks = upto_marks = None
+    if incremental:
+        state = load_state(state_file)
+        if "last_id" in state:
+            after_marks = (state["last_id"], state["last_revision"])
+        elif state.get("last_ts") is not None:
+            # State written before exports tracked ids
+            after = datetime.fromtimestamp(state["last_ts"], timezone.utc)
+        with connection() as conn:
+            upto_marks = revision_marks(conn)
+
+    tmp_output = f"{output}.tmp"
+    writer = WRITERS[fmt](tmp_output, compression)
+    count, newest = 0, None
+    start_time = time.monotonic()
+    try:
+        with connection() as conn:
+            for rows in iter_rows(conn, start, end, after, chunk_size, after_marks, upto_marks):
+                writer.write(rows)
+                count += len(rows)
+                newest = rows[-1][TS_INDEX]
+    except BaseException:
+        writer.close()
+        os.remove(tmp_output)
+        raise
+    writer.close()
+
+    if incremental and count == 0:
+        os.remove(tmp_output)
+        logger.info("No new rows since the last export")
+        return 0
+    os.replace(tmp_output, output)
+    if incremental:
+        last_ts = max(_epoch(newest), state.get("last_ts") or _epoch(newest))
+        save_state(state_file, {
+            "last_ts": last_ts, "last_id": upto_marks[0], "last_revision": upto_marks[1],
+        })
+
+    elapsed = time.monotonic() - start_time
+    logger.info(f"Exported {count} rows to {output} in {elapsed:.3f}s")
+    return count
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream the rates table to a file.")
+    parser.add_argument("output", help="Destination file")
+    parser.add_argument("--format", choices=sorted(WRITERS), default="csv")
+    parser.add_argument("--start", help="Only rows at or after this date/time")
+    parser.add_argument("--end", help="Only rows before this date/time")
+    parser.add_argument("--compression",
+                        help="gzip for csv/ndjson; snappy (default), zstd or gzip for parquet")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only export rows newer than the previous incremental export")
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+    parser.add_argument("--state-file", default=EXPORT_STATE_FILE)
+    args = parser.parse_args(argv)
+
+    try:
+        export(
+            args.format, args.output, args.start, args.end, args.incremental,
+            args.compression, args.chunk_size, args.state_file
+        )
+    finally:
+        close_connections()
+
+if __name__ == "__main__":
+    main()
+
+# Created with AI assistance
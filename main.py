@@ -1,18 +1,71 @@
 from scheduler import create_scheduler
 from tasks import initialize_db
+from src.fetch import close_session
+from src.storage import close_connections
+from src.spool import start_flusher, stop_flusher
+from src.leader import LeaderLock
+from src.config import API_HOST, API_PORT
+import asyncio
 import logging
+import signal
+import sys
 
 logger = logging.getLogger(__name__)
 
+def handle_sigterm(signum, frame):
+    """
+    Turn `docker stop` (SIGTERM) into SystemExit so shutdown runs cleanly.
+    """
+    sys.exit(0)
+
+async def run_scheduler(scheduler, lock):
+    """
+    Start the scheduler on the running event loop and wait until cancelled.
+
+    Jobs only run while this replica holds the leader lock: the scheduler starts
+    paused and is resumed once the lock is won, or paused again when it is lost,
+    so replicas sharing a database never run the same job twice.
+    """
+    scheduler.start(paused=True)
+    leading = False
+    try:
+        while True:
+            now_leading = await asyncio.to_thread(lock.check)
+            if now_leading and not leading:
+                logger.info("Leader lock acquired -- running scheduled jobs")
+                scheduler.resume()
+            elif leading and not now_leading:
+                logger.warning("Leader lock lost -- pausing scheduled jobs")
+                scheduler.pause()
+            elif not leading:
+                logger.debug("Standing by -- another replica holds the leader lock")
+            leading = now_leading
+            await asyncio.sleep(lock.retry)
+    finally:
+        scheduler.shutdown()
+        lock.close()
+
 def main():
     logger.info("Container startup -- initializing DB and scheduler")
+    signal.signal(signal.SIGTERM, handle_sigterm)
     initialize_db()
+    start_flusher()
     scheduler = create_scheduler()
+    api_server = None
+    if API_PORT:
+        from src.api import start_server
+        api_server = start_server(API_HOST, API_PORT)
     try:
-        scheduler.start()
+        asyncio.run(run_scheduler(scheduler, LeaderLock()))
     except (KeyboardInterrupt, SystemExit):
-        logger.info("Shutdown signal received -- stopping scheduler")
-        scheduler.shutdown()
+        logger.info("Shutdown signal received -- scheduler stopped")
+    finally:
+        if api_server is not None:
+            api_server.shutdown()
+            api_server.server_close()
+        close_session()
+        stop_flusher()
+        close_connections()
 
 if __name__ == "__main__":
     main()
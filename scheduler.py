@@ -1,6 +1,20 @@
-from apscheduler.schedulers.blocking import BlockingScheduler
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.jobstores.base import JobLookupError
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR
 from tasks import fetch_and_store_data
+from src.archive import roll as roll_archive
+from src.jobstore import DatabaseJobStore
+from src.workers import IsolatedExecutor
+from src.config import (
+    FOLLOW_UP_ATTEMPTS, FOLLOW_UP_DELAY, POLL_INTERVAL, POLL_WINDOWS,
+    MISFIRE_GRACE_TIME, COALESCE, SCHEDULER_WORKERS, ARCHIVE_KEEP_MONTHS,
+    JOB_ISOLATION, WORKER_PROCESSES, WORKER_MAX_TASKS, SCHEDULE_TIMEZONE, DAILY_HOUR, DAILY_MINUTE
+)
+from datetime import datetime, time, timedelta, timezone
 import pytz
 import logging
 
@@ -8,33 +22,199 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def add_unique_job(scheduler, job_id, func, trigger, max_instances=1):
+FETCH_JOB_IDS = ("daily_fetch_and_store", "follow_up_fetch_and_store")
+POLL_JOB_ID = "poll_fetch_and_store"
+ARCHIVE_JOB_ID = "monthly_archive"
+SCHEDULE_TZ = pytz.timezone(SCHEDULE_TIMEZONE)
+POLL_ANCHOR = datetime(1970, 1, 1, tzinfo=timezone.utc)
+DAY_NAMES = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+def _parse_days(expr):
+    """
+    Turn a day expression such as "mon-fri" or "mon,wed,sat" into weekday numbers.
+    """
+    days = set()
+    for part in expr.lower().split(","):
+        first, _, last = part.strip().partition("-")
+        if first not in DAY_NAMES or (last and last not in DAY_NAMES):
+            raise ValueError(f"Unknown day in polling window: {part!r}")
+        start = DAY_NAMES.index(first)
+        end = DAY_NAMES.index(last) if last else start
+        days.update(day % 7 for day in range(start, end + 1 if end >= start else end + 8))
+    return frozenset(days)
+
+def parse_windows(spec):
+    """
+    Parse POLL_WINDOWS ("mon-fri 06:30-13:00; sat 08:00-10:00") into
+    (weekdays, start, end) tuples.
+    """
+    windows = []
+    for part in spec.split(";"):
+        if not part.strip():
+            continue
+        try:
+            days, hours = part.split()
+            start, end = (time.fromisoformat(value) for value in hours.split("-"))
+        except ValueError:
+            raise ValueError(f"Polling window must look like 'mon-fri 06:30-13:00': {part!r}")
+        windows.append((_parse_days(days), start, end))
+    return windows
+
+def in_windows(moment, windows):
+    """
+    True when `moment` falls inside any window (both ends included).
+    """
+    clock = moment.time()
+    return any(
+        moment.weekday() in days and start <= clock <= end
+        for days, start, end in windows
+    )
+
+def poll_fetch_and_store():
+    """
+    Intraday run: fetch inside a polling window, storing only values that moved.
+    """
+    if not in_windows(datetime.now(SCHEDULE_TZ), parse_windows(POLL_WINDOWS)):
+        return None
+    return fetch_and_store_data(only_changes=True)
+
+def add_unique_job(scheduler, job_id, func, trigger, max_instances=1, **options):
     """
     Add a job to the scheduler, ensuring no duplicate jobs with the same ID exist.
+
+    Extra options (e.g. next_run_time, replace_existing) are passed to add_job.
     """
     existing_job = scheduler.get_job(job_id)
     if existing_job:
         logger.info(f"Removing existing job -- {job_id}")
         scheduler.remove_job(job_id)
-    scheduler.add_job(func, trigger, id=job_id, max_instances=max_instances)
+    scheduler.add_job(func, trigger, id=job_id, max_instances=max_instances, **options)
+
+def restore_options(store, job_id):
+    """
+    add_job options that re-register a stored job without losing its schedule.
+
+    The stored next run time is kept, so a run that fell due while the process was
+    down is made up at startup (within the misfire grace time, coalesced).
+    """
+    options = {"replace_existing": True}
+    next_run_time = store.stored_next_run_time(job_id)
+    if next_run_time is not None:
+        options["next_run_time"] = next_run_time
+        logger.info(f"Restoring job {job_id} -- next run {next_run_time.isoformat()}")
+    return options
+
+def make_follow_up_listener(scheduler):
+    """
+    Build a job listener that re-runs a failed fetch after FOLLOW_UP_DELAY seconds,
+    up to FOLLOW_UP_ATTEMPTS times in a row, instead of waiting for the next day.
+    """
+    state = {"attempts": 0}
+
+    def listener(event):
+        if event.job_id not in FETCH_JOB_IDS:
+            return
+        if event.exception is None and event.retval is not False:
+            state["attempts"] = 0
+            return
+        if state["attempts"] >= FOLLOW_UP_ATTEMPTS:
+            logger.error(f"Giving up after {state['attempts']} follow-up runs")
+            state["attempts"] = 0
+            return
+        state["attempts"] += 1
+        run_date = datetime.now(scheduler.timezone) + timedelta(seconds=FOLLOW_UP_DELAY)
+        add_unique_job(
+            scheduler, FETCH_JOB_IDS[1], fetch_and_store_data,
+            DateTrigger(run_date=run_date), max_instances=1
+        )
+        logger.warning(
+            f"Fetch incomplete -- follow-up run {state['attempts']} of "
+            f"{FOLLOW_UP_ATTEMPTS} at {run_date:%H:%M:%S}"
+        )
+
+    return listener
+
+def create_executor():
+    """
+    The executor for JOB_ISOLATION: scheduler threads, or worker processes behind them.
+    """
+    if JOB_ISOLATION == "thread":
+        return ThreadPoolExecutor(SCHEDULER_WORKERS)
+    if JOB_ISOLATION == "process":
+        logger.info(
+            f"Running jobs in {WORKER_PROCESSES} worker processes, "
+            f"{WORKER_MAX_TASKS or 'unlimited'} jobs per worker"
+        )
+        return IsolatedExecutor(SCHEDULER_WORKERS, WORKER_MAX_TASKS, WORKER_PROCESSES)
+    raise ValueError(f"JOB_ISOLATION must be 'thread' or 'process': {JOB_ISOLATION!r}")
 
 def create_scheduler():
     """
     Create and configure the scheduler with the required jobs.
+
+    Jobs live in the application database and run on a thread pool (or in worker
+    processes, see JOB_ISOLATION) driven by an asyncio loop, so one slow job does not
+    hold up the others.
     """
     # Set timezone and schedule
-    tz = pytz.timezone("America/Los_Angeles")
-    hour, minute = 6,40
-    sched = BlockingScheduler(timezone=tz)
+    tz = SCHEDULE_TZ
+    hour, minute = DAILY_HOUR, DAILY_MINUTE
+    store = DatabaseJobStore()
+    sched = AsyncIOScheduler(
+        timezone=tz,
+        jobstores={"default": store},
+        executors={"default": create_executor()},
+        job_defaults={"misfire_grace_time": MISFIRE_GRACE_TIME, "coalesce": COALESCE},
+    )
 
     # Run daily at the scheduled time:
     daily_trigger = CronTrigger(hour=hour, minute=minute, timezone=tz)
-    add_unique_job(sched, "daily_fetch_and_store", fetch_and_store_data, daily_trigger, max_instances=1)
+    add_unique_job(
+        sched, "daily_fetch_and_store", fetch_and_store_data, daily_trigger, max_instances=1,
+        **restore_options(store, "daily_fetch_and_store")
+    )
     logger.info(
         f"Scheduled daily data fetch and store at "
         f"{hour:02d}:{minute:02d} {tz.zone}"
     )
 
+    # Poll during market hours as well, writing only when a value moves
+    if POLL_INTERVAL > 0:
+        parse_windows(POLL_WINDOWS)
+        add_unique_job(
+            sched, POLL_JOB_ID, poll_fetch_and_store,
+            # Anchored at the epoch, so polls fire on the slots their samples are stored under
+            IntervalTrigger(minutes=POLL_INTERVAL, start_date=POLL_ANCHOR, timezone=tz),
+            max_instances=1,
+            **restore_options(store, POLL_JOB_ID)
+        )
+        logger.info(f"Scheduled polling every {POLL_INTERVAL} min during {POLL_WINDOWS} {tz.zone}")
+    else:
+        # Polling was switched off; drop the job a previous run stored
+        try:
+            store.remove_job(POLL_JOB_ID)
+            logger.info(f"Removed stored job -- {POLL_JOB_ID}")
+        except JobLookupError:
+            pass
+
+    # Roll closed months into the columnar archive early on the first of each month
+    if ARCHIVE_KEEP_MONTHS > 0:
+        add_unique_job(
+            sched, ARCHIVE_JOB_ID, roll_archive,
+            CronTrigger(day=1, hour=2, minute=15, timezone=tz), max_instances=1,
+            **restore_options(store, ARCHIVE_JOB_ID)
+        )
+        logger.info(f"Scheduled monthly archiving, keeping {ARCHIVE_KEEP_MONTHS} months live")
+    else:
+        try:
+            store.remove_job(ARCHIVE_JOB_ID)
+            logger.info(f"Removed stored job -- {ARCHIVE_JOB_ID}")
+        except JobLookupError:
+            pass
+
+    # Re-run soon after a failed fetch
+    sched.add_listener(make_follow_up_listener(sched), EVENT_JOB_EXECUTED | EVENT_JOB_ERROR)
+
     return sched
 
 # Created with AI assistance
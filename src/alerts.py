@@ -0,0 +1,294 @@
+import logging
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import src.storage as storage
+from src.analytics import RollingWindow
+from src.fetch import post_json
+from src.config import ALERT_RULES, ALERT_WEBHOOK_URL, ALERT_COOLDOWN
+
+logger = logging.getLogger(__name__)
+
+DAY = 86400
+# Series name for the mortgage rate; any other name is a quoted symbol such as MBB
+RATE_SERIES = "rate"
+# Extra history loaded at startup so a move rule has a sample from before its window
+WARMUP_MARGIN = 7 * DAY
+
+class Threshold:
+    """
+    Fires when the series goes below (or above) a level.
+    """
+    def __init__(self, spec, series, op, level):
+        self.spec, self.series, self.op, self.level = spec, series, op, level
+        self.days = 0
+        self.active = False
+
+    def update(self, when, value):
+        active = value < self.level if self.op == "below" else value > self.level
+        fired = active and not self.active
+        self.active = active
+        return f"{self.series} at {value:g} is {self.op} {self.level:g}" if fired else None
+
+class Move:
+    """
+    Fires when the series changed by at least `amount` (percent when `relative`)
+    against its value `days` ago; "rise" and "drop" only count one direction.
+    """
+    def __init__(self, spec, series, direction, amount, relative, days):
+        self.spec, self.series, self.direction = spec, series, direction
+        self.amount, self.relative, self.days = amount, relative, days
+        # Samples in the window plus the newest one before it, which is the reference
+        self.points = deque()
+        self.active = False
+
+    def update(self, when, value):
+        self.points.append((when, value))
+        cutoff = when - self.days * DAY
+        while len(self.points) > 1 and self.points[1][0] <= cutoff:
+            self.points.popleft()
+        since, reference = self.points[0]
+        if since > cutoff:
+            # Not `days` of history yet
+            return None
+        change = value - reference
+        if self.relative:
+            change = change / reference * 100 if reference else 0.0
+        if self.direction == "rise":
+            active = change >= self.amount
+        elif self.direction == "drop":
+            active = change <= -self.amount
+        else:
+            active = abs(change) >= self.amount
+        fired = active and not self.active
+        self.active = active
+        if not fired:
+            return None
+        unit = "%" if self.relative else ""
+        return f"{self.series} moved {change:+.2f}{unit} in {self.days}d to {value:g}"
+
+class Crossover:
+    """
+    Fires when the series crosses its `days`-day moving average.
+    """
+    def __init__(self, spec, series, days):
+        self.spec, self.series, self.days = spec, series, days
+        self.window = RollingWindow(days * DAY)
+        self.side = 0
+
+    def update(self, when, value):
+        self.window.add(when, value)
+        mean = self.window.mean()
+        side = (value > mean) - (value < mean)
+        if side == 0:
+            return None
+        previous, self.side = self.side, side
+        if previous == 0 or previous == side:
+            return None
+        direction = "above" if side > 0 else "below"
+        return f"{self.series} at {value:g} crossed {direction} its {self.days}d average {mean:.3f}"
+
+_RULE_RE = re.compile(
+    r"^(?P<series>\S+)\s+(?:"
+    r"(?P<op>below|above)\s+(?P<level>-?[\d.]+)"
+    r"|(?P<direction>move|rise|drop)\s+(?P<amount>[\d.]+)(?P<pct>%?)\s+(?P<move_days>\d+)d"
+    r"|cross\s+(?P<cross_days>\d+)d"
+    r")$",
+    re.IGNORECASE
+)
+
+def parse_rules(spec):
+    """
+    Parses ";"-separated rules such as "rate below 6; MBB rise 2% 5d; rate cross 30d".
+
+    Raises ValueError for a rule it cannot read.
+    """
+    rules = []
+    for part in spec.split(";"):
+        text = " ".join(part.split())
+        if not text:
+            continue
+        match = _RULE_RE.match(text)
+        if match is None:
+            raise ValueError(f"Unreadable alert rule: {text!r}")
+        series = match["series"]
+        if match["op"]:
+            rules.append(Threshold(text, series, match["op"].lower(), float(match["level"])))
+        elif match["direction"]:
+            rules.append(Move(
+                text, series, match["direction"].lower(), float(match["amount"]),
+                bool(match["pct"]), int(match["move_days"])
+            ))
+        else:
+            rules.append(Crossover(text, series, int(match["cross_days"])))
+    return rules
+
+def _epoch(value):
+    """
+    Epoch seconds of a stored timestamp: ISO text (naive is local wall-clock time),
+    a datetime or epoch seconds.
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=ZoneInfo(storage.LOCAL_TZ))
+        return value.timestamp()
+    return float(value)
+
+class AlertEngine:
+    """
+    Runs every rule over each new sample from rolling state, in O(1) amortized per
+    rule, and applies the cooldown. Rules fire on the sample that enters their
+    condition, so a condition that holds does not repeat its alert.
+    """
+    def __init__(self, rules, cooldown=ALERT_COOLDOWN):
+        self.rules = rules
+        self.cooldown = cooldown
+        # {rule spec: epoch seconds it last fired}
+        self.last_fired = {}
+        # Newest sample time fed to the rules
+        self.last_time = None
+
+    @property
+    def series(self):
+        return {rule.series for rule in self.rules}
+
+    def observe(self, when, values, notify=True):
+        """
+        Feeds one sample ({series: value}) to the rules and returns the alerts that
+        fired as dicts; with notify=False the rules only update their state.
+
+        The windows only move forward, so a sample older than the newest one seen
+        (a follow-up run stored under an earlier slot than a poll) is left out; it
+        is replayed in order the next time the engine is warmed.
+        """
+        if self.last_time is not None and when < self.last_time:
+            logger.info("Not checking alert rules against a sample older than the newest one")
+            return []
+        self.last_time = when
+        fired = []
+        for rule in self.rules:
+            value = values.get(rule.series)
+            if value is None:
+                continue
+            message = rule.update(when, value)
+            if message is None or not notify:
+                continue
+            last = self.last_fired.get(rule.spec)
+            if last is not None and when - last < self.cooldown:
+                logger.info(f"Alert {rule.spec!r} is cooling down: {message}")
+                continue
+            self.last_fired[rule.spec] = when
+            fired.append({
+                "rule": rule.spec, "series": rule.series, "value": value, "text": message,
+            })
+        return fired
+
+    def warm(self, conn, now):
+        """
+        Replays the stored samples the rules' windows cover, without alerting,
+        and restores each rule's last firing time from the alerts table.
+        """
+        since = now - max(rule.days for rule in self.rules) * DAY - WARMUP_MARGIN
+        ph = "%s" if storage.USE_POSTGRES else "?"
+        bound = storage.to_db_time(datetime.fromtimestamp(since, ZoneInfo(storage.LOCAL_TZ)))
+        cursor = conn.cursor()
+        samples = {}
+        if RATE_SERIES in self.series:
+            cursor.execute(
+                f"SELECT ts, mortgage_rate FROM {storage.TABLE_NAME} "
+                f"WHERE ts >= {ph} AND mortgage_rate IS NOT NULL ORDER BY ts, id",
+                (bound,)
+            )
+            for ts, rate in cursor.fetchall():
+                samples.setdefault(_epoch(ts), {})[RATE_SERIES] = rate
+        symbols = sorted(self.series - {RATE_SERIES})
+        if symbols:
+            cursor.execute(
+                f"SELECT ts, symbol, price FROM {storage.QUOTES_TABLE} "
+                f"WHERE ts >= {ph} AND symbol IN ({', '.join([ph] * len(symbols))}) "
+                f"ORDER BY ts, id",
+                (bound, *symbols)
+            )
+            for ts, symbol, price in cursor.fetchall():
+                samples.setdefault(_epoch(ts), {})[symbol] = price
+        for when in sorted(samples):
+            self.observe(when, samples[when], notify=False)
+
+        cursor.execute(f"SELECT rule, MAX(ts) FROM {storage.ALERTS_TABLE} GROUP BY rule")
+        for spec, ts in cursor.fetchall():
+            self.last_fired[spec] = _epoch(ts)
+        return len(samples)
+
+def send(alert, url=None):
+    """
+    POSTs one alert to the webhook; returns whether it was delivered.
+    """
+    url = url or ALERT_WEBHOOK_URL
+    if not url:
+        return False
+    try:
+        post_json(url, alert)
+    except Exception as e:
+        logger.warning(f"Failed to deliver alert {alert['rule']!r} to {url}: {e}")
+        return False
+    return True
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_engine():
+    """
+    Returns the engine for ALERT_RULES, warmed from the database on first use,
+    or None when no rules are configured.
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            rules = parse_rules(ALERT_RULES)
+            if not rules:
+                return None
+            engine = AlertEngine(rules)
+            try:
+                with storage.connection() as conn:
+                    count = engine.warm(conn, time.time())
+                logger.info(f"Loaded {len(rules)} alert rules, warmed with {count} stored samples")
+            except Exception as e:
+                logger.warning(f"Could not load alert history; rules start cold: {e}")
+            _engine = engine
+        return _engine
+
+def evaluate(timestamp, values):
+    """
+    Checks the rules against one stored sample ({series: value}) taken at
+    `timestamp`, then delivers and records every alert that fired.
+
+    Never raises: a broken rule, webhook or database must not fail the job.
+    """
+    try:
+        engine = get_engine()
+        if engine is None:
+            return []
+        fired = engine.observe(_epoch(timestamp), values)
+    except Exception as e:
+        logger.warning(f"Failed to evaluate alert rules: {e}")
+        return []
+    for alert in fired:
+        alert["timestamp"] = timestamp
+        alert["delivered"] = send(alert)
+        logger.warning(f"Alert {alert['rule']!r}: {alert['text']}")
+        try:
+            with storage.connection() as conn:
+                storage.record_alert(
+                    conn, timestamp, alert["rule"], alert["series"], alert["value"],
+                    alert["text"], alert["delivered"]
+                )
+        except Exception as e:
+            logger.warning(f"Failed to record alert {alert['rule']!r}: {e}")
+    return fired
+
+# Created with AI assistance
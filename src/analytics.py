@@ -0,0 +1,327 @@
+import argparse
+import logging
+import math
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+import src.storage as storage
+from src.config import SPREAD_SYMBOL, SPREAD_MAX_AGE, BULK_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Moving-average windows in days, and the window used for volatility and z-scores
+WINDOWS = (7, 30, 90)
+VOLATILITY_WINDOW = 30
+# Series tracked for every rates row: mortgage rate, MBB price, rate minus SPREAD_SYMBOL
+SERIES = ("rate", "mbb", "spread")
+DAY = 86400
+# Variance below this fraction of the squared mean is rounding error on a constant series
+EPSILON = 1e-9
+
+STATS = [f"ma{days}" for days in WINDOWS] + [f"vol{VOLATILITY_WINDOW}", f"z{VOLATILITY_WINDOW}"]
+METRIC_COLUMNS = [f"{series}_{stat}" for series in SERIES for stat in STATS]
+COLUMNS = (
+    ["rate_id", "timestamp", "ts", "mortgage_rate", "mbb_price", "spread"]
+    + METRIC_COLUMNS + ["rate_revision"]
+)
+
+class RollingWindow:
+    """
+    Mean and population standard deviation of the values seen in the last
+    `seconds`, kept up to date in amortized O(1) per point from running sums.
+    """
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.points = deque()
+        self.total = 0.0
+        self.squares = 0.0
+
+    def add(self, when, value):
+        """
+        Moves the window to `when`, adding `value` unless it is None.
+        """
+        if value is not None:
+            self.points.append((when, value))
+            self.total += value
+            self.squares += value * value
+        cutoff = when - self.seconds
+        while self.points and self.points[0][0] <= cutoff:
+            _, old = self.points.popleft()
+            self.total -= old
+            self.squares -= old * old
+        if not self.points:
+            # Start again from exact zeros rather than carrying rounding error
+            self.total = self.squares = 0.0
+
+    def mean(self):
+        return self.total / len(self.points) if self.points else None
+
+    def std(self):
+        if not self.points:
+            return None
+        mean = self.total / len(self.points)
+        variance = self.squares / len(self.points) - mean * mean
+        return math.sqrt(variance) if variance > (EPSILON * max(abs(mean), 1.0)) ** 2 else 0.0
+
+class RollingState:
+    """
+    Rolling windows over the newest analytics rows; turns each new rates row
+    into its analytics row without reading older history.
+    """
+    def __init__(self):
+        self.last_id = 0
+        self.last_revision = 0
+        self.last_time = None
+        self.windows = {
+            series: {days: RollingWindow(days * DAY) for days in WINDOWS} for series in SERIES
+        }
+
+    def push(self, rate_id, timestamp, ts, mortgage_rate, mbb_price, spread, revision=None):
+        """
+        Adds one point (in ts order) and returns its analytics row in COLUMNS order.
+        """
+        when = _epoch(ts)
+        self.last_id = max(self.last_id, rate_id)
+        self.last_revision = max(self.last_revision, revision or 0)
+        self.last_time = when
+        row = [rate_id, timestamp, ts, mortgage_rate, mbb_price, spread]
+        for series, value in zip(SERIES, (mortgage_rate, mbb_price, spread)):
+            windows = self.windows[series]
+            for window in windows.values():
+                window.add(when, value)
+            row += [windows[days].mean() for days in WINDOWS]
+            mean = windows[VOLATILITY_WINDOW].mean()
+            std = windows[VOLATILITY_WINDOW].std()
+            row += [std, (value - mean) / std if value is not None and std else None]
+        return row + [revision]
+
+# Process-wide state for incremental updates, reloaded when the target tables change
+_state = None
+_state_key = None
+_state_lock = threading.Lock()
+
+def _placeholder():
+    return "%s" if storage.USE_POSTGRES else "?"
+
+def _epoch(ts):
+    return ts.timestamp() if isinstance(ts, datetime) else float(ts)
+
+def _spread(mortgage_rate, quote):
+    return mortgage_rate - quote if mortgage_rate is not None and quote is not None else None
+
+def _rates_rows(conn, after_id=0, after_revision=None, since=None):
+    """
+    Returns (id, timestamp, ts, mortgage_rate, mbb_price, spread, revision) for
+    rates rows with id > after_id or, with `after_revision`, rewritten after it,
+    in ts order; with `since`, every row at or after that ts instead. The spread
+    uses the newest SPREAD_SYMBOL quote at or before the row, if it is at most
+    SPREAD_MAX_AGE seconds older.
+    """
+    ph = _placeholder()
+    # ts is TIMESTAMPTZ on Postgres and epoch seconds on SQLite
+    oldest = f"r.ts - {ph} * INTERVAL '1 second'" if storage.USE_POSTGRES else f"r.ts - {ph}"
+    if since is not None:
+        where, params = f"r.ts >= {ph}", [since]
+    elif after_revision is not None:
+        where, params = f"(r.id > {ph} OR r.revision > {ph})", [after_id, after_revision]
+    else:
+        where, params = f"r.id > {ph}", [after_id]
+    cursor = conn.cursor()
+    cursor.execute(
+        f"SELECT r.id, r.timestamp, r.ts, r.mortgage_rate, r.mbb_price, "
+        f"(SELECT q.price FROM {storage.QUOTES_TABLE} q "
+        f"WHERE q.symbol = {ph} AND q.ts <= r.ts AND q.ts >= {oldest} "
+        f"ORDER BY q.ts DESC, q.id DESC LIMIT 1), r.revision "
+        f"FROM {storage.TABLE_NAME} r WHERE {where} AND r.ts IS NOT NULL "
+        f"ORDER BY r.ts, r.id",
+        (SPREAD_SYMBOL, SPREAD_MAX_AGE, *params)
+    )
+    return [
+        (row_id, timestamp, ts, rate, price, _spread(rate, quote), revision)
+        for row_id, timestamp, ts, rate, price, quote, revision in cursor.fetchall()
+    ]
+
+def _insert(conn, rows):
+    ph = _placeholder()
+    sql = (
+        f"INSERT INTO {storage.ANALYTICS_TABLE} ({', '.join(COLUMNS)}) "
+        f"VALUES ({', '.join([ph] * len(COLUMNS))})"
+    )
+    cursor = conn.cursor()
+    for i in range(0, len(rows), BULK_BATCH_SIZE):
+        cursor.executemany(sql, rows[i:i + BULK_BATCH_SIZE])
+
+def _load_state(conn):
+    """
+    Rebuilds the rolling state from the analytics rows its widest window still covers.
+    """
+    state = RollingState()
+    cursor = conn.cursor()
+    cursor.execute(
+        f"SELECT MAX(rate_id), MAX(ts), COALESCE(MAX(rate_revision), 0) "
+        f"FROM {storage.ANALYTICS_TABLE}"
+    )
+    last_id, last_ts, last_revision = cursor.fetchone()
+    if last_id is None:
+        return state
+    span = max(WINDOWS) * DAY
+    since = last_ts - timedelta(seconds=span) if isinstance(last_ts, datetime) else last_ts - span
+    cursor.execute(
+        f"SELECT rate_id, timestamp, ts, mortgage_rate, mbb_price, spread, rate_revision "
+        f"FROM {storage.ANALYTICS_TABLE} WHERE ts > {_placeholder()} ORDER BY ts, rate_id",
+        (since,)
+    )
+    for row in cursor.fetchall():
+        state.push(*row)
+    state.last_id = last_id
+    state.last_revision = last_revision
+    return state
+
+def _state_target():
+    return (storage.USE_POSTGRES, storage.SQLITE_FILE, storage.TABLE_NAME, storage.ANALYTICS_TABLE)
+
+def update(conn):
+    """
+    Writes analytics rows for every rates row added or rewritten since the last
+    update and returns how many were written.
+
+    Only those rows are read; the moving windows come from in-process rolling
+    state, loaded once from the newest analytics rows. When one of them is older
+    than the newest analyzed row (a follow-up run stored after a poll, a backfill)
+    or was rewritten with other values, the analytics rows from its time on are
+    computed again, so the windows always see the rates table in ts order.
+    """
+    global _state, _state_key
+    with _state_lock:
+        try:
+            if _state is None or _state_key != _state_target():
+                _state, _state_key = _load_state(conn), _state_target()
+            state = _state
+            pending = _rates_rows(conn, state.last_id, state.last_revision)
+            since = min((
+                row[2] for row in pending
+                if (row[6] or 0) > state.last_revision
+                or (state.last_time is not None and _epoch(row[2]) < state.last_time)
+            ), key=_epoch, default=None)
+            if since is not None:
+                last_id, last_revision = state.last_id, state.last_revision
+                cursor = conn.cursor()
+                cursor.execute(
+                    f"DELETE FROM {storage.ANALYTICS_TABLE} WHERE ts >= {_placeholder()}",
+                    (since,)
+                )
+                state = _state = _load_state(conn)
+                pending = _rates_rows(conn, since=since)
+                state.last_id = max(state.last_id, last_id)
+                state.last_revision = max(state.last_revision, last_revision)
+            rows = [state.push(*row) for row in pending]
+            _insert(conn, rows)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            _state = None
+            raise
+    if since is not None:
+        logger.info(f"Recomputed analytics rows from {since} for older or rewritten rates rows")
+    return len(rows)
+
+def _rolling(times, values, np):
+    """
+    Vectorized counterpart of RollingState for one series: returns the moving
+    averages for WINDOWS followed by the volatility and z-score columns.
+    """
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+    sums = np.concatenate(([0.0], np.cumsum(filled)))
+    squares = np.concatenate(([0.0], np.cumsum(filled * filled)))
+    counts = np.concatenate(([0], np.cumsum(valid)))
+    end = np.arange(1, len(values) + 1)
+
+    columns, stats = [], {}
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for days in WINDOWS:
+            # First index still inside the window ending at each point
+            start = np.searchsorted(times, times - days * DAY, side="right")
+            count = counts[end] - counts[start]
+            mean = (sums[end] - sums[start]) / count
+            stats[days] = (count, mean, squares[end] - squares[start])
+            columns.append(mean)
+        count, mean, total_squares = stats[VOLATILITY_WINDOW]
+        variance = total_squares / count - mean * mean
+        floor = (EPSILON * np.maximum(np.abs(mean), 1.0)) ** 2
+        std = np.where(variance > floor, np.sqrt(np.maximum(variance, 0.0)), 0.0)
+        std[count == 0] = np.nan
+        z = np.where(std > 0, (values - mean) / std, np.nan)
+    return columns + [std, z]
+
+def rebuild(conn):
+    """
+    Recomputes the whole analytics table from the rates table with NumPy and
+    returns the number of rows written. Run after backfills, which add rows
+    older than the incremental state has seen.
+    """
+    # Imported here so the scheduler does not pay for NumPy on every start
+    import numpy as np
+    global _state
+
+    with _state_lock:
+        try:
+            rows = _rates_rows(conn)
+            cursor = conn.cursor()
+            cursor.execute(f"DELETE FROM {storage.ANALYTICS_TABLE}")
+            if rows:
+                times = np.array([_epoch(row[2]) for row in rows])
+                series = [
+                    np.array([row[index] for row in rows], dtype=float) for index in (3, 4, 5)
+                ]
+                metrics = np.column_stack(
+                    [column for values in series for column in _rolling(times, values, np)]
+                )
+                _insert(conn, [
+                    list(row[:6]) + [None if math.isnan(value) else value for value in values]
+                    + [row[6]]
+                    for row, values in zip(rows, metrics.tolist())
+                ])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            # The next update() reloads its windows from the rebuilt table
+            _state = None
+    logger.info(f"Rebuilt {len(rows)} analytics rows")
+    return len(rows)
+
+def refresh():
+    """
+    Brings the analytics table up to date; failures are logged and never raised,
+    so derived data cannot hold up the spool.
+    """
+    try:
+        with storage.connection() as conn:
+            return update(conn)
+    except Exception as e:
+        logger.warning(f"Failed to update the analytics table: {e}")
+        return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Update the derived analytics table.")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Recompute every row from the rates table, e.g. after a backfill")
+    args = parser.parse_args(argv)
+
+    try:
+        with storage.connection() as conn:
+            storage.init_db(conn)
+            if args.rebuild:
+                rebuild(conn)
+            else:
+                logger.info(f"Added {update(conn)} analytics rows")
+    finally:
+        storage.close_connections()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
+
+# Created with AI assistance
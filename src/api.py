@@ -0,0 +1,178 @@
+import hashlib
+import json
+import logging
+import threading
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import src.queries as queries
+import src.metrics as metrics
+import src.health as health
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_METHODS = {"mean", "median", "min", "max", "first", "last"}
+
+def _epoch(ts):
+    """
+    Converts a stored ts value (epoch seconds or aware datetime) to epoch seconds.
+    """
+    return ts.timestamp() if isinstance(ts, datetime) else float(ts)
+
+def _iso(ts):
+    return datetime.fromtimestamp(_epoch(ts), timezone.utc).isoformat()
+
+def _frame_json(frame):
+    """
+    Serializes a time-indexed frame as {"data": [...]} with pandas' vectorized writer.
+    """
+    records = frame.reset_index().to_json(orient="records", date_format="iso", date_unit="s")
+    return b'{"data":' + records.encode() + b"}"
+
+def _param(params, name, default=None):
+    values = params.get(name)
+    return values[-1] if values else default
+
+def _latest(params):
+    row = queries.latest()
+    if row is not None:
+        row["ts"] = _iso(row["ts"])
+    return json.dumps({"data": row}).encode()
+
+def _range(params):
+    return _frame_json(queries.get_range(_param(params, "start"), _param(params, "end")))
+
+def _rollup(params):
+    how = _param(params, "how", "mean")
+    if how not in ROLLUP_METHODS:
+        raise ValueError(f"how must be one of {sorted(ROLLUP_METHODS)}")
+    frame = queries.resample(
+        _param(params, "freq", "1D"),
+        _param(params, "start"),
+        _param(params, "end"),
+        how=how
+    )
+    return _frame_json(frame)
+
+def _summary(params):
+    stats = queries.summary(_param(params, "start"), _param(params, "end"))
+    return json.dumps({"data": stats}).encode()
+
+ROUTES = {
+    "/latest": _latest,
+    "/range": _range,
+    "/rollup": _rollup,
+    "/summary": _summary,
+}
+
+def _metrics():
+    ready, details = health.readiness()
+    gauges = {"data_age_seconds": details.get("data_age_seconds"), "ready": int(ready)}
+    return 200, metrics.render(gauges).encode(), "text/plain; version=0.0.4; charset=utf-8"
+
+def _ready():
+    ready, details = health.readiness()
+    return 200 if ready else 503, json.dumps({"ready": ready, **details}).encode(), "application/json"
+
+# Live status routes; never cached and without validators
+STATUS_ROUTES = {
+    "/metrics": _metrics,
+    "/ready": _ready,
+}
+
+def render(path, query):
+    """
+    Builds (body, etag, last_modified) for a route, cached until the next write
+    or for READ_CACHE_TTL seconds.
+    """
+    route = ROUTES[path]
+    params = parse_qs(query)
+    key = ("http", path, tuple(sorted((k, tuple(v)) for k, v in params.items())))
+
+    def load():
+        body = route(params)
+        etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        latest = queries.latest()
+        last_modified = _epoch(latest["ts"]) if latest else None
+        return body, etag, last_modified
+
+    return queries.cached(key, load)
+
+class RatesHandler(BaseHTTPRequestHandler):
+    """
+    Serves read-only JSON from the rates table with ETag/Last-Modified validation.
+    """
+    protocol_version = "HTTP/1.1"
+    server_version = "MortgageRateMonitor"
+    # Headers and body go out in separate writes; without TCP_NODELAY small
+    # keep-alive responses stall on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path in STATUS_ROUTES:
+            status, body, content_type = STATUS_ROUTES[url.path]()
+            self._send(status, body, {"Cache-Control": "no-store"}, content_type)
+            return
+        if url.path not in ROUTES:
+            self._send(404, json.dumps({"error": "not found"}).encode())
+            return
+        try:
+            body, etag, last_modified = render(url.path, url.query)
+        except ValueError as e:
+            self._send(400, json.dumps({"error": str(e)}).encode())
+            return
+        except Exception:
+            logger.exception(f"Failed to serve {self.path}")
+            self._send(500, json.dumps({"error": "internal error"}).encode())
+            return
+
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if last_modified is not None:
+            headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+        if self._not_modified(etag, last_modified):
+            self._send(304, b"", headers)
+        else:
+            self._send(200, body, headers)
+
+    def _not_modified(self, etag, last_modified):
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return etag in tags or "*" in tags
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since and last_modified is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(last_modified) <= since
+        return False
+
+    def _send(self, status, body, headers=None, content_type="application/json"):
+        self.send_response(status)
+        if status != 304:
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} -- {format % args}")
+
+def start_server(host, port):
+    """
+    Starts the API on a daemon thread and returns the server; call shutdown() to stop it.
+    """
+    server = ThreadingHTTPServer((host, port), RatesHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="api", daemon=True)
+    thread.start()
+    logger.info(f"Serving rates API on {host}:{server.server_address[1]}")
+    return server
+
+# Created with AI assistance
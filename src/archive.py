@@ -0,0 +1,344 @@
+import argparse
+import json
+import logging
+import os
+import shutil
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import src.storage as storage
+from src.config import ARCHIVE_DIR, ARCHIVE_KEEP_MONTHS, ARCHIVE_PRUNE
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+# Columns archived for each table, one .npy file per column; ts is epoch seconds
+RATE_COLUMNS = ["id", "timestamp", "ts", "source", "mortgage_rate", "mbb_price"]
+QUOTE_COLUMNS = ["id", "timestamp", "ts", "price"]
+# Columns returned by read() for rates and for one symbol's quotes
+READ_COLUMNS = {"rates": ["ts", "mortgage_rate", "mbb_price"], "quotes": ["ts", "price"]}
+# Fixed-width dtypes; text columns are as wide as their longest value in the partition
+DTYPES = {
+    "id": "int64", "ts": "int64", "mortgage_rate": "float64", "mbb_price": "float64",
+    "price": "float64", "timestamp": "U", "source": "U",
+}
+
+def _epoch(ts):
+    return int(ts.timestamp()) if isinstance(ts, datetime) else int(ts)
+
+def _placeholder():
+    return "%s" if storage.USE_POSTGRES else "?"
+
+def _path(*parts):
+    return os.path.join(ARCHIVE_DIR, *parts)
+
+def month_bounds(month):
+    """
+    Returns the (start, end) aware datetimes of a "YYYY-MM" month in LOCAL_TZ.
+    """
+    year, number = (int(part) for part in month.split("-"))
+    tz = ZoneInfo(storage.LOCAL_TZ)
+    start = datetime(year, number, 1, tzinfo=tz)
+    end = datetime(year + number // 12, number % 12 + 1, 1, tzinfo=tz)
+    return start, end
+
+def _month_of(epoch):
+    return datetime.fromtimestamp(epoch, ZoneInfo(storage.LOCAL_TZ)).strftime("%Y-%m")
+
+def first_kept_month(now, keep):
+    """
+    Returns the oldest month left in the live tables: `keep` months back from the
+    month of `now` (epoch seconds), counting that month.
+    """
+    local = datetime.fromtimestamp(now, ZoneInfo(storage.LOCAL_TZ))
+    index = local.year * 12 + local.month - 1 - (keep - 1)
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+def load_manifest():
+    """
+    Returns the archive index: {"version", "partitions": {month: entry}}.
+    """
+    path = _path(MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {"version": MANIFEST_VERSION, "partitions": {}}
+    with open(path) as f:
+        return json.load(f)
+
+def _save_manifest(manifest):
+    path = _path(MANIFEST_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def _load_arrays(directory, columns, np, mmap_mode=None):
+    return {
+        name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+        for name in columns
+    }
+
+def _save_arrays(directory, arrays, np):
+    os.makedirs(directory, exist_ok=True)
+    for name, values in arrays.items():
+        np.save(os.path.join(directory, f"{name}.npy"), values)
+
+def _to_arrays(rows, columns, np):
+    """
+    Turns fetched rows into one fixed-width array per column; NULL numbers become NaN.
+    """
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    arrays = {}
+    for name, column in zip(columns, values):
+        dtype = DTYPES[name]
+        if name == "ts":
+            column = [_epoch(ts) for ts in column]
+        elif dtype == "U":
+            column = ["" if value is None else str(value) for value in column]
+        elif dtype == "float64":
+            column = [float("nan") if value is None else value for value in column]
+        arrays[name] = np.array(column, dtype=dtype)
+    return arrays
+
+def _merge(old, new, np):
+    """
+    Concatenates two column sets and sorts the result by (ts, id).
+    """
+    if old is None:
+        return new
+    merged = {name: np.concatenate([old[name], new[name]]) for name in new}
+    order = np.lexsort((merged["id"], merged["ts"]))
+    return {name: values[order] for name, values in merged.items()}
+
+def _new_rows(conn, month, entry):
+    """
+    Returns the month's (rates rows, {symbol: quote rows}) that are not archived
+    yet, i.e. newer than the highest ids in the manifest entry.
+    """
+    start, end = (storage.to_db_time(bound) for bound in month_bounds(month))
+    ph = _placeholder()
+    cursor = conn.cursor()
+    cursor.execute(
+        f"SELECT {', '.join(RATE_COLUMNS)} FROM {storage.TABLE_NAME} "
+        f"WHERE ts >= {ph} AND ts < {ph} AND id > {ph} ORDER BY ts, id",
+        (start, end, entry.get("rates_max_id", 0))
+    )
+    rates = cursor.fetchall()
+    cursor.execute(
+        f"SELECT id, timestamp, ts, symbol, price FROM {storage.QUOTES_TABLE} "
+        f"WHERE ts >= {ph} AND ts < {ph} AND id > {ph} ORDER BY ts, id",
+        (start, end, entry.get("quotes_max_id", 0))
+    )
+    quotes = {}
+    for row_id, timestamp, ts, symbol, price in cursor.fetchall():
+        quotes.setdefault(symbol, []).append((row_id, timestamp, ts, price))
+    return rates, quotes
+
+def _partition_dir(month, entry):
+    # Entries written before partitions were versioned live in the month's directory
+    return (entry or {}).get("dir", month)
+
+def _remove_old_versions(month, keep):
+    for name in os.listdir(ARCHIVE_DIR):
+        stale = name == month or name.startswith(f"{month}.")
+        if stale and name not in keep:
+            shutil.rmtree(os.path.join(ARCHIVE_DIR, name), ignore_errors=True)
+
+def archive_month(conn, month, manifest, prune=False):
+    """
+    Writes the month's rows to its partition, merged with what is already
+    archived, and records it in the manifest. Returns True when a partition was
+    written. With `prune`, the archived rows are then deleted from the live tables.
+
+    Each rewrite goes to a new versioned directory and the manifest replace is
+    the only swap, so readers see either the old partition or the new one. The
+    version before it is kept for readers still holding the old manifest; older
+    ones are removed.
+    """
+    # Imported here so the scheduler does not pay for NumPy on every start
+    import numpy as np
+
+    entry = manifest["partitions"].get(month)
+    rates_rows, quote_rows = _new_rows(conn, month, entry or {})
+    written = bool(rates_rows or quote_rows)
+    if written:
+        directory = _path(_partition_dir(month, entry))
+        start, end = month_bounds(month)
+        rates = _to_arrays(rates_rows, RATE_COLUMNS, np)
+        if entry is not None and os.path.isdir(os.path.join(directory, "rates")):
+            rates = _merge(_load_arrays(os.path.join(directory, "rates"), RATE_COLUMNS, np), rates, np)
+        symbols = set(quote_rows) | set(entry["quotes"] if entry else ())
+        quotes = {}
+        for symbol in sorted(symbols):
+            arrays = _to_arrays(quote_rows.get(symbol, []), QUOTE_COLUMNS, np)
+            if entry is not None and symbol in entry["quotes"]:
+                old = _load_arrays(os.path.join(directory, "quotes", symbol), QUOTE_COLUMNS, np)
+                arrays = _merge(old, arrays, np)
+            quotes[symbol] = arrays
+
+        version = (entry or {}).get("version", 0) + 1
+        new_directory = _path(f"{month}.v{version}")
+        # Left over from a roll that stopped before saving the manifest
+        shutil.rmtree(new_directory, ignore_errors=True)
+        if len(rates["ts"]):
+            _save_arrays(os.path.join(new_directory, "rates"), rates, np)
+        for symbol, arrays in quotes.items():
+            _save_arrays(os.path.join(new_directory, "quotes", symbol), arrays, np)
+
+        quote_ids = [int(arrays["id"].max()) for arrays in quotes.values()]
+        entry = manifest["partitions"][month] = {
+            "dir": os.path.basename(new_directory),
+            "version": version,
+            "start": _epoch(start),
+            "end": _epoch(end),
+            "rates": len(rates["ts"]),
+            "quotes": {symbol: len(arrays["ts"]) for symbol, arrays in quotes.items()},
+            "rates_max_id": int(rates["id"].max()) if len(rates["id"]) else 0,
+            "quotes_max_id": max(quote_ids, default=0),
+        }
+        _save_manifest(manifest)
+        _remove_old_versions(month, keep={entry["dir"], os.path.basename(directory)})
+        logger.info(
+            f"Archived {month}: {entry['rates']} rates rows, "
+            f"{sum(entry['quotes'].values())} quote rows"
+        )
+
+    if prune and entry is not None:
+        start, end = month_bounds(month)
+        removed = storage.delete_range(
+            conn, start, end, entry["rates_max_id"], entry["quotes_max_id"]
+        )
+        if removed:
+            logger.info(f"Pruned {removed} archived rows of {month} from the live tables")
+    return written
+
+def _oldest_month(conn):
+    cursor = conn.cursor()
+    oldest = []
+    for table in (storage.TABLE_NAME, storage.QUOTES_TABLE):
+        cursor.execute(f"SELECT MIN(ts) FROM {table}")
+        ts = cursor.fetchone()[0]
+        if ts is not None:
+            oldest.append(_epoch(ts))
+    return _month_of(min(oldest)) if oldest else None
+
+def roll(now=None, keep=None, prune=None):
+    """
+    Archives every closed month older than the newest `keep` months (default
+    ARCHIVE_KEEP_MONTHS) and returns the number of partitions written.
+
+    Months are only rewritten when they gained rows since they were archived,
+    so running it again is cheap. Does nothing when `keep` is 0.
+    """
+    keep = ARCHIVE_KEEP_MONTHS if keep is None else keep
+    prune = ARCHIVE_PRUNE if prune is None else prune
+    if keep < 1:
+        return 0
+    cutoff = first_kept_month(time.time() if now is None else now, keep)
+    written = 0
+    with storage.connection() as conn:
+        month = _oldest_month(conn)
+        manifest = load_manifest()
+        while month is not None and month < cutoff:
+            written += archive_month(conn, month, manifest, prune)
+            month = month_bounds(month)[1].strftime("%Y-%m")
+    logger.info(f"Archive is up to date before {cutoff}; wrote {written} partitions")
+    return written
+
+def _live_arrays(table, columns, start, end, symbol, np):
+    ph = _placeholder()
+    clauses, params = [], []
+    if start is not None:
+        clauses.append(f"ts >= {ph}")
+        params.append(storage.to_db_time(start))
+    if end is not None:
+        clauses.append(f"ts < {ph}")
+        params.append(storage.to_db_time(end))
+    if symbol is not None:
+        clauses.append(f"symbol = {ph}")
+        params.append(symbol)
+    where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+    with storage.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT {', '.join(columns)} FROM {table} {where}ORDER BY ts, id", params)
+        rows = cursor.fetchall()
+    return _to_arrays(rows, columns, np)
+
+def read(start=None, end=None, symbol=None, live=True):
+    """
+    Returns {column: array} for rows with start <= ts < end: ts, mortgage_rate and
+    mbb_price of the rates table, or ts and price of one symbol's quotes.
+
+    Only the archived months that overlap the window are opened, as read-only
+    memory maps; a window inside one month comes back as views of the files
+    without copying, while longer ones are concatenated. With `live`, months
+    not archived yet are read from the database. Bounds may be ISO strings or
+    datetimes; naive values are read in LOCAL_TZ.
+    """
+    # Imported here so the scheduler does not pay for NumPy on every start
+    import numpy as np
+
+    kind = "rates" if symbol is None else "quotes"
+    columns = READ_COLUMNS[kind]
+    low = None if start is None else _epoch(storage.to_db_time(start))
+    high = None if end is None else _epoch(storage.to_db_time(end))
+    partitions = sorted(load_manifest()["partitions"].items())
+
+    chunks = []
+    for month, entry in partitions:
+        if (high is not None and entry["start"] >= high) or (low is not None and entry["end"] <= low):
+            continue
+        partition = _partition_dir(month, entry)
+        directory = _path(partition, "rates") if symbol is None else _path(partition, "quotes", symbol)
+        if not os.path.isdir(directory):
+            continue
+        arrays = _load_arrays(directory, columns, np, mmap_mode="r")
+        ts = arrays["ts"]
+        first = 0 if low is None else int(np.searchsorted(ts, low, side="left"))
+        last = len(ts) if high is None else int(np.searchsorted(ts, high, side="left"))
+        if last > first:
+            chunks.append({name: values[first:last] for name, values in arrays.items()})
+
+    if live:
+        table = storage.TABLE_NAME if symbol is None else storage.QUOTES_TABLE
+        arrays = _live_arrays(table, columns, start, end, symbol, np)
+        if partitions:
+            # Rows of archived months come from the archive, even when not pruned
+            starts = np.array([entry["start"] for _, entry in partitions])
+            ends = np.array([entry["end"] for _, entry in partitions])
+            index = np.searchsorted(starts, arrays["ts"], side="right") - 1
+            archived = (index >= 0) & (arrays["ts"] < ends[np.maximum(index, 0)])
+            arrays = {name: values[~archived] for name, values in arrays.items()}
+        if len(arrays["ts"]):
+            chunks.append(arrays)
+
+    if not chunks:
+        return {name: np.empty(0, dtype=DTYPES[name]) for name in columns}
+    if len(chunks) == 1:
+        return chunks[0]
+    merged = {name: np.concatenate([chunk[name] for chunk in chunks]) for name in columns}
+    if np.any(np.diff(merged["ts"]) < 0):
+        order = np.argsort(merged["ts"], kind="stable")
+        merged = {name: values[order] for name, values in merged.items()}
+    return merged
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Roll closed months into the columnar archive.")
+    parser.add_argument("--keep", type=int, default=ARCHIVE_KEEP_MONTHS or 1,
+                        help="Newest months, counting the current one, left out of the archive")
+    parser.add_argument("--prune", action="store_true", default=ARCHIVE_PRUNE,
+                        help="Delete archived rows from the live tables")
+    args = parser.parse_args(argv)
+
+    try:
+        with storage.connection() as conn:
+            storage.init_db(conn)
+        roll(keep=args.keep, prune=args.prune)
+    finally:
+        storage.close_connections()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
+
+# Created with AI assistance
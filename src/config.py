@@ -3,8 +3,25 @@ import os
 # Configuration ------------------------------------------------------------------------
 mortgage_url = "https://www.mortgagenewsdaily.com/mortgage-rates/mnd"
 ticker = "MBB"
+# Symbols quoted on every run; the primary ticker is always included
+tickers = list(dict.fromkeys(
+    [ticker] + [
+        t.strip() for t in os.getenv("TICKERS", "MBB,VMBS,JMBS,SPMB,TLT,^TNX").split(",")
+        if t.strip()
+    ]
+))
 SQLITE_FILE = "data/data.sqlite3"
 TABLE_NAME  = "rates_mbb"
+QUOTES_TABLE = "quotes"
+SCHEMA_TABLE = "schema_version"
+JOB_RUNS_TABLE = "job_runs"
+JOBS_TABLE = "apscheduler_jobs"
+PROVIDER_RATES_TABLE = "provider_rates"
+ANALYTICS_TABLE = "analytics"
+ALERTS_TABLE = "alerts"
+# Zone of the naive wall-clock timestamps in the legacy TEXT column
+LOCAL_TZ = os.getenv("LOCAL_TZ") or os.getenv("TZ") or "UTC"
+MIGRATION_CHUNK_SIZE = int(os.getenv("MIGRATION_CHUNK_SIZE", "10000"))
 POSTGRES_VARS = {
     "host":     os.getenv("PG_HOST"),
     "port":     os.getenv("PG_PORT"),
@@ -14,4 +31,159 @@ POSTGRES_VARS = {
 }
 USE_POSTGRES = all(POSTGRES_VARS.values())
 
+# Storage engine -----------------------------------------------------------------------
+PG_POOL_MIN = int(os.getenv("PG_POOL_MIN", "1"))
+PG_POOL_MAX = int(os.getenv("PG_POOL_MAX", "4"))
+SQLITE_CACHED_STATEMENTS = int(os.getenv("SQLITE_CACHED_STATEMENTS", "256"))
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "5000"))
+# Writes are appended to the spool file and drained to the database in batches
+SPOOL_FILE = os.getenv("SPOOL_FILE", "data/spool.ndjson")
+SPOOL_FLUSH_INTERVAL = float(os.getenv("SPOOL_FLUSH_INTERVAL", "5"))
+SPOOL_BATCH_SIZE = int(os.getenv("SPOOL_BATCH_SIZE", "1000"))
+SPOOL_MAX_BACKOFF = float(os.getenv("SPOOL_MAX_BACKOFF", "300"))
+READ_CACHE_SIZE = int(os.getenv("READ_CACHE_SIZE", "128"))
+# Cached reads are dropped after this many seconds, so rows written by another process
+# (a replica, a backfill) show up without a write in this one
+READ_CACHE_TTL = float(os.getenv("READ_CACHE_TTL", "5"))
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "10000"))
+EXPORT_STATE_FILE = os.getenv("EXPORT_STATE_FILE", "data/export_state.json")
+
+# API ----------------------------------------------------------------------------------
+# The read-only JSON API is started next to the scheduler when API_PORT is set
+API_HOST = os.getenv("API_HOST", "0.0.0.0")
+API_PORT = int(os.getenv("API_PORT", "0"))
+
+# HTTP ---------------------------------------------------------------------------------
+# (connect, read) timeouts in seconds, applied to every request on the shared session
+HTTP_TIMEOUT = (
+    float(os.getenv("HTTP_CONNECT_TIMEOUT", "5")),
+    float(os.getenv("HTTP_READ_TIMEOUT", "15")),
+)
+HTTP_POOL_SIZE  = int(os.getenv("HTTP_POOL_SIZE", "4"))
+HTTP_USER_AGENT = os.getenv(
+    "HTTP_USER_AGENT",
+    "Mozilla/5.0 (compatible; Mortgage-Rate-Monitor)"
+)
+# Pages served with an ETag or Last-Modified are kept here and revalidated with
+# If-None-Match / If-Modified-Since on the next fetch; empty turns the cache off
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", "data/http_cache")
+
+# Job ----------------------------------------------------------------------------------
+# Sources are fetched concurrently; each gets its own timeout and the whole job
+# stops waiting at JOB_DEADLINE seconds.
+MORTGAGE_TIMEOUT = float(os.getenv("MORTGAGE_TIMEOUT", "20"))
+QUOTE_TIMEOUT    = float(os.getenv("QUOTE_TIMEOUT", "20"))
+JOB_DEADLINE     = float(os.getenv("JOB_DEADLINE", "30"))
+SOURCE_WORKERS   = int(os.getenv("SOURCE_WORKERS", "4"))
+BACKFILL_DEADLINE = float(os.getenv("BACKFILL_DEADLINE", "300"))
+
+# Quotes -------------------------------------------------------------------------------
+# Quote backends tried in order; later ones only fetch symbols the earlier ones missed
+QUOTE_PROVIDERS = [
+    p.strip() for p in os.getenv("QUOTE_PROVIDERS", "chart,yfinance").split(",") if p.strip()
+]
+QUOTE_CHART_URL = os.getenv(
+    "QUOTE_CHART_URL", "https://query1.finance.yahoo.com/v8/finance/chart/"
+)
+
+# Rate providers -----------------------------------------------------------------------
+# Sites the 30-year fixed rate is read from, fetched in parallel on every run. The
+# stored mortgage_rate comes from the first one that answered, named in its source; the
+# median of all values is stored as the "consensus" provider rate. With RATE_CONSENSUS
+# the mortgage_rate is that median instead.
+RATE_PROVIDERS = [
+    p.strip() for p in os.getenv("RATE_PROVIDERS", "mnd,freddiemac").split(",") if p.strip()
+]
+RATE_CONSENSUS = os.getenv("RATE_CONSENSUS", "false").lower() in ("1", "true", "yes")
+FREDDIE_MAC_URL = os.getenv(
+    "FREDDIE_MAC_URL", "https://www.freddiemac.com/pmms/docs/PMMS_history.csv"
+)
+# Seconds a provider's last value is reused before its site is fetched again
+RATE_TTLS = {
+    "mnd":        float(os.getenv("MND_TTL", "0")),
+    "freddiemac": float(os.getenv("FREDDIE_MAC_TTL", "21600")),
+}
+
+# Analytics ----------------------------------------------------------------------------
+# Yield the mortgage rate spread is measured against; MBB is quoted as a price, so the
+# 10-year Treasury yield from the quotes table stands in for the bond side
+SPREAD_SYMBOL = os.getenv("SPREAD_SYMBOL", "^TNX")
+# Polls skip unchanged quotes, so the spread uses the newest SPREAD_SYMBOL quote at or
+# before the rates row, at most this many seconds older (4 days spans a long weekend)
+SPREAD_MAX_AGE = int(os.getenv("SPREAD_MAX_AGE", "345600"))
+
+# Alerts -------------------------------------------------------------------------------
+# Rules checked against every stored sample, separated by ";", e.g.
+# "rate below 6; MBB rise 2% 5d; rate cross 30d" (see the README for the syntax)
+ALERT_RULES       = os.getenv("ALERT_RULES", "")
+# Fired alerts are POSTed here as JSON; without it they are only logged and recorded
+ALERT_WEBHOOK_URL = os.getenv("ALERT_WEBHOOK_URL", "")
+# Seconds a rule stays quiet after it fired
+ALERT_COOLDOWN    = float(os.getenv("ALERT_COOLDOWN", "21600"))
+
+# Archive ------------------------------------------------------------------------------
+# Closed months of the rates and quotes tables are rolled into per-month columnar files
+# under ARCHIVE_DIR. The newest ARCHIVE_KEEP_MONTHS months (counting the current one)
+# are left alone; 0 turns the monthly roll off. With ARCHIVE_PRUNE, archived rows are
+# deleted from the live tables.
+ARCHIVE_DIR         = os.getenv("ARCHIVE_DIR", "data/archive")
+ARCHIVE_KEEP_MONTHS = int(os.getenv("ARCHIVE_KEEP_MONTHS", "0"))
+ARCHIVE_PRUNE       = os.getenv("ARCHIVE_PRUNE", "false").lower() in ("1", "true", "yes")
+
+# Retries ------------------------------------------------------------------------------
+RETRY_ATTEMPTS   = int(os.getenv("RETRY_ATTEMPTS", "4"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "1"))
+RETRY_MAX_DELAY  = float(os.getenv("RETRY_MAX_DELAY", "30"))
+# Retries shared by all sources in one run
+JOB_RETRY_BUDGET = int(os.getenv("JOB_RETRY_BUDGET", "6"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT     = float(os.getenv("BREAKER_RESET_TIMEOUT", "300"))
+# A run that stores no rates row is re-run this many times, this many seconds apart
+FOLLOW_UP_ATTEMPTS = int(os.getenv("FOLLOW_UP_ATTEMPTS", "3"))
+FOLLOW_UP_DELAY    = float(os.getenv("FOLLOW_UP_DELAY", "600"))
+
+# Health -------------------------------------------------------------------------------
+# The service reports not ready once the newest stored rates row is older than this
+# many seconds (26 hours covers one missed daily run window)
+STALE_AFTER = float(os.getenv("STALE_AFTER", "93600"))
+
+# Scheduler ----------------------------------------------------------------------------
+# Jobs are kept in JOBS_TABLE, so a run missed while the container was down is made up
+# at startup if it is at most MISFIRE_GRACE_TIME seconds late. With COALESCE, several
+# missed runs of one job are made up by a single run.
+MISFIRE_GRACE_TIME = int(os.getenv("MISFIRE_GRACE_TIME", "21600"))
+COALESCE           = os.getenv("COALESCE", "true").lower() in ("1", "true", "yes")
+# Threads running scheduled jobs, so a slow job does not hold up the others
+SCHEDULER_WORKERS  = int(os.getenv("SCHEDULER_WORKERS", "4"))
+# With JOB_ISOLATION=process every job runs in a worker process and only its result
+# and stage timings come back, so NumPy, pandas and parsed pages never stay in the
+# scheduler's memory. A worker exits after WORKER_MAX_TASKS jobs (0 keeps it for good);
+# the state jobs leave for the next run (circuit breakers, provider TTLs, last stored
+# values, the page hash) is handed back to the scheduler and on to the next worker.
+JOB_ISOLATION      = os.getenv("JOB_ISOLATION", "thread").lower()
+WORKER_PROCESSES   = int(os.getenv("WORKER_PROCESSES", "1"))
+WORKER_MAX_TASKS   = int(os.getenv("WORKER_MAX_TASKS", "1"))
+# Locked by the running fetch, so fetches never overlap across threads and workers
+FETCH_LOCK_FILE    = os.getenv("FETCH_LOCK_FILE", "data/fetch.lock")
+
+# Replicas -----------------------------------------------------------------------------
+# Replicas sharing one Postgres database run scheduled jobs only while they hold this
+# session advisory lock; a standby tries to take it every LEADER_RETRY seconds, and the
+# leader checks every LEADER_RETRY seconds that its lock connection is still alive
+LEADER_LOCK_KEY = int(os.getenv("LEADER_LOCK_KEY", "5067341"))
+LEADER_RETRY    = float(os.getenv("LEADER_RETRY", "5"))
+
+# Schedule -----------------------------------------------------------------------------
+# The daily run's wall-clock time; it and POLL_WINDOWS are read in SCHEDULE_TIMEZONE
+SCHEDULE_TIMEZONE = "America/Los_Angeles"
+DAILY_HOUR, DAILY_MINUTE = 6, 40
+
+# Polling ------------------------------------------------------------------------------
+# Minutes between intraday runs inside POLL_WINDOWS (0 keeps only the daily run).
+# Windows are "days HH:MM-HH:MM" in America/Los_Angeles, separated by ";".
+POLL_INTERVAL    = int(os.getenv("POLL_INTERVAL", "0"))
+POLL_WINDOWS     = os.getenv("POLL_WINDOWS", "mon-fri 06:30-13:00")
+# Polled values closer than this to the last stored value are not written again
+CHANGE_TOLERANCE = float(os.getenv("CHANGE_TOLERANCE", "0"))
+
 # Created with AI assistance
@@ -1,41 +1,330 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from datetime import date, timedelta
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
 import requests
-from bs4 import BeautifulSoup
-import yfinance as yf
-
-def extract_30yr_rate(url):
-    """
-    Fetches the mortgage rates page and extracts the 30-year fixed rate.
-    """
-    response = requests.get(url)
-    if response.status_code != 200:
-        raise Exception(f"Error fetching page: {response.status_code}")
-    
-    soup = BeautifulSoup(response.text, "html.parser")
-    for row in soup.find_all("tr"):
-        header = row.find("th")
-        if header and "30 Yr. Fixed" in header.get_text():
-            rate_cell = row.find("td")
-            if rate_cell:
-                raw_rate = rate_cell.get_text(strip=True)
-                try:
-                    rate_value = float(raw_rate.replace("%", ""))
-                except ValueError:
-                    # Return raw value if conversion fails.
-                    return raw_rate
-                return rate_value
+from requests.adapters import HTTPAdapter
+from src.config import HTTP_TIMEOUT, HTTP_POOL_SIZE, HTTP_USER_AGENT, HTTP_CACHE_DIR
+from src import jobstate
+from src.retry import retry_call, get_breaker
+
+# Statuses worth retrying; anything else (e.g. 404) fails immediately
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Breaker shared by every Yahoo Finance download
+YAHOO_BREAKER = "finance.yahoo.com"
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """
+    Returns the process-wide HTTP session, creating it on first use.
+
+    The session keeps connections alive between requests and jobs, so repeat
+    fetches to the same host skip the TCP and TLS handshakes.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=HTTP_POOL_SIZE,
+                pool_maxsize=HTTP_POOL_SIZE
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({
+                "User-Agent": HTTP_USER_AGENT,
+                "Connection": "keep-alive",
+            })
+            _session = session
+        return _session
+
+def close_session():
+    """
+    Closes the shared HTTP session and its pooled connections.
+    """
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+def is_retryable_http(error):
+    """
+    True for connection errors, timeouts and throttling/server-error statuses.
+    """
+    if isinstance(error, requests.HTTPError):
+        return error.response is not None and error.response.status_code in RETRY_STATUSES
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+def _cache_path(url):
+    return os.path.join(HTTP_CACHE_DIR, f"{hashlib.sha256(url.encode()).hexdigest()[:32]}.json")
+
+def load_cached(url):
+    """
+    Returns the cached {"url", "etag", "last_modified", "text"} entry for `url`, or None.
+    """
+    if not HTTP_CACHE_DIR:
+        return None
+    try:
+        with open(_cache_path(url), encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return entry if entry.get("url") == url else None
+
+def store_cached(url, response):
+    """
+    Saves a 200 response that carries a validator, replacing the file atomically.
+    """
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if not HTTP_CACHE_DIR or not (isinstance(etag, str) or isinstance(last_modified, str)):
+        return
+    path = _cache_path(url)
+    os.makedirs(HTTP_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "url": url,
+            "etag": etag if isinstance(etag, str) else None,
+            "last_modified": last_modified if isinstance(last_modified, str) else None,
+            "text": response.text,
+        }, f)
+    os.replace(tmp_path, path)
+
+def fetch_page(url, timeout=HTTP_TIMEOUT, budget=None, deadline=None, cache=False):
+    """
+    Fetches a page over the shared session, raising on HTTP error statuses.
+
+    Transient failures are retried with backoff under the host's circuit breaker.
+    The returned response doubles as the reachability check and as the input
+    to the parsers, so each run downloads the page exactly once.
+
+    With `cache`, the request is made conditional on the copy kept in
+    HTTP_CACHE_DIR; a 304 Not Modified response is returned with that copy as
+    its body, so callers read `.text` either way.
+    """
+    def attempt():
+        entry = load_cached(url) if cache else None
+        headers = {}
+        if entry is not None:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        if headers:
+            response = get_session().get(url, timeout=timeout, headers=headers)
+        else:
+            response = get_session().get(url, timeout=timeout)
+        if response.status_code == 304 and entry is not None:
+            response._content = entry["text"].encode("utf-8")
+            response.encoding = "utf-8"
+            return response
+        response.raise_for_status()
+        if cache:
+            store_cached(url, response)
+        return response
+
+    return retry_call(
+        attempt, is_retryable_http, breaker=get_breaker(urlsplit(url).netloc),
+        budget=budget, deadline=deadline
+    )
+
+def post_json(url, payload, timeout=HTTP_TIMEOUT, budget=None, deadline=None):
+    """
+    POSTs `payload` as JSON over the shared session, raising on HTTP error statuses.
+
+    Retried like fetch_page, under the host's circuit breaker.
+    """
+    def attempt():
+        response = get_session().post(url, json=payload, timeout=timeout)
+        response.raise_for_status()
+        return response
+
+    return retry_call(
+        attempt, is_retryable_http, breaker=get_breaker(urlsplit(url).netloc),
+        budget=budget, deadline=deadline
+    )
+
+_TABLE_RE = re.compile(r"<table\b.*?</table>", re.IGNORECASE | re.DOTALL)
+
+# (digest of the table fragments, products parsed from them) of the last parse
+_last_table = None
+
+class _RateTableParser(HTMLParser):
+    """
+    Streaming parser that collects the header and data cells of each table row.
+    """
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows = []
+        self._row = None
+        self._cell = None
+        self._cell_tag = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "tr":
+            self._close_row()
+            self._row = {"th": None, "td": []}
+        elif tag in ("th", "td") and self._row is not None:
+            self._close_cell()
+            self._cell = []
+            self._cell_tag = tag
+
+    def handle_endtag(self, tag):
+        if tag in ("th", "td"):
+            self._close_cell()
+        elif tag in ("tr", "table"):
+            self._close_row()
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+    def close(self):
+        super().close()
+        self._close_row()
+
+    def _close_cell(self):
+        if self._cell is None:
+            return
+        text = "".join(self._cell).strip()
+        if self._cell_tag == "th":
+            if self._row["th"] is None:
+                self._row["th"] = text
+        else:
+            self._row["td"].append(text)
+        self._cell = None
+        self._cell_tag = None
+
+    def _close_row(self):
+        self._close_cell()
+        if self._row is not None:
+            self.rows.append(self._row)
+            self._row = None
+
+def _to_number(text):
+    """
+    Converts a rate or change cell such as "6.30%" or "+0.02" to a float.
+    Returns the raw text if conversion fails.
+    """
+    try:
+        return float(text.replace("%", "").replace("+", ""))
+    except ValueError:
+        return text
+
+def parse_rate_table(html):
+    """
+    Extracts every product row from the mortgage rates page HTML in one pass.
+
+    Only the <table> fragments are fed to a streaming parser, so the rest of the
+    page (scripts, navigation, articles) is never tokenized. When the fragments
+    hash the same as on the last call, that call's result is reused without
+    parsing. Returns a dict keyed by the row label, e.g.
+    {"30 Yr. Fixed": {"rate": 6.3, "change": -0.02}}.
+    """
+    global _last_table
+    fragments = _TABLE_RE.findall(html) or [html]
+    digest = hashlib.blake2b("".join(fragments).encode("utf-8"), digest_size=16).digest()
+    last = _last_table
+    if last is not None and last[0] == digest:
+        return {label: dict(values) for label, values in last[1].items()}
+
+    parser = _RateTableParser()
+    for fragment in fragments:
+        parser.feed(fragment)
+    parser.close()
+
+    products = {}
+    for row in parser.rows:
+        label, cells = row["th"], row["td"]
+        if not label or not cells or label in products:
+            continue
+        products[label] = {
+            "rate": _to_number(cells[0]),
+            "change": _to_number(cells[1]) if len(cells) > 1 else None,
+        }
+    _last_table = (digest, {label: dict(values) for label, values in products.items()})
+    return products
+
+def _restore_last_table(last):
+    global _last_table
+    _last_table = last
+
+jobstate.register("rate_table", lambda: _last_table, _restore_last_table)
+
+def parse_30yr_rate(html):
+    """
+    Extracts the 30-year fixed rate from the mortgage rates page HTML.
+    """
+    for label, values in parse_rate_table(html).items():
+        if "30 Yr. Fixed" in label:
+            return values["rate"]
     return None
 
-def get_stock_price(ticker):
+class QuoteUnavailable(Exception):
+    """
+    Raised when a Yahoo Finance download comes back without any rows.
+    """
+
+def _is_retryable_quote(error):
+    # yfinance surfaces network trouble through several libraries' exception types,
+    # so retry everything except errors that point at a bug on our side
+    return not isinstance(error, (TypeError, ValueError, KeyError, AttributeError))
+
+def _yahoo_download(tickers, budget=None, deadline=None, **kwargs):
+    """
+    Runs yf.download with retries under the shared Yahoo circuit breaker.
+    Returns None when no rows came back after every attempt.
+    """
+    # yfinance pulls in pandas and numpy, so it is only imported once a job needs it
+    import yfinance as yf
+
+    def attempt():
+        data = yf.download(
+            list(tickers), interval="1d", group_by="column", auto_adjust=True,
+            progress=False, multi_level_index=True, **kwargs
+        )
+        if data is None or data.empty:
+            raise QuoteUnavailable(f"No data returned for {list(tickers)}")
+        return data
+
+    try:
+        return retry_call(
+            attempt, _is_retryable_quote, breaker=get_breaker(YAHOO_BREAKER),
+            budget=budget, deadline=deadline
+        )
+    except QuoteUnavailable:
+        return None
+
+def get_stock_prices(tickers, budget=None, deadline=None):
+    """
+    Fetches the latest closing price for every ticker in one batched download.
+
+    Returns a dict of {symbol: price}; symbols without any data are left out.
+    """
+    data = _yahoo_download(tickers, budget, deadline, period="5d", threads=True)
+    if data is None:
+        return {}
+    closes = data["Close"].ffill().iloc[-1].dropna()
+    return {symbol: float(price) for symbol, price in closes.items()}
+
+def get_price_history(ticker, start, end):
     """
-    Uses yfinance to fetch the current stock closing price for the given ticker.
+    Fetches daily closing prices for [start, end] and returns {"YYYY-MM-DD": price}.
     """
-    stock = yf.Ticker(ticker)
-    data = stock.history(period="1d")
-    if not data.empty:
-        price = data["Close"].iloc[-1]
-        return price
-    else:
-        # Fallback to currentPrice info if historical data is empty.
-        return stock.info.get("currentPrice")
+    # yfinance treats `end` as exclusive
+    end_exclusive = (date.fromisoformat(end) + timedelta(days=1)).isoformat()
+    data = _yahoo_download([ticker], start=start, end=end_exclusive, threads=False)
+    if data is None:
+        return {}
+    closes = data["Close"][ticker].dropna()
+    return {day.strftime("%Y-%m-%d"): float(price) for day, price in closes.items()}
 
 # Created with AI assistance
@@ -0,0 +1,70 @@
+import json
+import logging
+import sys
+import time
+from datetime import datetime
+import src.queries as queries
+import src.storage as storage
+import src.metrics as metrics
+from src.config import STALE_AFTER, SCHEMA_TABLE
+
+logger = logging.getLogger(__name__)
+
+def _created_at():
+    """
+    Returns when the schema was first migrated, as epoch seconds, or None.
+    """
+    with storage.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT MIN(applied_at) FROM {SCHEMA_TABLE}")
+        row = cursor.fetchone()
+    return datetime.fromisoformat(row[0]).timestamp() if row and row[0] else None
+
+def data_age(now=None):
+    """
+    Returns seconds since the newest stored rates row, or None when there is none.
+
+    Read past the query cache, so a standby replica sees the leader's writes at once.
+    """
+    row = queries.latest(use_cache=False)
+    if row is None:
+        return None
+    ts = row["ts"]
+    newest = ts.timestamp() if isinstance(ts, datetime) else float(ts)
+    return (now if now is not None else time.time()) - newest
+
+def readiness(now=None):
+    """
+    Returns (ready, details). Ready means the newest rates row is younger than
+    STALE_AFTER; a database with no rows yet gets the same grace from its creation.
+    """
+    now = now if now is not None else time.time()
+    details = {"stale_after": STALE_AFTER, "last_success": metrics.last_success()}
+    try:
+        age = data_age(now)
+        if age is None:
+            created = _created_at()
+            age = now - created if created is not None else None
+            details["empty"] = True
+    except Exception as e:
+        details["error"] = str(e)
+        return False, details
+    details["data_age_seconds"] = age
+    return age is not None and age <= STALE_AFTER, details
+
+def main():
+    """
+    Exit status 0 when ready, 1 otherwise; used by the container HEALTHCHECK.
+    """
+    try:
+        ready, details = readiness()
+    finally:
+        storage.close_connections()
+    print(json.dumps({"ready": ready, **details}))
+    sys.exit(0 if ready else 1)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    main()
+
+# Created with AI assistance
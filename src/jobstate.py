@@ -0,0 +1,34 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# {name: (snapshot, restore)} of module state a job leaves for the next run
+_handlers = {}
+
+def register(name, snapshot, restore):
+    """
+    Registers state carried between jobs: snapshot() returns it as picklable
+    values and restore(values) puts it back in a fresh process.
+    """
+    _handlers[name] = (snapshot, restore)
+
+def snapshot():
+    """
+    Returns {name: values} for every registered piece of state.
+    """
+    return {name: take() for name, (take, _) in _handlers.items()}
+
+def restore(state):
+    """
+    Puts back the state of an earlier snapshot(); pieces that fail to load are
+    skipped, so a job never fails over state it could rebuild.
+    """
+    for name, values in (state or {}).items():
+        if name not in _handlers:
+            continue
+        try:
+            _handlers[name][1](values)
+        except Exception as e:
+            logger.warning(f"Could not restore the {name} job state: {e}")
+
+# Created with AI assistance
@@ -0,0 +1,151 @@
+import logging
+import pickle
+import sqlite3
+import psycopg
+from apscheduler.job import Job
+from apscheduler.jobstores.base import BaseJobStore, ConflictingIdError, JobLookupError
+from apscheduler.util import datetime_to_utc_timestamp, utc_timestamp_to_datetime
+import src.storage as storage
+
+logger = logging.getLogger(__name__)
+
+class DatabaseJobStore(BaseJobStore):
+    """
+    APScheduler job store kept in the application database, next to the data.
+
+    Works like APScheduler's SQLAlchemy store (pickled job state plus an indexed
+    next_run_time as epoch seconds) but goes through src.storage, so it uses the
+    same SQLite connection or Postgres pool as everything else.
+    """
+    def __init__(self, pickle_protocol=pickle.HIGHEST_PROTOCOL):
+        super().__init__()
+        self.pickle_protocol = pickle_protocol
+
+    def _placeholder(self):
+        return "%s" if storage.USE_POSTGRES else "?"
+
+    def lookup_job(self, job_id):
+        with storage.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT job_state FROM {storage.JOBS_TABLE} WHERE id = {self._placeholder()}",
+                (job_id,)
+            )
+            row = cursor.fetchone()
+        return self._reconstitute_job(row[0]) if row else None
+
+    def get_due_jobs(self, now):
+        return self._get_jobs(
+            f"next_run_time <= {self._placeholder()}", (datetime_to_utc_timestamp(now),)
+        )
+
+    def get_next_run_time(self):
+        with storage.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT next_run_time FROM {storage.JOBS_TABLE} "
+                f"WHERE next_run_time IS NOT NULL ORDER BY next_run_time LIMIT 1"
+            )
+            row = cursor.fetchone()
+        return utc_timestamp_to_datetime(row[0]) if row else None
+
+    def stored_next_run_time(self, job_id):
+        """
+        Returns a stored job's next run time without unpickling it, or None.
+
+        Lets the scheduler re-register a job at startup while keeping a run time
+        that passed while the process was down, so the missed run is caught up.
+        """
+        with storage.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT next_run_time FROM {storage.JOBS_TABLE} WHERE id = {self._placeholder()}",
+                (job_id,)
+            )
+            row = cursor.fetchone()
+        return utc_timestamp_to_datetime(row[0]) if row and row[0] is not None else None
+
+    def get_all_jobs(self):
+        jobs = self._get_jobs()
+        self._fix_paused_jobs_sorting(jobs)
+        return jobs
+
+    def add_job(self, job):
+        ph = self._placeholder()
+        with storage.connection() as conn:
+            try:
+                conn.cursor().execute(
+                    f"INSERT INTO {storage.JOBS_TABLE} (id, next_run_time, job_state) "
+                    f"VALUES ({ph}, {ph}, {ph})",
+                    (job.id, datetime_to_utc_timestamp(job.next_run_time), self._dump(job))
+                )
+            except (sqlite3.IntegrityError, psycopg.IntegrityError):
+                conn.rollback()
+                raise ConflictingIdError(job.id)
+            conn.commit()
+
+    def update_job(self, job):
+        ph = self._placeholder()
+        with storage.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"UPDATE {storage.JOBS_TABLE} SET next_run_time = {ph}, job_state = {ph} "
+                f"WHERE id = {ph}",
+                (datetime_to_utc_timestamp(job.next_run_time), self._dump(job), job.id)
+            )
+            conn.commit()
+            if cursor.rowcount == 0:
+                raise JobLookupError(job.id)
+
+    def remove_job(self, job_id):
+        with storage.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"DELETE FROM {storage.JOBS_TABLE} WHERE id = {self._placeholder()}", (job_id,)
+            )
+            conn.commit()
+            if cursor.rowcount == 0:
+                raise JobLookupError(job_id)
+
+    def remove_all_jobs(self):
+        with storage.connection() as conn:
+            conn.cursor().execute(f"DELETE FROM {storage.JOBS_TABLE}")
+            conn.commit()
+
+    def _dump(self, job):
+        return pickle.dumps(job.__getstate__(), self.pickle_protocol)
+
+    def _reconstitute_job(self, job_state):
+        state = pickle.loads(bytes(job_state))
+        state["jobstore"] = self
+        job = Job.__new__(Job)
+        job.__setstate__(state)
+        job._scheduler = self._scheduler
+        job._jobstore_alias = self._alias
+        return job
+
+    def _get_jobs(self, condition=None, params=()):
+        where = f"WHERE {condition} " if condition else ""
+        with storage.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT id, job_state FROM {storage.JOBS_TABLE} {where}ORDER BY next_run_time",
+                params
+            )
+            rows = cursor.fetchall()
+
+        jobs, failed = [], []
+        for job_id, job_state in rows:
+            try:
+                jobs.append(self._reconstitute_job(job_state))
+            except Exception:
+                logger.exception(f"Unable to restore job {job_id} -- removing it")
+                failed.append(job_id)
+        for job_id in failed:
+            self.remove_job(job_id)
+        return jobs
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} (table={storage.JOBS_TABLE})>"
+
+# Created with AI assistance
@@ -0,0 +1,72 @@
+import logging
+import psycopg
+import src.storage as storage
+from src.config import LEADER_LOCK_KEY, LEADER_RETRY
+
+logger = logging.getLogger(__name__)
+
+# Missed leader checks after which Postgres ends the lock session, so a leader cut off
+# from the database releases the lock without waiting for TCP to notice
+SESSION_TIMEOUT_CHECKS = 3
+
+class LeaderLock:
+    """
+    Postgres session advisory lock on a dedicated connection; the replica holding
+    it is the leader until that connection closes.
+
+    With SQLite there is only ever one process writing, so it always leads.
+    """
+    def __init__(self, key=LEADER_LOCK_KEY, retry=LEADER_RETRY):
+        self.key = key
+        self.retry = retry
+        self.held = False
+        self._conn = None
+
+    def _connect(self):
+        conn = storage.get_connection()
+        conn.autocommit = True
+        try:
+            timeout_ms = int(self.retry * SESSION_TIMEOUT_CHECKS * 1000)
+            conn.execute(f"SET idle_session_timeout = {timeout_ms}")
+        except psycopg.Error:
+            # Before PostgreSQL 14 a dead leader is only noticed by TCP keepalives
+            pass
+        return conn
+
+    def check(self):
+        """
+        Returns whether this process leads: takes the lock when it is free and,
+        when already held, confirms the lock connection still works.
+
+        Never raises; a database error counts as not leading.
+        """
+        if not storage.USE_POSTGRES:
+            return True
+        try:
+            if self._conn is None or self._conn.closed:
+                self.held = False
+                self._conn = self._connect()
+            if self.held:
+                self._conn.execute("SELECT 1")
+            else:
+                self.held = bool(self._conn.execute(
+                    "SELECT pg_try_advisory_lock(%s)", (self.key,)
+                ).fetchone()[0])
+        except psycopg.Error as e:
+            logger.warning(f"Leader lock connection failed: {e}")
+            self.close()
+        return self.held
+
+    def close(self):
+        """
+        Gives up the lock by closing its connection.
+        """
+        self.held = False
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except psycopg.Error:
+                pass
+            self._conn = None
+
+# Created with AI assistance
@@ -0,0 +1,160 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Stages of one fetch_and_store_data run, in order
+STAGES = ("ping", "scrape", "quote", "persist", "alert")
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PREFIX = "mortgage_monitor"
+
+class Histogram:
+    """
+    Cumulative-bucket histogram in the Prometheus style.
+    """
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+# In-process state; job_runs in the database keeps the history across restarts
+_lock = threading.Lock()
+_durations = {}
+_results = {}
+_last_success = {}
+# List collecting observations while recording() is active, e.g. in a job worker
+_journal = None
+
+def reset():
+    """
+    Forgets every recorded observation.
+    """
+    with _lock:
+        _durations.clear()
+        _results.clear()
+        _last_success.clear()
+
+def observe(stage, seconds, success=True, when=None):
+    """
+    Records one stage (or whole "job") duration and its outcome.
+
+    `when` is the epoch time of the observation, now unless given.
+    """
+    when = time.time() if when is None else when
+    with _lock:
+        _durations.setdefault(stage, Histogram()).observe(seconds)
+        key = (stage, "success" if success else "failure")
+        _results[key] = _results.get(key, 0) + 1
+        if success:
+            _last_success[stage] = max(when, _last_success.get(stage, when))
+        if _journal is not None:
+            _journal.append((stage, seconds, success, when))
+
+@contextmanager
+def recording():
+    """
+    Collects the observations made in the block as (stage, seconds, success, when)
+    tuples, so a job worker can send them to the parent process for replay().
+    """
+    global _journal
+    journal = []
+    with _lock:
+        _journal = journal
+    try:
+        yield journal
+    finally:
+        with _lock:
+            _journal = None
+
+def replay(observations):
+    """
+    Records observations collected by recording() in another process.
+    """
+    for stage, seconds, success, when in observations:
+        observe(stage, seconds, success, when)
+
+@contextmanager
+def timed(stage, stages=None):
+    """
+    Times the block as `stage`, counting it as failed if it raises.
+
+    The duration is also stored in the `stages` dict when one is given; a stage run
+    more than once per job (e.g. one ping per rate provider) keeps the slowest.
+    """
+    start = time.perf_counter()
+    success = False
+    try:
+        yield
+        success = True
+    finally:
+        elapsed = time.perf_counter() - start
+        if stages is not None:
+            stages[stage] = max(elapsed, stages.get(stage, 0.0))
+        observe(stage, elapsed, success)
+
+def last_success(stage="job"):
+    """
+    Returns the epoch seconds of the last successful `stage`, or None.
+    """
+    with _lock:
+        return _last_success.get(stage)
+
+def _format(value):
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+def render(gauges=None):
+    """
+    Returns every metric in the Prometheus text exposition format.
+
+    `gauges` adds extra {name: value} samples computed by the caller.
+    """
+    with _lock:
+        durations = {stage: (list(h.counts), h.sum, h.count, h.buckets)
+                     for stage, h in _durations.items()}
+        results = dict(_results)
+        last = dict(_last_success)
+
+    lines = [
+        f"# HELP {PREFIX}_stage_duration_seconds Duration of each job stage.",
+        f"# TYPE {PREFIX}_stage_duration_seconds histogram",
+    ]
+    for stage, (counts, total, count, buckets) in sorted(durations.items()):
+        for bound, bucket_count in zip(buckets, counts):
+            lines.append(
+                f'{PREFIX}_stage_duration_seconds_bucket{{stage="{stage}",le="{_format(bound)}"}} '
+                f"{bucket_count}"
+            )
+        lines.append(f'{PREFIX}_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+        lines.append(f'{PREFIX}_stage_duration_seconds_sum{{stage="{stage}"}} {_format(total)}')
+        lines.append(f'{PREFIX}_stage_duration_seconds_count{{stage="{stage}"}} {count}')
+
+    lines += [
+        f"# HELP {PREFIX}_stage_runs_total Stage runs by result.",
+        f"# TYPE {PREFIX}_stage_runs_total counter",
+    ]
+    for (stage, result), count in sorted(results.items()):
+        lines.append(f'{PREFIX}_stage_runs_total{{stage="{stage}",result="{result}"}} {count}')
+
+    lines += [
+        f"# HELP {PREFIX}_last_success_timestamp_seconds Time of the last successful stage run.",
+        f"# TYPE {PREFIX}_last_success_timestamp_seconds gauge",
+    ]
+    for stage, when in sorted(last.items()):
+        lines.append(f'{PREFIX}_last_success_timestamp_seconds{{stage="{stage}"}} {_format(when)}')
+
+    for name, value in sorted((gauges or {}).items()):
+        if value is None:
+            continue
+        lines.append(f"# TYPE {PREFIX}_{name} gauge")
+        lines.append(f"{PREFIX}_{name} {_format(value)}")
+    return "\n".join(lines) + "\n"
+
+# Created with AI assistance
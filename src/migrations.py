@@ -0,0 +1,337 @@
+import argparse
+import logging
+from datetime import datetime, timezone
+import src.storage as storage
+from src.config import SCHEMA_TABLE, MIGRATION_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+def _placeholder():
+    return "%s" if storage.USE_POSTGRES else "?"
+
+def _has_column(conn, table, column):
+    """
+    Checks whether `table` already has `column`, so interrupted migrations can resume.
+    """
+    cursor = conn.cursor()
+    if storage.USE_POSTGRES:
+        cursor.execute(
+            "SELECT 1 FROM information_schema.columns "
+            "WHERE table_name = %s AND column_name = %s",
+            (table, column)
+        )
+        return cursor.fetchone() is not None
+    cursor.execute(f"PRAGMA table_info({table})")
+    return any(row[1] == column for row in cursor.fetchall())
+
+def _baseline(conn, chunk_size):
+    """
+    Version 1: the original rates and quotes tables.
+    """
+    cursor = conn.cursor()
+    key = "SERIAL PRIMARY KEY" if storage.USE_POSTGRES else "INTEGER PRIMARY KEY AUTOINCREMENT"
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {storage.TABLE_NAME} (
+            id              {key},
+            timestamp       TEXT    NOT NULL,
+            mortgage_rate   REAL,
+            mbb_price       REAL
+        );
+    """)
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {storage.QUOTES_TABLE} (
+            id              {key},
+            timestamp       TEXT    NOT NULL,
+            symbol          TEXT    NOT NULL,
+            price           REAL
+        );
+    """)
+
+def _fill_ts(conn, table, chunk_size):
+    """
+    Populates `ts` from the legacy TEXT timestamp, one committed chunk at a time.
+    """
+    cursor = conn.cursor()
+    ph = _placeholder()
+    last_id, filled = 0, 0
+    while True:
+        cursor.execute(
+            f"SELECT id, timestamp FROM {table} "
+            f"WHERE id > {ph} AND ts IS NULL ORDER BY id LIMIT {ph}",
+            (last_id, chunk_size)
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        updates = []
+        for row_id, text in rows:
+            try:
+                updates.append((storage.to_db_time(text), row_id))
+            except ValueError:
+                logger.warning(f"Leaving ts empty for {table}.id={row_id}: unparseable timestamp {text!r}")
+        cursor.executemany(f"UPDATE {table} SET ts = {ph} WHERE id = {ph}", updates)
+        conn.commit()
+        last_id = rows[-1][0]
+        filled += len(updates)
+    logger.info(f"Converted {filled} timestamps in {table}")
+
+def _typed_timestamps(conn, chunk_size):
+    """
+    Version 2: typed `ts` column (TIMESTAMPTZ / epoch seconds), a `source` column
+    on the rates table, and indexes for time-range and per-source lookups.
+    """
+    cursor = conn.cursor()
+    ts_type = "TIMESTAMPTZ" if storage.USE_POSTGRES else "INTEGER"
+    for table in (storage.TABLE_NAME, storage.QUOTES_TABLE):
+        if not _has_column(conn, table, "ts"):
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN ts {ts_type}")
+    if not _has_column(conn, storage.TABLE_NAME, "source"):
+        cursor.execute(
+            f"ALTER TABLE {storage.TABLE_NAME} ADD COLUMN source TEXT NOT NULL DEFAULT 'mnd'"
+        )
+    conn.commit()
+
+    for table in (storage.TABLE_NAME, storage.QUOTES_TABLE):
+        _fill_ts(conn, table, chunk_size)
+
+    rates, quotes = storage.TABLE_NAME, storage.QUOTES_TABLE
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{rates}_ts ON {rates} (ts)")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{rates}_source_ts ON {rates} (source, ts)")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{quotes}_symbol_ts ON {quotes} (symbol, ts)")
+
+def _job_runs(conn, chunk_size):
+    """
+    Version 3: one row per job run with its outcome and per-stage durations.
+    """
+    cursor = conn.cursor()
+    key = "SERIAL PRIMARY KEY" if storage.USE_POSTGRES else "INTEGER PRIMARY KEY AUTOINCREMENT"
+    ts_type = "TIMESTAMPTZ" if storage.USE_POSTGRES else "INTEGER"
+    flag_type = "BOOLEAN" if storage.USE_POSTGRES else "INTEGER"
+    table = storage.JOB_RUNS_TABLE
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            id              {key},
+            ts              {ts_type} NOT NULL,
+            job             TEXT    NOT NULL,
+            success         {flag_type} NOT NULL,
+            duration        REAL    NOT NULL,
+            ping            REAL,
+            scrape          REAL,
+            quote           REAL,
+            persist         REAL,
+            error           TEXT
+        );
+    """)
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_ts ON {table} (ts)")
+
+def _job_store(conn, chunk_size):
+    """
+    Version 4: the scheduler's persistent job store (see src.jobstore).
+    """
+    cursor = conn.cursor()
+    blob_type = "BYTEA" if storage.USE_POSTGRES else "BLOB"
+    table = storage.JOBS_TABLE
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            id              VARCHAR(191) PRIMARY KEY,
+            next_run_time   DOUBLE PRECISION,
+            job_state       {blob_type} NOT NULL
+        );
+    """)
+    cursor.execute(
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_next_run_time ON {table} (next_run_time)"
+    )
+
+def _provider_rates(conn, chunk_size):
+    """
+    Version 5: each rate provider's value, next to the consensus in the rates table.
+    """
+    cursor = conn.cursor()
+    key = "SERIAL PRIMARY KEY" if storage.USE_POSTGRES else "INTEGER PRIMARY KEY AUTOINCREMENT"
+    ts_type = "TIMESTAMPTZ" if storage.USE_POSTGRES else "INTEGER"
+    table = storage.PROVIDER_RATES_TABLE
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            id              {key},
+            timestamp       TEXT    NOT NULL,
+            ts              {ts_type} NOT NULL,
+            provider        TEXT    NOT NULL,
+            rate            REAL    NOT NULL
+        );
+    """)
+    cursor.execute(
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_provider_ts ON {table} (provider, ts)"
+    )
+
+def _analytics(conn, chunk_size):
+    """
+    Version 6: derived metrics per rates row, maintained by src.analytics.
+    """
+    cursor = conn.cursor()
+    key = "SERIAL PRIMARY KEY" if storage.USE_POSTGRES else "INTEGER PRIMARY KEY AUTOINCREMENT"
+    ts_type = "TIMESTAMPTZ" if storage.USE_POSTGRES else "INTEGER"
+    table = storage.ANALYTICS_TABLE
+    metrics = ",\n".join(
+        f"            {series}_{stat} REAL"
+        for series in ("rate", "mbb", "spread")
+        for stat in ("ma7", "ma30", "ma90", "vol30", "z30")
+    )
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            id              {key},
+            rate_id         INTEGER NOT NULL,
+            timestamp       TEXT    NOT NULL,
+            ts              {ts_type} NOT NULL,
+            mortgage_rate   REAL,
+            mbb_price       REAL,
+            spread          REAL,
+{metrics}
+        );
+    """)
+    cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_rate_id ON {table} (rate_id)")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_ts ON {table} (ts)")
+
+def _alerts(conn, chunk_size):
+    """
+    Version 7: fired alerts, which also carry each rule's cooldown across restarts.
+    """
+    cursor = conn.cursor()
+    key = "SERIAL PRIMARY KEY" if storage.USE_POSTGRES else "INTEGER PRIMARY KEY AUTOINCREMENT"
+    ts_type = "TIMESTAMPTZ" if storage.USE_POSTGRES else "INTEGER"
+    flag_type = "BOOLEAN" if storage.USE_POSTGRES else "INTEGER"
+    table = storage.ALERTS_TABLE
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            id              {key},
+            timestamp       TEXT    NOT NULL,
+            ts              {ts_type} NOT NULL,
+            rule            TEXT    NOT NULL,
+            series          TEXT    NOT NULL,
+            value           REAL,
+            message         TEXT    NOT NULL,
+            delivered       {flag_type} NOT NULL
+        );
+    """)
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_rule_ts ON {table} (rule, ts)")
+
+def _unique_samples(conn, chunk_size):
+    """
+    Version 8: one row per sample. Duplicate rates rows (same ts and source),
+    quotes (ts, symbol) and provider rates (ts, provider) are removed, keeping
+    the first stored, and unique indexes let writes upsert on those keys.
+    """
+    cursor = conn.cursor()
+    keys = (
+        (storage.TABLE_NAME, "source"),
+        (storage.QUOTES_TABLE, "symbol"),
+        (storage.PROVIDER_RATES_TABLE, "provider"),
+    )
+    for table, column in keys:
+        cursor.execute(
+            f"DELETE FROM {table} WHERE ts IS NOT NULL AND EXISTS ("
+            f"SELECT 1 FROM {table} older WHERE older.ts = {table}.ts "
+            f"AND older.{column} = {table}.{column} AND older.id < {table}.id)"
+        )
+        if cursor.rowcount:
+            logger.info(f"Removed {cursor.rowcount} duplicate rows from {table}")
+        cursor.execute(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_ts_{column}_unique "
+            f"ON {table} (ts, {column})"
+        )
+    # Derived rows of removed duplicates
+    cursor.execute(
+        f"DELETE FROM {storage.ANALYTICS_TABLE} "
+        f"WHERE rate_id NOT IN (SELECT id FROM {storage.TABLE_NAME})"
+    )
+
+def _revisions(conn, chunk_size):
+    """
+    Version 9: a revision on rates rows, drawn again whenever an upsert rewrites
+    a row with other values, and on each analytics row the revision it was
+    computed from. Rows that were never rewritten keep a NULL revision.
+    """
+    cursor = conn.cursor()
+    rates, table = storage.TABLE_NAME, storage.ANALYTICS_TABLE
+    if storage.USE_POSTGRES:
+        cursor.execute(f"CREATE SEQUENCE IF NOT EXISTS {rates}_revision_seq")
+    for name, column in ((rates, "revision"), (table, "rate_revision")):
+        if not _has_column(conn, name, column):
+            cursor.execute(f"ALTER TABLE {name} ADD COLUMN {column} BIGINT")
+    cursor.execute(
+        f"CREATE INDEX IF NOT EXISTS idx_{rates}_revision ON {rates} (revision) "
+        f"WHERE revision IS NOT NULL"
+    )
+
+# Ordered (version, description, step) entries; append new migrations to the end
+MIGRATIONS = [
+    (1, "baseline rates and quotes tables", _baseline),
+    (2, "typed timestamps, source column and indexes", _typed_timestamps),
+    (3, "job_runs table", _job_runs),
+    (4, "scheduler job store", _job_store),
+    (5, "provider_rates table", _provider_rates),
+    (6, "analytics table", _analytics),
+    (7, "alerts table", _alerts),
+    (8, "unique samples per time and source", _unique_samples),
+    (9, "revisions of rewritten rates rows", _revisions),
+]
+
+def current_version(conn):
+    """
+    Returns the highest applied schema version, or 0 for a database never migrated.
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT MAX(version) FROM {SCHEMA_TABLE}")
+    row = cursor.fetchone()
+    return row[0] if row and row[0] is not None else 0
+
+def migrate(conn, chunk_size=MIGRATION_CHUNK_SIZE):
+    """
+    Applies every pending migration in order and records each applied version.
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {SCHEMA_TABLE} (
+            version         INTEGER PRIMARY KEY,
+            applied_at      TEXT    NOT NULL
+        );
+    """)
+    conn.commit()
+
+    version = current_version(conn)
+    ph = _placeholder()
+    for number, description, step in MIGRATIONS:
+        if number <= version:
+            continue
+        logger.info(f"Applying schema migration {number} -- {description}")
+        step(conn, chunk_size)
+        cursor.execute(
+            f"INSERT INTO {SCHEMA_TABLE} (version, applied_at) VALUES ({ph}, {ph})",
+            (number, datetime.now(timezone.utc).isoformat())
+        )
+        conn.commit()
+        version = number
+    return version
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migrate the database schema in place.")
+    parser.add_argument("--chunk-size", type=int, default=MIGRATION_CHUNK_SIZE,
+                        help="Rows converted per committed chunk")
+    parser.add_argument("--status", action="store_true",
+                        help="Only print the current schema version")
+    args = parser.parse_args(argv)
+
+    try:
+        with storage.connection() as conn:
+            if args.status:
+                logger.info(f"Schema version {current_version(conn)} of {MIGRATIONS[-1][0]}")
+                return
+            version = migrate(conn, args.chunk_size)
+            logger.info(f"Schema is at version {version}")
+    finally:
+        storage.close_connections()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
+
+# Created with AI assistance
@@ -0,0 +1,100 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from src.config import SOURCE_WORKERS
+
+# Seconds between checks for queued sources that have started, so their own
+# timeouts are enforced from their start
+QUEUE_POLL = 0.05
+
+class SourceTimeout(Exception):
+    """
+    Raised in place of a result when a source misses its timeout or the job deadline.
+    """
+
+def run_sources(sources, timeouts, deadline):
+    """
+    Runs each source callable concurrently and collects whatever finishes in time.
+
+    `sources` maps a name to a zero-argument callable and `timeouts` maps the same
+    names to per-source limits in seconds, counted from when the source starts
+    running. No source is waited on past `deadline` seconds from the start. Returns
+    (results, errors, timings), each keyed by source name; a source appears in
+    exactly one of results or errors.
+
+    Every call gets its own pool of up to SOURCE_WORKERS threads, so concurrent jobs
+    never queue behind each other's sources. A source that overruns keeps its thread
+    until the underlying call returns, but never holds up the caller.
+    """
+    start = time.monotonic()
+    job_cutoff = start + deadline
+    started = {}
+
+    def cutoff(name):
+        begun = started.get(name)
+        if begun is None:
+            return job_cutoff
+        return min(begun + timeouts.get(name, deadline), job_cutoff)
+
+    executor = ThreadPoolExecutor(
+        max_workers=max(1, min(len(sources), SOURCE_WORKERS)), thread_name_prefix="source"
+    )
+    futures = {
+        executor.submit(_timed, func, name, started): name for name, func in sources.items()
+    }
+
+    results, errors, timings = {}, {}, {}
+    pending = set(futures)
+    try:
+        while pending:
+            now = time.monotonic()
+            for future in [f for f in pending if cutoff(futures[f]) <= now]:
+                name = futures[future]
+                future.cancel()
+                pending.discard(future)
+                begun = started.get(name)
+                if begun is None:
+                    timings[name] = 0.0
+                    errors[name] = SourceTimeout(
+                        f"{name} did not start within the {deadline:.1f}s deadline"
+                    )
+                else:
+                    timings[name] = now - begun
+                    errors[name] = SourceTimeout(
+                        f"{name} did not finish within {cutoff(name) - begun:.1f}s"
+                    )
+            if not pending:
+                break
+
+            wake = min(cutoff(futures[f]) for f in pending) - now
+            if any(futures[f] not in started for f in pending):
+                wake = min(wake, QUEUE_POLL)
+            done, pending = wait(pending, timeout=wake, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = futures[future]
+                try:
+                    results[name], timings[name] = future.result()
+                except _SourceFailed as e:
+                    errors[name], timings[name] = e.error, e.elapsed
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return results, errors, timings
+
+class _SourceFailed(Exception):
+    def __init__(self, error, elapsed):
+        super().__init__(str(error))
+        self.error = error
+        self.elapsed = elapsed
+
+def _timed(func, name, started):
+    """
+    Calls func and returns (result, elapsed seconds), measured in the worker thread
+    from the start time it records in `started`.
+    """
+    start = started[name] = time.monotonic()
+    try:
+        result = func()
+    except Exception as e:
+        raise _SourceFailed(e, time.monotonic() - start)
+    return result, time.monotonic() - start
+
+# Created with AI assistance
@@ -0,0 +1,187 @@
+import threading
+import time
+from collections import OrderedDict
+import src.storage as storage
+from src.config import READ_CACHE_SIZE, READ_CACHE_TTL
+
+RATE_COLUMNS = ["mortgage_rate", "mbb_price"]
+
+# LRU of (loaded_at, result), cleared whenever storage reports a write in this process
+# and expiring after READ_CACHE_TTL for writes made by other processes
+_cache = OrderedDict()
+_cache_version = None
+_cache_lock = threading.Lock()
+
+def clear_cache():
+    """
+    Drops every cached query result.
+    """
+    with _cache_lock:
+        _cache.clear()
+
+def cached(key, loader):
+    """
+    Returns the cached result for `key`, calling `loader` on a miss.
+
+    Any write recorded by src.storage since the last lookup empties the cache first.
+    Writes by other processes, such as the leader replica, are not counted there,
+    so a result is also reloaded once it is READ_CACHE_TTL seconds old.
+    """
+    global _cache_version
+    version = storage.data_version()
+    now = time.monotonic()
+    with _cache_lock:
+        if _cache_version != version:
+            _cache.clear()
+            _cache_version = version
+        if key in _cache:
+            loaded_at, result = _cache[key]
+            if now - loaded_at < READ_CACHE_TTL:
+                _cache.move_to_end(key)
+                return result
+            del _cache[key]
+
+    result = loader()
+    with _cache_lock:
+        # Only keep the result if no write landed while it was loading
+        if _cache_version == version:
+            _cache[key] = (now, result)
+            while len(_cache) > READ_CACHE_SIZE:
+                _cache.popitem(last=False)
+    return result
+
+def _bound(value):
+    """
+    Converts a range bound (string, datetime or None) to a typed `ts` value.
+    """
+    if value is None:
+        return None
+    return storage.to_db_time(value)
+
+def _load_frame(start, end):
+    """
+    Runs an indexed range query and builds the frame from the fetched rows in one step.
+    """
+    # pandas is imported on first read so the scheduler process starts without it
+    import pandas as pd
+
+    placeholder = "%s" if storage.USE_POSTGRES else "?"
+    clauses, params = [], []
+    if start is not None:
+        clauses.append(f"ts >= {placeholder}")
+        params.append(_bound(start))
+    if end is not None:
+        clauses.append(f"ts < {placeholder}")
+        params.append(_bound(end))
+    where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+    sql = (
+        f"SELECT ts, {', '.join(RATE_COLUMNS)} FROM {storage.TABLE_NAME} "
+        f"{where}ORDER BY ts"
+    )
+    with storage.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    frame = pd.DataFrame.from_records(rows, columns=["ts"] + RATE_COLUMNS, coerce_float=True)
+    unit = None if storage.USE_POSTGRES else "s"
+    frame.index = pd.to_datetime(frame.pop("ts"), unit=unit, utc=True)
+    frame.index.name = "ts"
+    return frame.astype("float64")
+
+def latest(use_cache=True):
+    """
+    Returns the most recent row as a dict, or None when the table is empty.
+
+    Legacy rows whose text timestamp could not be migrated keep a NULL ts and are
+    skipped; Postgres would otherwise sort them first. Without `use_cache` the
+    row is read from the database.
+    """
+    def load():
+        sql = (
+            f"SELECT timestamp, ts, {', '.join(RATE_COLUMNS)} FROM {storage.TABLE_NAME} "
+            f"WHERE ts IS NOT NULL ORDER BY ts DESC LIMIT 1"
+        )
+        with storage.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql)
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        return dict(zip(["timestamp", "ts"] + RATE_COLUMNS, row))
+
+    result = cached(("latest",), load) if use_cache else load()
+    return dict(result) if result is not None else None
+
+def latest_quotes():
+    """
+    Returns the most recent stored price of every symbol as {symbol: price}.
+    """
+    def load():
+        sql = (
+            f"SELECT q.symbol, q.price FROM {storage.QUOTES_TABLE} q "
+            f"JOIN (SELECT symbol, MAX(ts) AS ts FROM {storage.QUOTES_TABLE} "
+            f"GROUP BY symbol) newest "
+            f"ON q.symbol = newest.symbol AND q.ts = newest.ts"
+        )
+        with storage.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql)
+            return {symbol: float(price) for symbol, price in cursor.fetchall()}
+
+    return dict(cached(("latest_quotes",), load))
+
+def get_range(start=None, end=None):
+    """
+    Returns rows with start <= ts < end as a DataFrame indexed by UTC time.
+
+    Bounds may be ISO strings or datetimes; naive values are read in LOCAL_TZ.
+    """
+    key = ("range", _bound(start), _bound(end))
+    return cached(key, lambda: _load_frame(start, end)).copy()
+
+def get_arrays(start=None, end=None):
+    """
+    Returns (epoch_seconds, {column: float64 array}) for the same window as get_range.
+    """
+    frame = get_range(start, end)
+    seconds = frame.index.asi8 // 1_000_000_000
+    return seconds, {column: frame[column].to_numpy() for column in RATE_COLUMNS}
+
+def resample(freq, start=None, end=None, how="mean"):
+    """
+    Rolls rows up to `freq` buckets (any pandas offset alias, e.g. "1D", "1W").
+    """
+    key = ("resample", freq, how, _bound(start), _bound(end))
+    def load():
+        return getattr(_load_frame(start, end).resample(freq), how)().dropna(how="all")
+    return cached(key, load).copy()
+
+def summary(start=None, end=None):
+    """
+    Returns count, mean, std, min, max and last value for each column in the window.
+    """
+    key = ("summary", _bound(start), _bound(end))
+    def load():
+        import numpy as np
+        frame = _load_frame(start, end)
+        stats = {}
+        for column in RATE_COLUMNS:
+            values = frame[column].to_numpy()
+            values = values[~np.isnan(values)]
+            if values.size == 0:
+                stats[column] = {"count": 0, "mean": None, "std": None,
+                                 "min": None, "max": None, "last": None}
+                continue
+            stats[column] = {
+                "count": int(values.size),
+                "mean": float(values.mean()),
+                "std": float(values.std(ddof=1)) if values.size > 1 else 0.0,
+                "min": float(values.min()),
+                "max": float(values.max()),
+                "last": float(values[-1]),
+            }
+        return stats
+    return {column: dict(values) for column, values in cached(key, load).items()}
+
+# Created with AI assistance
@@ -0,0 +1,128 @@
+import logging
+import time
+from urllib.parse import quote
+from src.config import QUOTE_PROVIDERS, QUOTE_CHART_URL, QUOTE_TIMEOUT
+from src.fetch import fetch_page, get_stock_prices
+from src.parallel import run_sources
+
+logger = logging.getLogger(__name__)
+
+# Share of the remaining time a provider gets when others may still follow it, so a
+# slow first provider leaves the fallback time for the symbols it missed
+PROVIDER_SHARE = 0.5
+# get_quotes returns this many seconds before its deadline, so the prices collected so
+# far reach a caller that stops waiting at that deadline
+DEADLINE_MARGIN = 0.25
+
+class ChartProvider:
+    """
+    Reads prices straight from Yahoo's chart JSON: one small request per symbol,
+    up to SOURCE_WORKERS in flight at once, parsed into floats without building a
+    DataFrame.
+    """
+    def __init__(self, base_url=QUOTE_CHART_URL):
+        self.base_url = base_url
+
+    def url(self, symbol):
+        return f"{self.base_url.rstrip('/')}/{quote(symbol, safe='')}?range=5d&interval=1d"
+
+    def price(self, symbol, budget=None, deadline=None):
+        response = fetch_page(self.url(symbol), budget=budget, deadline=deadline)
+        return parse_chart(response.json())
+
+    def prices(self, tickers, budget=None, deadline=None):
+        """
+        Fetches the symbols concurrently; symbols still missing at `deadline` are
+        left out, so one slow symbol does not cost the others.
+        """
+        remaining = QUOTE_TIMEOUT if deadline is None else deadline - time.monotonic()
+        results, errors, _ = run_sources(
+            {
+                symbol: (lambda symbol=symbol: self.price(symbol, budget, deadline))
+                for symbol in tickers
+            },
+            timeouts={},
+            deadline=max(remaining, 0.0),
+        )
+        for symbol, e in errors.items():
+            logger.warning(f"Chart quote for {symbol} failed: {e}")
+        return {symbol: price for symbol, price in results.items() if price is not None}
+
+class YFinanceProvider:
+    """
+    Batched yfinance download; heavier, but kept as the fallback.
+    """
+    def prices(self, tickers, budget=None, deadline=None):
+        return get_stock_prices(tickers, budget=budget, deadline=deadline)
+
+# Providers by name, tried in the order given by QUOTE_PROVIDERS
+PROVIDERS = {"chart": ChartProvider(), "yfinance": YFinanceProvider()}
+
+def parse_chart(payload):
+    """
+    Returns the latest price in a chart response, or None when it carries none.
+
+    Uses the regular market price, else the last non-empty daily close.
+    """
+    try:
+        result = payload["chart"]["result"][0]
+    except (KeyError, IndexError, TypeError):
+        raise ValueError(f"Unexpected chart response: {str(payload)[:200]}")
+    price = (result.get("meta") or {}).get("regularMarketPrice")
+    if price is None:
+        try:
+            closes = result["indicators"]["quote"][0]["close"]
+        except (KeyError, IndexError, TypeError):
+            return None
+        price = next((close for close in reversed(closes) if close is not None), None)
+    return float(price) if price is not None else None
+
+def _ask(provider, symbols, budget, cutoff):
+    """
+    Calls provider.prices, waiting no longer than the monotonic `cutoff` when given.
+    """
+    if cutoff is None:
+        return provider.prices(symbols, budget=budget)
+    results, errors, _ = run_sources(
+        {"prices": lambda: provider.prices(symbols, budget=budget, deadline=cutoff)},
+        timeouts={},
+        deadline=cutoff - time.monotonic(),
+    )
+    if "prices" in errors:
+        raise errors["prices"]
+    return results["prices"]
+
+def get_quotes(tickers, budget=None, deadline=None, providers=None):
+    """
+    Fetches the latest price for every ticker, asking each provider in turn for
+    the symbols the previous ones did not return.
+
+    With a `deadline`, every provider but the last gets PROVIDER_SHARE of the time
+    left and no provider is waited on past the deadline, so the prices already
+    collected are returned even when a provider hangs.
+
+    Returns {symbol: price}; raises the last provider error if nothing came back.
+    """
+    names = providers or QUOTE_PROVIDERS
+    prices, error = {}, None
+    for i, name in enumerate(names):
+        missing = [symbol for symbol in tickers if symbol not in prices]
+        if not missing:
+            break
+        cutoff = None
+        if deadline is not None:
+            now = time.monotonic()
+            remaining = deadline - DEADLINE_MARGIN - now
+            if remaining <= 0:
+                break
+            cutoff = now + (remaining * PROVIDER_SHARE if i < len(names) - 1 else remaining)
+        try:
+            prices.update(_ask(PROVIDERS[name], missing, budget, cutoff))
+        except Exception as e:
+            logger.warning(f"Quote provider {name} failed for {missing}: {e}")
+            error = e
+    if not prices and error is not None:
+        raise error
+    return prices
+
+# Created with AI assistance
@@ -0,0 +1,131 @@
+import csv
+import logging
+import statistics
+import threading
+import time
+from src.config import mortgage_url, RATE_PROVIDERS, RATE_TTLS, FREDDIE_MAC_URL
+from src import jobstate
+from src.fetch import fetch_page, parse_30yr_rate
+from src.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+class RateProvider:
+    """
+    One source of the 30-year fixed rate: a page to fetch and a parser for it.
+
+    A value fetched less than `ttl` seconds ago is reused instead of fetching the
+    page again, so slow-moving sources such as weekly surveys are not hit by every run.
+    """
+    def __init__(self, name, url, parse, ttl=0):
+        self.name = name
+        self.url = url
+        self.parse = parse
+        self.ttl = ttl
+        # (rate, time.monotonic() when fetched) of the last successful fetch
+        self._cached = None
+        self._lock = threading.Lock()
+
+    def cached(self):
+        """
+        Returns the last fetched rate while it is younger than the TTL, else None.
+        """
+        with self._lock:
+            if self._cached is None:
+                return None
+            rate, fetched = self._cached
+            return rate if time.monotonic() - fetched < self.ttl else None
+
+    def fetch(self, budget=None, deadline=None, stages=None):
+        """
+        Returns (rate, fresh); fresh is False when the rate came from the cache.
+
+        Raises the fetch error, or ValueError when the page carries no rate.
+        """
+        rate = self.cached()
+        if rate is not None:
+            return rate, False
+        with timed("ping", stages):
+            response = fetch_page(self.url, budget=budget, deadline=deadline, cache=True)
+        logger.info(f"Ping to {self.url} returned status code {response.status_code}")
+        with timed("scrape", stages):
+            rate = self.parse(response.text)
+        if not isinstance(rate, (int, float)):
+            raise ValueError(f"No 30-year fixed rate in the {self.name} response: {rate!r}")
+        with self._lock:
+            self._cached = (rate, time.monotonic())
+        return rate, True
+
+def parse_pmms(text, column="pmms30"):
+    """
+    Returns the newest 30-year fixed rate in Freddie Mac's PMMS history CSV, or None.
+
+    Only the header and the trailing rows are parsed; weeks without a value are skipped.
+    """
+    lines = text.strip().splitlines()
+    if not lines:
+        return None
+    header = next(csv.reader(lines[:1]))
+    try:
+        index = header.index(column)
+    except ValueError:
+        raise ValueError(f"PMMS history has no {column} column: {header}")
+    for row in csv.reader(reversed(lines[1:])):
+        try:
+            return float(row[index])
+        except (IndexError, ValueError):
+            continue
+    return None
+
+# Providers by name; RATE_PROVIDERS picks the ones fetched on each run
+PROVIDERS = {
+    "mnd": RateProvider("mnd", mortgage_url, parse_30yr_rate, RATE_TTLS["mnd"]),
+    "freddiemac": RateProvider("freddiemac", FREDDIE_MAC_URL, parse_pmms, RATE_TTLS["freddiemac"]),
+}
+
+def _provider_caches():
+    return {name: provider._cached for name, provider in PROVIDERS.items() if provider._cached}
+
+def _restore_provider_caches(caches):
+    for name, cached in caches.items():
+        if name in PROVIDERS:
+            with PROVIDERS[name]._lock:
+                PROVIDERS[name]._cached = tuple(cached)
+
+jobstate.register("rate_providers", _provider_caches, _restore_provider_caches)
+
+def get_rate_providers(names=None):
+    """
+    Returns the configured providers, in order.
+    """
+    return [PROVIDERS[name] for name in names or RATE_PROVIDERS]
+
+def consensus(rates):
+    """
+    Returns (rate, source) for {provider: rate}: the median and "consensus", or the
+    only value and its provider when one provider answered; (None, None) for none.
+    """
+    if not rates:
+        return None, None
+    if len(rates) == 1:
+        name, rate = next(iter(rates.items()))
+        return rate, name
+    return statistics.median(rates.values()), "consensus"
+
+def series_rate(rates, primary, use_consensus=False):
+    """
+    Returns (rate, source) for the rates row from {provider: rate}, in provider order.
+
+    By default it is the `primary` provider's value, or when that did not answer the
+    next provider's that did, so the series has no gap; (None, None) when none did.
+    With `use_consensus` it is the consensus() of every answer.
+    """
+    if use_consensus:
+        return consensus(rates)
+    if primary in rates:
+        return rates[primary], primary
+    for name, rate in rates.items():
+        return rate, name
+    return None, None
+
+# Created with AI assistance
@@ -0,0 +1,161 @@
+import logging
+import random
+import threading
+import time
+from src import jobstate
+from src.config import (
+    RETRY_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY,
+    BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT
+)
+
+logger = logging.getLogger(__name__)
+
+class CircuitOpen(Exception):
+    """
+    Raised instead of calling a host whose circuit breaker is open.
+    """
+
+class RetryBudget:
+    """
+    Caps the number of retries (not first attempts) shared by every call in one job.
+    """
+    def __init__(self, retries):
+        self.remaining = retries
+        self._lock = threading.Lock()
+
+    def take(self):
+        """
+        Consumes one retry; returns False once the budget is spent.
+        """
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+class CircuitBreaker:
+    """
+    Stops calls to a failing host after `failure_threshold` consecutive failures.
+
+    After `reset_timeout` seconds one probe call is let through (half-open); its
+    success closes the breaker and its failure re-opens it for another period.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, name, failure_threshold=BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout=BREAKER_RESET_TIMEOUT, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Returns True if a call may go ahead now.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                logger.info(f"Circuit for {self.name} half-open -- sending a probe")
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit for {self.name} closed")
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(
+                        f"Circuit for {self.name} open for {self.reset_timeout:.0f}s "
+                        f"after {self.failures} failures"
+                    )
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(name):
+    """
+    Returns the shared circuit breaker for a host or source name.
+    """
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+def reset_breakers():
+    """
+    Forgets every breaker's state.
+    """
+    with _breakers_lock:
+        _breakers.clear()
+
+def _breaker_states():
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: (breaker.state, breaker.failures, breaker.opened_at) for breaker in breakers}
+
+def _restore_breakers(states):
+    for name, (state, failures, opened_at) in states.items():
+        breaker = get_breaker(name)
+        with breaker._lock:
+            breaker.state, breaker.failures, breaker.opened_at = state, failures, opened_at
+
+# time.monotonic() is one clock for every process on the host, so opened_at carries over
+jobstate.register("breakers", _breaker_states, _restore_breakers)
+
+def backoff_delay(attempt, base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY):
+    """
+    Full-jitter exponential backoff: uniform in [0, min(max_delay, base * 2**attempt)].
+    """
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+def retry_call(func, is_retryable, breaker=None, budget=None, deadline=None,
+               attempts=RETRY_ATTEMPTS, base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY):
+    """
+    Calls func(), retrying retryable failures with jittered exponential backoff.
+
+    Stops early when the breaker is open, the job's retry budget is spent, or the
+    next sleep would pass `deadline` (a time.monotonic() value). Only retryable
+    failures count against the breaker; the last error is re-raised.
+    """
+    for attempt in range(attempts):
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpen(f"Circuit for {breaker.name} is open")
+        try:
+            result = func()
+        except Exception as e:
+            if not is_retryable(e):
+                raise
+            if breaker is not None:
+                breaker.record_failure()
+            if attempt == attempts - 1:
+                raise
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                raise
+            if budget is not None and not budget.take():
+                logger.warning("Retry budget for this job is spent")
+                raise
+            logger.info(f"Attempt {attempt + 1} failed ({e}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+        else:
+            if breaker is not None:
+                breaker.record_success()
+            return result
+
+# Created with AI assistance
@@ -0,0 +1,293 @@
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from src.storage import connection, write_batch
+from src.analytics import refresh as refresh_analytics
+from src.config import SPOOL_FILE, SPOOL_FLUSH_INTERVAL, SPOOL_BATCH_SIZE, SPOOL_MAX_BACKOFF
+
+try:
+    import fcntl
+except ImportError:  # Windows: only one process appends there
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+class Spool:
+    """
+    Append-only, fsync'd NDJSON file that holds writes until the database has them.
+
+    The drained position is kept in a sidecar ".offset" file, replaced atomically
+    after each committed batch. Records are delivered at least once: a crash between
+    a database commit and the offset update replays that batch, which the upserting
+    writes in src.storage leave without effect.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.offset_path = f"{path}.offset"
+        self.lock_path = f"{path}.lock"
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._recover()
+
+    @contextmanager
+    def _file_lock(self):
+        """
+        Holds an exclusive lock on the sidecar ".lock" file, so job worker processes
+        appending to the spool never race the parent truncating it.
+        """
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _recover(self):
+        """
+        Drops a torn final line left by a crash mid-append, so later appends stay parseable.
+        """
+        if not os.path.exists(self.path):
+            return
+        with self._file_lock(), open(self.path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                keep = data.rfind(b"\n") + 1
+                logger.warning(f"Discarding {len(data) - keep} bytes of a torn record in {self.path}")
+                f.truncate(keep)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def append(self, record):
+        """
+        Durably appends one record; returns once it is on disk.
+        """
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode()
+        with self._lock, self._file_lock():
+            with open(self.path, "ab") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _read_offset(self):
+        try:
+            with open(self.offset_path) as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _write_offset(self, offset):
+        tmp_path = f"{self.offset_path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.offset_path)
+
+    def pending(self, limit):
+        """
+        Returns (records, end_offset) for up to `limit` undrained records.
+        """
+        with self._lock:
+            offset = self._read_offset()
+        records, position = [], offset
+        if not os.path.exists(self.path):
+            return records, position
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                position += len(line)
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    logger.error(f"Skipping unreadable spool record at byte {position - len(line)}")
+                if len(records) >= limit:
+                    break
+        return records, position
+
+    def commit(self, end_offset):
+        """
+        Marks everything before `end_offset` as drained, truncating the file once empty.
+        """
+        with self._lock, self._file_lock():
+            size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+            if end_offset >= size:
+                with open(self.path, "wb") as f:
+                    os.fsync(f.fileno())
+                self._write_offset(0)
+            else:
+                self._write_offset(end_offset)
+
+    def backlog_bytes(self):
+        """
+        Returns the number of spooled bytes not yet drained.
+        """
+        with self._lock:
+            size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+            return size - self._read_offset()
+
+def drain(spool, batch_size=SPOOL_BATCH_SIZE):
+    """
+    Writes every pending record to the database, one transaction per batch.
+
+    Returns the number of records drained. Database errors propagate, leaving the
+    failed batch in the spool for the next attempt.
+    """
+    drained = 0
+    while True:
+        records, end_offset = spool.pending(batch_size)
+        if not records:
+            if end_offset:
+                spool.commit(end_offset)
+            return drained
+        rates, quotes, provider_rates, job_runs = [], [], [], []
+        for record in records:
+            if record["kind"] == "rate":
+                rates.append((
+                    record["timestamp"], record["mortgage_rate"],
+                    record["mbb_price"], record["source"]
+                ))
+            elif record["kind"] == "quotes":
+                quotes.extend(
+                    (record["timestamp"], symbol, price)
+                    for symbol, price in record["prices"].items()
+                )
+            elif record["kind"] == "provider_rates":
+                provider_rates.extend(
+                    (record["timestamp"], provider, rate)
+                    for provider, rate in record["rates"].items()
+                )
+            elif record["kind"] == "job_run":
+                job_runs.append((
+                    record["started"], record["job"], record["success"],
+                    record["duration"], record["stages"], record["error"]
+                ))
+        with connection() as conn:
+            write_batch(conn, rates, quotes, provider_rates, job_runs)
+        spool.commit(end_offset)
+        drained += len(records)
+
+class Flusher(threading.Thread):
+    """
+    Background thread that drains the spool every `interval` seconds, backing off
+    while the database is unavailable.
+    """
+    def __init__(self, spool, interval=SPOOL_FLUSH_INTERVAL, batch_size=SPOOL_BATCH_SIZE):
+        super().__init__(name="spool-flusher", daemon=True)
+        self.spool = spool
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stop_event = threading.Event()
+        self._failures = 0
+
+    def flush(self):
+        """
+        Drains once; returns True on success and False if the database write failed.
+        """
+        try:
+            drained = drain(self.spool, self.batch_size)
+        except Exception as e:
+            self._failures += 1
+            logger.warning(
+                f"Spool flush failed ({self._failures} in a row), "
+                f"{self.spool.backlog_bytes()} bytes waiting: {e}"
+            )
+            return False
+        if drained:
+            logger.info(f"Flushed {drained} spooled records to the database")
+            # Derived metrics follow the new rows; failures there are only logged
+            refresh_analytics()
+        self._failures = 0
+        return True
+
+    def run(self):
+        while not self._stop_event.is_set():
+            delay = min(self.interval * 2 ** self._failures, SPOOL_MAX_BACKOFF)
+            if self._stop_event.wait(delay):
+                break
+            self.flush()
+
+    def stop(self, timeout=None):
+        """
+        Stops the thread and makes a final attempt to drain the spool.
+        """
+        self._stop_event.set()
+        self.join(timeout)
+        self.flush()
+
+_spool = None
+_flusher = None
+# Reentrant: start_flusher holds it while creating the spool through get_spool
+_spool_lock = threading.RLock()
+
+def get_spool():
+    """
+    Returns the process-wide spool at SPOOL_FILE.
+    """
+    global _spool
+    with _spool_lock:
+        if _spool is None:
+            _spool = Spool(SPOOL_FILE)
+        return _spool
+
+def spool_rate(timestamp, mortgage_rate, mbb_price, source="mnd"):
+    """
+    Queues one rates row for the database.
+    """
+    get_spool().append({
+        "kind": "rate", "timestamp": timestamp, "mortgage_rate": mortgage_rate,
+        "mbb_price": mbb_price, "source": source,
+    })
+
+def spool_quotes(timestamp, prices):
+    """
+    Queues one (timestamp, symbol, price) row per symbol for the database.
+    """
+    get_spool().append({"kind": "quotes", "timestamp": timestamp, "prices": prices})
+
+def spool_provider_rates(timestamp, rates):
+    """
+    Queues one (timestamp, provider, rate) row per rate provider for the database.
+    """
+    get_spool().append({"kind": "provider_rates", "timestamp": timestamp, "rates": rates})
+
+def spool_job_run(started, job, success, duration, stages, error=None):
+    """
+    Queues one job_runs row with its outcome and {stage: seconds} durations.
+    """
+    get_spool().append({
+        "kind": "job_run", "started": started.isoformat(), "job": job, "success": success,
+        "duration": duration, "stages": stages, "error": error,
+    })
+
+def start_flusher():
+    """
+    Starts the background flusher, draining anything left over from a previous run first.
+    """
+    global _flusher
+    with _spool_lock:
+        if _flusher is None:
+            _flusher = Flusher(get_spool())
+            _flusher.flush()
+            _flusher.start()
+        return _flusher
+
+def stop_flusher():
+    """
+    Stops the background flusher after a final drain.
+    """
+    global _flusher
+    with _spool_lock:
+        if _flusher is not None:
+            _flusher.stop()
+            _flusher = None
+
+# Created with AI assistance
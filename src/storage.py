@@ -1,6 +1,44 @@
 import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+from contextlib import contextmanager
 import psycopg
-from src.config import USE_POSTGRES, POSTGRES_VARS, SQLITE_FILE, TABLE_NAME
+from psycopg_pool import ConnectionPool
+from src.config import (
+    USE_POSTGRES, POSTGRES_VARS, SQLITE_FILE, TABLE_NAME, QUOTES_TABLE, JOB_RUNS_TABLE,
+    JOBS_TABLE, PROVIDER_RATES_TABLE, ANALYTICS_TABLE, ALERTS_TABLE, PG_POOL_MIN,
+    PG_POOL_MAX, SQLITE_CACHED_STATEMENTS, BULK_BATCH_SIZE, LOCAL_TZ, EXPORT_CHUNK_SIZE
+)
+
+# Storage engine state: a pool for Postgres, one persistent connection for SQLite
+_pool = None
+_sqlite_conn = None
+_sqlite_path = None
+_engine_lock = threading.Lock()
+_sqlite_lock = threading.RLock()
+
+# Columns returned by iter_rows, in order
+ROW_COLUMNS = ["id", "timestamp", "ts", "source", "mortgage_rate", "mbb_price"]
+
+# Rows are unique per sample time and source (symbol, provider), so writing a row
+# again, e.g. when the spool is replayed, updates it in place instead of adding one.
+# Rates rows rewritten with other values also get a new revision, see _upsert_rates()
+UPSERT_RATES = (
+    "ON CONFLICT (ts, source) DO UPDATE SET timestamp = excluded.timestamp, "
+    "mortgage_rate = excluded.mortgage_rate, mbb_price = excluded.mbb_price"
+)
+UPSERT_QUOTES = (
+    "ON CONFLICT (ts, symbol) DO UPDATE SET timestamp = excluded.timestamp, "
+    "price = excluded.price"
+)
+UPSERT_PROVIDER_RATES = (
+    "ON CONFLICT (ts, provider) DO UPDATE SET timestamp = excluded.timestamp, "
+    "rate = excluded.rate"
+)
+
+# Bumped by every write in this process; read caches key on it to drop stale results
+_data_version = 0
 
 def get_connection():
     """
@@ -10,45 +48,420 @@ def get_connection():
         return psycopg.connect(**POSTGRES_VARS)
     return sqlite3.connect(SQLITE_FILE)
 
+def _open_sqlite(path):
+    """
+    Opens the long-lived SQLite connection with WAL and a larger statement cache.
+    """
+    conn = sqlite3.connect(
+        path,
+        check_same_thread=False,
+        cached_statements=SQLITE_CACHED_STATEMENTS
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+def get_pool():
+    """
+    Returns the Postgres connection pool, opening it on first use.
+    """
+    global _pool
+    with _engine_lock:
+        if _pool is None:
+            _pool = ConnectionPool(
+                kwargs=POSTGRES_VARS,
+                min_size=PG_POOL_MIN,
+                max_size=PG_POOL_MAX,
+                open=True
+            )
+        return _pool
+
+def _get_sqlite():
+    """
+    Returns the persistent SQLite connection, reopening it if SQLITE_FILE changed.
+    """
+    global _sqlite_conn, _sqlite_path
+    with _engine_lock:
+        if _sqlite_conn is None or _sqlite_path != SQLITE_FILE:
+            if _sqlite_conn is not None:
+                _sqlite_conn.close()
+            _sqlite_conn = _open_sqlite(SQLITE_FILE)
+            _sqlite_path = SQLITE_FILE
+        return _sqlite_conn
+
+@contextmanager
+def connection():
+    """
+    Borrows a connection from the storage engine for the duration of the block.
+
+    Postgres connections come from the pool and are returned on exit. SQLite uses
+    one shared connection, serialized across threads by a lock.
+    """
+    if USE_POSTGRES:
+        with get_pool().connection() as conn:
+            yield conn
+    else:
+        with _sqlite_lock:
+            yield _get_sqlite()
+
+def close_connections():
+    """
+    Closes the Postgres pool and the persistent SQLite connection.
+    """
+    global _pool, _sqlite_conn, _sqlite_path
+    with _engine_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+        if _sqlite_conn is not None:
+            _sqlite_conn.close()
+            _sqlite_conn = None
+            _sqlite_path = None
+
+def data_version():
+    """
+    Returns the in-process write counter used to invalidate cached reads.
+    """
+    return _data_version
+
+def _mark_written():
+    global _data_version
+    with _engine_lock:
+        _data_version += 1
+
 def init_db(conn):
     """
-    Ensures the target table exists.
+    Ensures the target tables exist and the schema is at the latest version.
+    """
+    # Imported here because src.migrations reads the table settings from this module
+    from src.migrations import migrate
+    migrate(conn)
+
+def to_db_time(timestamp):
+    """
+    Converts a timestamp string or datetime to the value stored in the typed `ts` column.
+
+    Naive values are wall-clock times in LOCAL_TZ, which is how the legacy TEXT
+    column was written. SQLite stores integer epoch seconds; Postgres stores an
+    aware datetime in a TIMESTAMPTZ column.
+    """
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=ZoneInfo(LOCAL_TZ))
+    if USE_POSTGRES:
+        return timestamp
+    return int(timestamp.timestamp())
+
+def to_local_text(timestamp):
+    """
+    Converts a timestamp to the naive LOCAL_TZ wall-clock text of the legacy TEXT column.
+
+    Naive values already are in that form and pass through unchanged. Aware values,
+    such as the UTC times the job writes, are only converted for legacy readers; the
+    `ts` column keeps the exact instant, which stays unique across a DST fall-back.
+    """
+    if isinstance(timestamp, str):
+        parsed = datetime.fromisoformat(timestamp)
+        if parsed.tzinfo is None:
+            return timestamp
+        timestamp = parsed
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(ZoneInfo(LOCAL_TZ)).replace(tzinfo=None)
+    return timestamp.strftime("%Y-%m-%d %H:%M:%S")
+
+def _day_bounds(start, end):
+    """
+    Returns typed `ts` bounds covering local days [start, end].
+    """
+    first = datetime.combine(date.fromisoformat(start), datetime.min.time())
+    after = datetime.combine(date.fromisoformat(end) + timedelta(days=1), datetime.min.time())
+    return to_db_time(first), to_db_time(after)
+
+def _upsert_rates():
+    """
+    UPSERT_RATES for the current engine. A row written again with other values
+    keeps its id but gets the next revision, so readers that track ids (the
+    analytics table, incremental exports) can find rewritten rows; writing the
+    same values again leaves the row alone.
+    """
+    if USE_POSTGRES:
+        revision = f"nextval('{TABLE_NAME}_revision_seq')"
+        changed = (
+            f"({TABLE_NAME}.mortgage_rate, {TABLE_NAME}.mbb_price) "
+            f"IS DISTINCT FROM (excluded.mortgage_rate, excluded.mbb_price)"
+        )
+    else:
+        # SQLite writes are serialized, so one past the highest revision is unique
+        revision = f"(SELECT COALESCE(MAX(revision), 0) + 1 FROM {TABLE_NAME})"
+        changed = (
+            f"{TABLE_NAME}.mortgage_rate IS NOT excluded.mortgage_rate "
+            f"OR {TABLE_NAME}.mbb_price IS NOT excluded.mbb_price"
+        )
+    return f"{UPSERT_RATES}, revision = {revision} WHERE {changed}"
+
+def revision_marks(conn):
+    """
+    Returns (highest id, highest revision) of the rates table; zeros when empty.
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT COALESCE(MAX(id), 0), COALESCE(MAX(revision), 0) FROM {TABLE_NAME}")
+    return tuple(cursor.fetchone())
+
+def update_table(conn, timestamp, mortgage_rate, mbb_price, source="mnd"):
+    """
+    Stores a record in the rates table, replacing one with the same time and source.
+    """
+    cursor = conn.cursor()
+    placeholder = "%s" if USE_POSTGRES else "?"
+    sql_insert = (
+        f"INSERT INTO {TABLE_NAME} "
+        f"(timestamp, ts, source, mortgage_rate, mbb_price) VALUES"
+        f"({', '.join([placeholder] * 5)}) {_upsert_rates()}"
+    )
+    cursor.execute(
+        sql_insert,
+        (to_local_text(timestamp), to_db_time(timestamp), source, mortgage_rate, mbb_price)
+    )
+    conn.commit()
+    _mark_written()
+
+def existing_dates(conn, start, end, with_rate=False):
+    """
+    Returns the set of "YYYY-MM-DD" local days in [start, end] that already have a row,
+    or, with `with_rate`, a row with a mortgage rate.
+    """
+    cursor = conn.cursor()
+    placeholder = "%s" if USE_POSTGRES else "?"
+    rate_filter = " AND mortgage_rate IS NOT NULL" if with_rate else ""
+    cursor.execute(
+        f"SELECT DISTINCT ts FROM {TABLE_NAME} "
+        f"WHERE ts >= {placeholder} AND ts < {placeholder}{rate_filter}",
+        _day_bounds(start, end)
+    )
+    tz = ZoneInfo(LOCAL_TZ)
+    days = set()
+    for (ts,) in cursor.fetchall():
+        if not isinstance(ts, datetime):
+            ts = datetime.fromtimestamp(ts, tz)
+        days.add(ts.astimezone(tz).date().isoformat())
+    return days
+
+def bulk_insert(conn, rows, source, batch_size=BULK_BATCH_SIZE):
+    """
+    Upserts many (timestamp, mortgage_rate, mbb_price) rows in one transaction.
+
+    SQLite uses executemany in batches; Postgres streams the rows with COPY into
+    a staging table and upserts from there, keeping the last row per key.
+    Returns the number of rows written.
     """
     cursor = conn.cursor()
+    columns = "(timestamp, ts, source, mortgage_rate, mbb_price)"
+    typed_rows = (
+        (to_local_text(timestamp), to_db_time(timestamp), source, mortgage_rate, mbb_price)
+        for timestamp, mortgage_rate, mbb_price in rows
+    )
+    count = 0
+    if USE_POSTGRES:
+        cursor.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS rates_stage ("
+            "seq BIGSERIAL, timestamp TEXT, ts TIMESTAMPTZ, source TEXT, "
+            "mortgage_rate REAL, mbb_price REAL) ON COMMIT DELETE ROWS"
+        )
+        with cursor.copy(f"COPY rates_stage {columns} FROM STDIN") as copy:
+            for row in typed_rows:
+                copy.write_row(row)
+                count += 1
+        cursor.execute(
+            f"INSERT INTO {TABLE_NAME} {columns} "
+            f"SELECT DISTINCT ON (ts, source) timestamp, ts, source, mortgage_rate, mbb_price "
+            f"FROM rates_stage ORDER BY ts, source, seq DESC {_upsert_rates()}"
+        )
+    else:
+        sql_insert = f"INSERT INTO {TABLE_NAME} {columns} VALUES (?, ?, ?, ?, ?) {_upsert_rates()}"
+        batch = []
+        for row in typed_rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                cursor.executemany(sql_insert, batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            cursor.executemany(sql_insert, batch)
+            count += len(batch)
+    conn.commit()
+    _mark_written()
+    return count
+
+def write_batch(conn, rates, quotes, provider_rates=(), job_runs=()):
+    """
+    Writes rate rows (timestamp, mortgage_rate, mbb_price, source), quote rows
+    (timestamp, symbol, price), provider rate rows (timestamp, provider, rate) and
+    job runs (started, job, success, duration, stages, error) in a single
+    transaction. Rows are upserted, so writing a batch twice is harmless; only
+    job runs, which are appended, would be recorded twice.
+    """
+    cursor = conn.cursor()
+    placeholder = "%s" if USE_POSTGRES else "?"
+    if rates:
+        cursor.executemany(
+            f"INSERT INTO {TABLE_NAME} "
+            f"(timestamp, ts, source, mortgage_rate, mbb_price) VALUES"
+            f"({', '.join([placeholder] * 5)}) {_upsert_rates()}",
+            [
+                (to_local_text(timestamp), to_db_time(timestamp), source, mortgage_rate, mbb_price)
+                for timestamp, mortgage_rate, mbb_price, source in rates
+            ]
+        )
+    if quotes:
+        cursor.executemany(
+            f"INSERT INTO {QUOTES_TABLE} "
+            f"(timestamp, ts, symbol, price) VALUES"
+            f"({', '.join([placeholder] * 4)}) {UPSERT_QUOTES}",
+            [
+                (to_local_text(timestamp), to_db_time(timestamp), symbol, price)
+                for timestamp, symbol, price in quotes
+            ]
+        )
+    if provider_rates:
+        cursor.executemany(
+            f"INSERT INTO {PROVIDER_RATES_TABLE} "
+            f"(timestamp, ts, provider, rate) VALUES"
+            f"({', '.join([placeholder] * 4)}) {UPSERT_PROVIDER_RATES}",
+            [
+                (to_local_text(timestamp), to_db_time(timestamp), provider, rate)
+                for timestamp, provider, rate in provider_rates
+            ]
+        )
+    if job_runs:
+        cursor.executemany(_insert_job_run(), [_job_run_row(*run) for run in job_runs])
+    conn.commit()
+    # Job runs are not rate data, so they leave the read caches alone
+    if rates or quotes or provider_rates:
+        _mark_written()
+
+def iter_rows(conn, start=None, end=None, after=None, chunk_size=EXPORT_CHUNK_SIZE,
+              after_marks=None, upto_marks=None):
+    """
+    Yields the rates table in ts order as lists of at most `chunk_size` rows.
+
+    Postgres reads through a server-side cursor and SQLite through fetchmany, so
+    only one chunk is held in memory. `start`/`end` bound ts as [start, end);
+    `after` keeps only rows strictly newer than it. `after_marks` keeps only rows
+    added or rewritten since those (id, revision) marks of revision_marks(), and
+    `upto_marks` leaves out rows added or rewritten after them.
+    """
+    placeholder = "%s" if USE_POSTGRES else "?"
+    clauses, params = [], []
+    for op, value in ((">=", start), ("<", end), (">", after)):
+        if value is not None:
+            clauses.append(f"ts {op} {placeholder}")
+            params.append(to_db_time(value))
+    if after_marks is not None:
+        clauses.append(f"(id > {placeholder} OR revision > {placeholder})")
+        params += after_marks
+    if upto_marks is not None:
+        clauses.append(
+            f"id <= {placeholder} AND (revision IS NULL OR revision <= {placeholder})"
+        )
+        params += upto_marks
+    where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+    sql = f"SELECT {', '.join(ROW_COLUMNS)} FROM {TABLE_NAME} {where}ORDER BY ts, id"
 
     if USE_POSTGRES:
-        ddl = f"""
-        CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
-            id              SERIAL PRIMARY KEY,
-            timestamp       TEXT    NOT NULL,
-            mortgage_rate   REAL,
-            mbb_price       REAL
-        );
-        """
+        cursor = conn.cursor(name="iter_rows")
+        cursor.itersize = chunk_size
     else:
-        ddl = f"""
-        CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
-            id              INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp       TEXT    NOT NULL,
-            mortgage_rate   REAL,
-            mbb_price       REAL
-        );
-        """
-    cursor.execute(ddl)
+        cursor = conn.cursor()
+    try:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+
+def delete_range(conn, start, end, rates_max_id, quotes_max_id):
+    """
+    Deletes rates and quote rows with start <= ts < end and ids up to the given
+    ones in one transaction, and returns the number of rows removed.
+
+    Used once the rows are archived; the id bounds keep rows that arrived after
+    the archive was written.
+    """
+    cursor = conn.cursor()
+    placeholder = "%s" if USE_POSTGRES else "?"
+    count = 0
+    for table, max_id in ((TABLE_NAME, rates_max_id), (QUOTES_TABLE, quotes_max_id)):
+        cursor.execute(
+            f"DELETE FROM {table} "
+            f"WHERE ts >= {placeholder} AND ts < {placeholder} AND id <= {placeholder}",
+            (to_db_time(start), to_db_time(end), max_id)
+        )
+        count += cursor.rowcount
     conn.commit()
+    _mark_written()
+    return count
 
-def update_table(conn, timestamp, mortgage_rate, mbb_price):
+def update_quotes(conn, timestamp, prices):
     """
-    Appends a new record into the SQLite table.
+    Stores one (timestamp, symbol, price) row per symbol in a single transaction.
     """
     cursor = conn.cursor()
     placeholder = "%s" if USE_POSTGRES else "?"
     sql_insert = (
-        f"INSERT INTO {TABLE_NAME} "
-        f"(timestamp, mortgage_rate, mbb_price) VALUES"
-        f"({placeholder}, {placeholder}, {placeholder})"
+        f"INSERT INTO {QUOTES_TABLE} "
+        f"(timestamp, ts, symbol, price) VALUES"
+        f"({', '.join([placeholder] * 4)}) {UPSERT_QUOTES}"
+    )
+    text, ts = to_local_text(timestamp), to_db_time(timestamp)
+    cursor.executemany(
+        sql_insert,
+        [(text, ts, symbol, price) for symbol, price in prices.items()]
+    )
+    conn.commit()
+    _mark_written()
+
+def _insert_job_run():
+    placeholder = "%s" if USE_POSTGRES else "?"
+    return (
+        f"INSERT INTO {JOB_RUNS_TABLE} "
+        f"(ts, job, success, duration, ping, scrape, quote, persist, error) VALUES"
+        f"({', '.join([placeholder] * 9)})"
+    )
+
+def _job_run_row(started, job, success, duration, stages, error=None):
+    return (
+        to_db_time(started), job, bool(success), duration,
+        stages.get("ping"), stages.get("scrape"), stages.get("quote"),
+        stages.get("persist"), error
+    )
+
+def record_job_run(conn, started, job, success, duration, stages, error=None):
+    """
+    Appends one job run with its outcome and {stage: seconds} durations.
+
+    Job runs are not rate data, so the read caches are left alone.
+    """
+    conn.cursor().execute(
+        _insert_job_run(), _job_run_row(started, job, success, duration, stages, error)
+    )
+    conn.commit()
+
+def record_alert(conn, timestamp, rule, series, value, message, delivered):
+    """
+    Appends one fired alert and whether its webhook delivery succeeded.
+    """
+    placeholder = "%s" if USE_POSTGRES else "?"
+    conn.cursor().execute(
+        f"INSERT INTO {ALERTS_TABLE} "
+        f"(timestamp, ts, rule, series, value, message, delivered) VALUES"
+        f"({', '.join([placeholder] * 7)})",
+        (to_local_text(timestamp), to_db_time(timestamp), rule, series, value, message, bool(delivered))
     )
-    cursor.execute(sql_insert, (timestamp, mortgage_rate, mbb_price))
     conn.commit()
 
 # Created with AI assistance
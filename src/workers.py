@@ -0,0 +1,130 @@
+import concurrent.futures
+import functools
+import logging
+import multiprocessing
+import threading
+import traceback
+from concurrent.futures.process import BrokenProcessPool
+from apscheduler.executors.pool import ThreadPoolExecutor
+from src import jobstate, metrics
+from src.config import SCHEDULER_WORKERS, WORKER_PROCESSES, WORKER_MAX_TASKS
+
+logger = logging.getLogger(__name__)
+
+def _init_worker():
+    logging.basicConfig(level=logging.INFO)
+
+def _call(func, args, kwargs, state):
+    """
+    Runs in the worker: returns (result, error, observations, state) for the parent.
+
+    The job state of the previous job (see src.jobstate) is restored first and
+    its new snapshot returned, so a fresh worker continues where the last one
+    stopped. Errors are returned rather than raised so the stage timings recorded
+    before them still reach the parent.
+    """
+    jobstate.restore(state)
+    with metrics.recording() as observations:
+        try:
+            result, error = func(*args, **kwargs), None
+        except Exception as e:
+            e.add_note("Worker traceback:\n" + "".join(traceback.format_tb(e.__traceback__)))
+            result, error = None, e
+    return result, error, observations, jobstate.snapshot()
+
+class WorkerPool:
+    """
+    Process pool whose workers each run up to `max_tasks_per_child` calls, then exit
+    and are replaced by a fresh interpreter.
+
+    The job state each call leaves behind is kept here and handed to the next
+    call, so replacing workers does not reset circuit breakers or caches.
+
+    The pool is started on the first call. Workers are spawned rather than forked,
+    so they never inherit the scheduler's threads, sockets or database pool.
+    """
+    def __init__(self, max_workers=WORKER_PROCESSES, max_tasks_per_child=WORKER_MAX_TASKS):
+        self.max_workers = max_workers
+        self.max_tasks_per_child = max_tasks_per_child or None
+        self._pool = None
+        self._state = {}
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = concurrent.futures.ProcessPoolExecutor(
+                    self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    max_tasks_per_child=self.max_tasks_per_child,
+                )
+            return self._pool
+
+    def run(self, func, *args, **kwargs):
+        """
+        Calls func(*args, **kwargs) in a worker and returns its result, or raises its error.
+
+        `func` and its arguments must be picklable, e.g. module-level functions. The
+        metrics the call observed are replayed here, so /metrics covers worker runs.
+        """
+        pool = self._get_pool()
+        try:
+            result, error, observations, state = pool.submit(
+                _call, func, args, kwargs, self._state
+            ).result()
+        except BrokenProcessPool:
+            # A worker died mid-job (e.g. killed for memory); the next call gets a new pool
+            logger.error(f"Worker process died running {func.__name__}; replacing the pool")
+            with self._lock:
+                if self._pool is pool:
+                    self._pool = None
+            pool.shutdown(wait=False)
+            raise
+        metrics.replay(observations)
+        self._state = {**self._state, **state}
+        if error is not None:
+            raise error
+        return result
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+class _InWorker:
+    """
+    A scheduled job as run_job sees it, with its function sent to a worker process.
+    """
+    def __init__(self, job, workers):
+        self._job = job
+        self.func = functools.partial(workers.run, job.func)
+
+    def __getattr__(self, name):
+        return getattr(self._job, name)
+
+    def __str__(self):
+        return str(self._job)
+
+class IsolatedExecutor(ThreadPoolExecutor):
+    """
+    APScheduler executor running every job in a worker process.
+
+    Each job still occupies one of `max_workers` threads, which only waits for the
+    worker, so job events, return values and listeners work as with threads. Jobs
+    queue for the `processes` workers.
+    """
+    def __init__(self, max_workers=SCHEDULER_WORKERS, max_tasks_per_child=WORKER_MAX_TASKS,
+                 processes=WORKER_PROCESSES):
+        super().__init__(max_workers)
+        self.workers = WorkerPool(processes, max_tasks_per_child)
+
+    def _do_submit_job(self, job, run_times):
+        super()._do_submit_job(_InWorker(job, self.workers), run_times)
+
+    def shutdown(self, wait=True):
+        super().shutdown(wait)
+        self.workers.shutdown(wait)
+
+# Created with AI assistance
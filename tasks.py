@@ -1,64 +1,324 @@
-from src.storage import get_connection, init_db, update_table
-from src.fetch import extract_30yr_rate, get_stock_price
-from src.config import mortgage_url, ticker
-from datetime import datetime
+from src.storage import connection, init_db
+from src.spool import spool_rate, spool_quotes, spool_provider_rates, spool_job_run
+from src.quotes import get_quotes
+from src.rates import get_rate_providers, consensus, series_rate
+from src.alerts import evaluate as evaluate_alerts
+from src.parallel import run_sources
+from src.retry import RetryBudget, CircuitOpen
+from src import queries
+from src.metrics import observe, timed
+from src import jobstate
+from src.config import (
+    ticker, tickers, MORTGAGE_TIMEOUT, QUOTE_TIMEOUT, JOB_DEADLINE,
+    JOB_RETRY_BUDGET, CHANGE_TOLERANCE, RATE_CONSENSUS, POLL_INTERVAL,
+    SCHEDULE_TIMEZONE, DAILY_HOUR, DAILY_MINUTE, FETCH_LOCK_FILE
+)
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
 import logging
+import os
+import threading
+import time
 import requests
 
+try:
+    import fcntl
+except ImportError:  # Windows: jobs only run on the scheduler's threads
+    fcntl = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Values this process last stored, seeded from the database by the first polled run:
+# {"rate": (mortgage_rate, mbb_price) or None, "quotes": {symbol: price},
+#  "providers": {provider: rate}}
+_last_stored = None
+# Stands in for the fetch lock file where flock is not available
+_thread_lock = threading.Lock()
+
+def _restore_last_stored(state):
+    global _last_stored
+    _last_stored = state
+
+jobstate.register("last_stored", lambda: _last_stored, _restore_last_stored)
+
+@contextmanager
+def fetch_lock(blocking=True):
+    """
+    Holds the fetch lock, an exclusive flock on FETCH_LOCK_FILE, so one fetch runs
+    at a time across scheduler threads and worker processes. Yields False instead
+    when `blocking` is off and another fetch holds it.
+    """
+    if fcntl is None:
+        if not _thread_lock.acquire(blocking=blocking):
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            _thread_lock.release()
+        return
+    directory = os.path.dirname(FETCH_LOCK_FILE)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(FETCH_LOCK_FILE, "a") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
 def initialize_db():
     """
     Initialize the database to ensure the table exists.
     """
-    conn = get_connection()
-    init_db(conn)
-    conn.close()
+    with connection() as conn:
+        init_db(conn)
 
-def fetch_and_store_data():
+def fetch_quotes(budget=None, deadline=None, stages=None):
     """
-    Fetch the mortgage rate and stock price, then store them in the database.
+    Fetch the latest price of every tracked symbol.
+    """
+    with timed("quote", stages):
+        return get_quotes(tickers, budget=budget, deadline=deadline)
+
+def store_job_run(started, job, success, duration, stages, error=None):
+    """
+    Queue the run for the job_runs table; a failure here never fails the job.
+
+    Like the samples it goes through the spool, so recording it never waits for
+    the database while holding the fetch lock, and survives an outage.
     """
-    # Ping the mortgage_url to check if the host is reachable
-    try:
-        response = requests.get(mortgage_url, timeout=5)
-        response.raise_for_status()
-        logger.info(f"Ping to {mortgage_url} returned status code {response.status_code}")
-    except requests.RequestException as e:
-        logger.error(f"Failed to reach {mortgage_url}: {e}")
-        return
-    
-    # Scrape for mortgage rate
     try:
-        mortgage_rate = extract_30yr_rate(mortgage_url)
-        logger.info(f"Fetched 30-year fixed mortgage rate -- {mortgage_rate}%")
+        spool_job_run(started, job, success, duration, stages, error)
     except Exception as e:
-        mortgage_rate = None
-        logger.error("Failed to find the 30-year fixed mortgage rate.")
-    
-    # Fetch stock price
+        logger.warning(f"Failed to record the {job} job run: {e}")
+
+def last_stored():
+    """
+    Return the values last stored, loading the newest database rows on first use.
+    """
+    global _last_stored
+    if _last_stored is None:
+        # Provider values start empty, so each provider's first value is stored once
+        state = {"rate": None, "quotes": {}, "providers": {}}
+        try:
+            row = queries.latest()
+            state["quotes"] = queries.latest_quotes()
+        except Exception as e:
+            logger.warning(f"Could not load the last stored values; storing everything: {e}")
+        else:
+            if row is not None:
+                state["rate"] = (row["mortgage_rate"], row["mbb_price"])
+        _last_stored = state
+    return _last_stored
+
+def _remember(prices, rate_row, provider_rates):
+    """
+    Record values just queued, once change detection has been seeded.
+    """
+    if _last_stored is None:
+        return
+    _last_stored["quotes"].update(prices)
+    _last_stored["providers"].update(provider_rates)
+    if rate_row is not None:
+        _last_stored["rate"] = rate_row
+
+def sample_time(only_changes=False):
+    """
+    The schedule slot a run stores its samples under, as aware UTC.
+
+    A daily run and its follow-ups use that day's DAILY_HOUR:DAILY_MINUTE, and a
+    poll the POLL_INTERVAL slot it fired in. A retried run, or the same job run
+    again by another replica after failover, therefore upserts the rows of the
+    first run instead of adding new ones.
+    """
+    now = datetime.now(timezone.utc)
+    if only_changes:
+        step = max(POLL_INTERVAL, 1) * 60
+        return datetime.fromtimestamp(int(now.timestamp()) // step * step, timezone.utc)
+    local = now.astimezone(ZoneInfo(SCHEDULE_TIMEZONE))
+    slot = local.replace(hour=DAILY_HOUR, minute=DAILY_MINUTE, second=0, microsecond=0)
+    if slot > local:
+        slot -= timedelta(days=1)
+    return slot.astimezone(timezone.utc)
+
+def _moved(previous, current):
+    """
+    True when `current` differs from `previous` by more than CHANGE_TOLERANCE.
+    """
+    return previous is None or abs(current - previous) > CHANGE_TOLERANCE
+
+def fetch_and_store_data(only_changes=False):
+    """
+    Fetch the mortgage rate from every rate provider and the stock prices, then
+    store them in the database.
+
+    With only_changes, quotes and the rates row are stored only when they moved
+    since the last stored values, so intraday polls do not repeat unchanged rows.
+
+    Returns True when a complete rates row was fetched, so the scheduler can
+    re-run a failed job without waiting for the next day. Every run is timed
+    per stage and recorded in the job_runs table.
+
+    Runs one at a time: a daily run waits for a poll in progress, while a poll
+    that starts during another run is skipped and returns None.
+    """
+    with fetch_lock(blocking=not only_changes) as locked:
+        if not locked:
+            logger.info("Skipping poll while another fetch is running")
+            return None
+        return _run_job(only_changes)
+
+def _run_job(only_changes):
+    """
+    Times and records one fetch_and_store_data run.
+    """
+    started = datetime.now(timezone.utc)
+    start = time.perf_counter()
+    run = {"stages": {}, "errors": []}
+    success = False
     try:
-        stock_price = get_stock_price(ticker)
-        logger.info(f"Fetched {ticker} stock price -- ${stock_price:.2f}")
+        success = _fetch_and_store(only_changes, run)
+        return success
     except Exception as e:
-        stock_price = None
-        logger.error(f"Failed to fetch the stock price for {ticker}.")
-    
-    # Decide to skip table update if there's any missing data
-    if mortgage_rate is None or stock_price is None:
+        run["errors"].append(f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        observe("job", duration, success)
+        store_job_run(
+            started, "poll" if only_changes else "daily", success, duration,
+            run["stages"], "; ".join(run["errors"]) or None
+        )
+
+def _fetch_and_store(only_changes, run):
+    """
+    One fetch and store pass; stage durations and problems are collected in `run`.
+    """
+    stages = run["stages"]
+    # Fetch all sources concurrently under one job deadline, sharing one retry budget;
+    # retries stop before a source's own timeout would cut them off
+    start = time.monotonic()
+    budget = RetryBudget(JOB_RETRY_BUDGET)
+    mortgage_deadline = start + min(MORTGAGE_TIMEOUT, JOB_DEADLINE)
+    quote_deadline = start + min(QUOTE_TIMEOUT, JOB_DEADLINE)
+    providers = get_rate_providers()
+    sources, timeouts = {}, {}
+    for provider in providers:
+        name = f"rate:{provider.name}"
+        sources[name] = lambda p=provider: p.fetch(budget, mortgage_deadline, stages)
+        timeouts[name] = MORTGAGE_TIMEOUT
+    sources["quote"] = lambda: fetch_quotes(budget, quote_deadline, stages)
+    timeouts["quote"] = QUOTE_TIMEOUT
+    results, errors, timings = run_sources(sources, timeouts=timeouts, deadline=JOB_DEADLINE)
+    for name, elapsed in timings.items():
+        status = "failed" if name in errors else "ok"
+        logger.info(f"Source {name} {status} in {elapsed:.3f}s")
+    run["errors"] += [f"{name}: {e}" for name, e in errors.items()]
+
+    # Collect each provider's rate; the stored mortgage rate is the primary provider's
+    rates, fresh_rates = {}, {}
+    for provider in providers:
+        name = f"rate:{provider.name}"
+        if name in errors:
+            e = errors[name]
+            if isinstance(e, (requests.RequestException, CircuitOpen)):
+                logger.error(f"Failed to reach {provider.url}: {e}")
+            else:
+                logger.error(
+                    f"Failed to find the 30-year fixed mortgage rate at {provider.name}: {e}"
+                )
+            continue
+        rate, fresh = results[name]
+        rates[provider.name] = rate
+        if fresh:
+            fresh_rates[provider.name] = rate
+        cached = "" if fresh else " (cached)"
+        logger.info(f"Fetched 30-year fixed mortgage rate from {provider.name} -- {rate}%{cached}")
+    primary = providers[0].name if providers else None
+    mortgage_rate, rate_source = series_rate(rates, primary, RATE_CONSENSUS)
+    if rate_source not in (None, primary, "consensus"):
+        logger.warning(f"Storing the {rate_source} rate while {primary} is unavailable")
+    if mortgage_rate is not None:
+        logger.info(f"Fetched 30-year fixed mortgage rate -- {mortgage_rate}% ({rate_source})")
+    # The median of several answers is kept as a provider rate of its own
+    median, median_source = consensus(rates)
+    if median_source == "consensus" and fresh_rates:
+        fresh_rates["consensus"] = median
+
+    # Fetch stock prices
+    prices = results.get("quote") or {}
+    if "quote" in errors:
+        logger.error(f"Failed to fetch stock prices for {tickers}: {errors['quote']}")
+    for symbol, price in prices.items():
+        logger.info(f"Fetched {symbol} stock price -- ${price:.2f}")
+    missing = [symbol for symbol in tickers if symbol not in prices]
+    if prices and missing:
+        logger.warning(f"No price returned for {missing}")
+    stock_price = prices.get(ticker)
+
+    complete = mortgage_rate is not None and stock_price is not None
+    if not complete:
         logger.warning(
             f"Skipping table update: "
             f"mortgage_rate={mortgage_rate}, stock_price={stock_price}"
         )
-        return
-    
-    # Persist     
-    timestamp_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    conn = get_connection()
-    update_table(conn, timestamp_str, mortgage_rate, stock_price)
-    conn.close()
-    logger.info("Data successfully stored in the database.")
+        if not prices and not fresh_rates:
+            return False
+
+    rate_row = (mortgage_rate, stock_price) if complete else None
+    if only_changes:
+        state = last_stored()
+        prices = {
+            symbol: price for symbol, price in prices.items()
+            if _moved(state["quotes"].get(symbol), price)
+        }
+        fresh_rates = {
+            provider: rate for provider, rate in fresh_rates.items()
+            if _moved(state["providers"].get(provider), rate)
+        }
+        if rate_row is not None and state["rate"] is not None and not any(
+            _moved(previous, current) for previous, current in zip(state["rate"], rate_row)
+        ):
+            rate_row = None
+        if not prices and not fresh_rates and rate_row is None:
+            logger.info("No change since the last stored values; nothing to store.")
+            return complete
+
+    # Persist through the durable spool; the flusher batches rows into the database.
+    # Quotes and freshly fetched provider rates are kept even when the rate row is
+    # incomplete; cached provider rates were stored when they were fetched.
+    # The schedule slot as aware UTC, so every run of one slot writes the same key;
+    # the legacy TEXT column gets local wall-clock time
+    timestamp_str = sample_time(only_changes).isoformat(timespec="seconds")
+    try:
+        with timed("persist", stages):
+            if prices:
+                spool_quotes(timestamp_str, prices)
+            if fresh_rates:
+                spool_provider_rates(timestamp_str, fresh_rates)
+            if rate_row is not None:
+                spool_rate(timestamp_str, *rate_row, source=rate_source)
+    except OSError as e:
+        logger.error(f"Failed to spool data for {timestamp_str}: {e}")
+        run["errors"].append(f"persist: {e}")
+        return False
+    _remember(prices, rate_row, fresh_rates)
+    logger.info("Data successfully queued for the database.")
+
+    # Alert rules see exactly the samples that were stored
+    samples = dict(prices)
+    if rate_row is not None:
+        samples["rate"] = rate_row[0]
+    with timed("alert", stages):
+        evaluate_alerts(timestamp_str, samples)
+    return complete
 
 # Created with AI assistance
@@ -0,0 +1,52 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubServer:
+    """
+    Local HTTP stand-in on a free port, served from a background thread.
+
+    Every request is answered with respond(request) -> (status, headers, body),
+    where `request` is the handler with the request body read into `request.body`;
+    pass `respond` or override the method. With `keep_alive` the server speaks
+    HTTP/1.1, so clients reuse their connections.
+    """
+    def __init__(self, respond=None, keep_alive=False):
+        if respond is not None:
+            self.respond = respond
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            if keep_alive:
+                protocol_version = "HTTP/1.1"
+                disable_nagle_algorithm = True
+
+            def answer(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                self.body = self.rfile.read(length) if length else b""
+                status, headers, body = stub.respond(self)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+
+            do_GET = do_POST = answer
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def respond(self, request):
+        raise NotImplementedError
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+# Created by AI
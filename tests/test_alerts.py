@@ -0,0 +1,190 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+import src.alerts as alerts
+import src.fetch as fetch
+import src.retry as retry
+import src.storage as storage
+from tests.stub_server import StubServer
+
+DAY = alerts.DAY
+
+
+class WebhookServer(StubServer):
+    """
+    Stands in for a webhook target, recording every JSON body it receives.
+    """
+    def __init__(self, status=204):
+        self.status = status
+        self.bodies = []
+        super().__init__()
+
+    def respond(self, request):
+        self.bodies.append(json.loads(request.body))
+        return self.status, {}, b""
+
+
+def feed(engine, values, series="rate", step=DAY):
+    """
+    Observes one value a day and returns the alert texts that fired, by day.
+    """
+    fired = {}
+    for day, value in enumerate(values):
+        texts = [alert["text"] for alert in engine.observe(day * step, {series: value})]
+        if texts:
+            fired[day] = texts
+    return fired
+
+
+class TestParseRules(unittest.TestCase):
+
+    def test_every_rule_kind(self):
+        rules = alerts.parse_rules("rate below 6; MBB rise 2% 5d ;; ^TNX move 0.25 1d; rate cross 30d")
+
+        self.assertEqual(
+            [type(rule).__name__ for rule in rules], ["Threshold", "Move", "Move", "Crossover"]
+        )
+        self.assertEqual([rule.series for rule in rules], ["rate", "MBB", "^TNX", "rate"])
+        self.assertTrue(rules[1].relative)
+        self.assertFalse(rules[2].relative)
+        self.assertEqual(rules[3].days, 30)
+
+    def test_unreadable_rule_raises(self):
+        with self.assertRaises(ValueError):
+            alerts.parse_rules("rate below")
+
+    def test_empty_spec_has_no_rules(self):
+        self.assertEqual(alerts.parse_rules(" "), [])
+
+
+class TestRules(unittest.TestCase):
+
+    def test_threshold_fires_once_per_crossing(self):
+        engine = alerts.AlertEngine(alerts.parse_rules("rate below 6"), cooldown=0)
+        fired = feed(engine, [6.2, 5.9, 5.8, 6.1, 5.95])
+        self.assertEqual(sorted(fired), [1, 4])
+        self.assertEqual(fired[1], ["rate at 5.9 is below 6"])
+
+    def test_percentage_move_over_days(self):
+        engine = alerts.AlertEngine(alerts.parse_rules("MBB drop 2% 2d"), cooldown=0)
+        fired = feed(engine, [100.0, 99.5, 98.9, 97.0, 97.0, 97.0], series="MBB")
+        # Day 2 is 1.1% below day 0; day 3 is 2.5% below day 1
+        self.assertEqual(list(fired), [3])
+        self.assertIn("-2.51%", fired[3][0])
+
+    def test_move_keeps_only_its_window(self):
+        rule = alerts.parse_rules("rate move 0.25 3d")[0]
+        for day in range(1000):
+            rule.update(day * DAY, 6.0)
+        self.assertLessEqual(len(rule.points), 4)
+
+    def test_crossover_of_the_moving_average(self):
+        engine = alerts.AlertEngine(alerts.parse_rules("rate cross 5d"), cooldown=0)
+        fired = feed(engine, [6.5, 6.4, 6.3, 6.2, 6.5, 6.6])
+        self.assertEqual(list(fired), [4])
+        self.assertIn("crossed above its 5d average", fired[4][0])
+
+    def test_cooldown_suppresses_repeats(self):
+        engine = alerts.AlertEngine(alerts.parse_rules("rate below 6"), cooldown=3 * DAY)
+        with self.assertLogs("src.alerts", level="INFO"):
+            fired = feed(engine, [5.9, 6.1, 5.9, 6.1, 6.1, 5.9])
+        self.assertEqual(list(fired), [0, 5])
+
+    def test_older_samples_leave_the_windows_alone(self):
+        engine = alerts.AlertEngine(alerts.parse_rules("rate below 6"), cooldown=0)
+        engine.observe(2 * DAY, {"rate": 6.2})
+
+        with self.assertLogs("src.alerts", level="INFO"):
+            self.assertEqual(engine.observe(DAY, {"rate": 5.9}), [])
+        self.assertEqual(len(engine.observe(3 * DAY, {"rate": 5.9})), 1)
+
+
+class TestEvaluate(unittest.TestCase):
+
+    def setUp(self):
+        storage.USE_POSTGRES = False
+        storage.TABLE_NAME = "rates_mbb"
+        storage.QUOTES_TABLE = "quotes"
+        self.tmpdir = tempfile.TemporaryDirectory()
+        storage.SQLITE_FILE = os.path.join(self.tmpdir.name, "alerts.sqlite3")
+        with storage.connection() as conn:
+            storage.init_db(conn)
+        retry.reset_breakers()
+        fetch.close_session()
+        self.webhook = WebhookServer()
+
+    def tearDown(self):
+        alerts._engine = None
+        self.webhook.close()
+        fetch.close_session()
+        storage.close_connections()
+        self.tmpdir.cleanup()
+
+    def _alerts(self):
+        with storage.connection() as conn:
+            return conn.execute(
+                f"SELECT rule, value, delivered FROM {storage.ALERTS_TABLE} ORDER BY id"
+            ).fetchall()
+
+    def _evaluate(self, timestamp, values):
+        with patch("src.alerts.ALERT_WEBHOOK_URL", self.webhook.url), \
+             self.assertLogs("src.alerts", level="INFO"):
+            return alerts.evaluate(timestamp, values)
+
+    def test_alert_is_posted_and_recorded(self):
+        alerts._engine = alerts.AlertEngine(alerts.parse_rules("rate below 6; MBB above 100"))
+
+        fired = self._evaluate("2025-09-01 06:40:00", {"rate": 5.9, "MBB": 95.0})
+
+        self.assertEqual(len(fired), 1)
+        self.assertEqual(self.webhook.bodies, [{
+            "rule": "rate below 6", "series": "rate", "value": 5.9,
+            "text": "rate at 5.9 is below 6", "timestamp": "2025-09-01 06:40:00",
+        }])
+        self.assertEqual(self._alerts(), [("rate below 6", 5.9, 1)])
+
+    def test_failed_delivery_is_recorded(self):
+        self.webhook.status = 400
+        alerts._engine = alerts.AlertEngine(alerts.parse_rules("rate below 6"))
+
+        self._evaluate("2025-09-01 06:40:00", {"rate": 5.9})
+
+        self.assertEqual(self._alerts(), [("rate below 6", 5.9, 0)])
+
+    def test_no_rules_is_a_no_op(self):
+        with patch("src.alerts.ALERT_RULES", ""):
+            self.assertEqual(alerts.evaluate("2025-09-01 06:40:00", {"rate": 5.9}), [])
+        self.assertEqual(self.webhook.bodies, [])
+
+    def test_restart_warms_from_stored_history(self):
+        with storage.connection() as conn:
+            storage.write_batch(conn, [
+                ("2025-09-01 06:40:00", 6.1, 95.0, "mnd"),
+                ("2025-09-02 06:40:00", 5.9, 95.0, "mnd"),
+            ], [])
+            storage.record_alert(
+                conn, "2025-09-02 06:40:00", "rate below 6", "rate", 5.9, "rate at 5.9 is below 6", True
+            )
+        engine = alerts.AlertEngine(alerts.parse_rules("rate below 6; rate below 5.95"), cooldown=DAY)
+        with storage.connection() as conn:
+            now = datetime(2025, 9, 3, 6, 40).timestamp()
+            self.assertEqual(engine.warm(conn, now), 2)
+        alerts._engine = engine
+
+        # Still below 6, so already alerted; 5.95 was crossed before the restart too
+        self.assertEqual(self._evaluate_quiet("2025-09-03 06:40:00", {"rate": 5.8}), [])
+        self.assertEqual(engine.last_fired["rate below 6"], alerts._epoch("2025-09-02 06:40:00"))
+
+    def _evaluate_quiet(self, timestamp, values):
+        with patch("src.alerts.ALERT_WEBHOOK_URL", self.webhook.url):
+            return alerts.evaluate(timestamp, values)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# Created by AI
@@ -0,0 +1,195 @@
+import math
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+import src.analytics as analytics
+import src.spool as spool
+import src.storage as storage
+
+
+def daily_rows(days, start=datetime(2025, 1, 1, 6, 40)):
+    """
+    (rates rows, quote rows) for one sample a day, with gaps in both series.
+    """
+    rates, quotes = [], []
+    for i in range(days):
+        timestamp = (start + timedelta(days=i)).strftime("%Y-%m-%d %H:%M:%S")
+        rate = None if i % 17 == 5 else 6.0 + math.sin(i / 9) / 2
+        rates.append((timestamp, rate, 95.0 + math.cos(i / 13) * 2, "mnd"))
+        if i % 11 != 3:
+            quotes.append((timestamp, "^TNX", 4.0 + math.sin(i / 7) / 4))
+    return rates, quotes
+
+
+class TestAnalytics(unittest.TestCase):
+
+    def setUp(self):
+        storage.USE_POSTGRES = False
+        storage.TABLE_NAME = "rates_mbb"
+        storage.QUOTES_TABLE = "quotes"
+        self.tmpdir = tempfile.TemporaryDirectory()
+        storage.SQLITE_FILE = os.path.join(self.tmpdir.name, "analytics.sqlite3")
+        with storage.connection() as conn:
+            storage.init_db(conn)
+        analytics._state = None
+
+    def tearDown(self):
+        analytics._state = None
+        storage.close_connections()
+        self.tmpdir.cleanup()
+
+    def _write(self, rates, quotes=()):
+        with storage.connection() as conn:
+            storage.write_batch(conn, rates, quotes)
+
+    def _table(self):
+        with storage.connection() as conn:
+            return conn.execute(
+                f"SELECT {', '.join(analytics.COLUMNS)} FROM {storage.ANALYTICS_TABLE} "
+                f"ORDER BY ts, rate_id"
+            ).fetchall()
+
+    def assertTablesEqual(self, first, second):
+        self.assertEqual(len(first), len(second))
+        for row, other in zip(first, second):
+            for column, a, b in zip(analytics.COLUMNS, row, other):
+                if a is None or b is None:
+                    self.assertEqual(a, b, f"{column} of rate_id {row[0]}")
+                elif isinstance(a, float):
+                    self.assertAlmostEqual(a, b, places=9, msg=f"{column} of rate_id {row[0]}")
+                else:
+                    self.assertEqual(a, b, column)
+
+    def test_incremental_updates_match_a_full_rebuild(self):
+        rates, quotes = daily_rows(150)
+        for start in range(0, 150, 40):
+            self._write(rates[start:start + 40], quotes)
+            with storage.connection() as conn:
+                analytics.update(conn)
+        incremental = self._table()
+
+        with storage.connection() as conn:
+            self.assertEqual(analytics.rebuild(conn), 150)
+        self.assertTablesEqual(incremental, self._table())
+
+    def test_moving_averages_volatility_and_z_score(self):
+        rates = [
+            (f"2025-03-{day:02d} 06:40:00", float(day), 100.0, "mnd") for day in range(1, 11)
+        ]
+        self._write(rates, [("2025-03-10 06:40:00", "^TNX", 4.0)])
+        with storage.connection() as conn:
+            analytics.update(conn)
+
+        last = dict(zip(analytics.COLUMNS, self._table()[-1]))
+        self.assertAlmostEqual(last["rate_ma7"], 7.0)
+        self.assertAlmostEqual(last["rate_ma30"], 5.5)
+        self.assertAlmostEqual(last["rate_vol30"], math.sqrt(8.25))
+        self.assertAlmostEqual(last["rate_z30"], 4.5 / math.sqrt(8.25))
+        self.assertAlmostEqual(last["spread"], 6.0)
+        # A constant price has no volatility, so no z-score
+        self.assertEqual(last["mbb_vol30"], 0.0)
+        self.assertIsNone(last["mbb_z30"])
+
+    def test_spread_uses_the_latest_quote_within_the_max_age(self):
+        self._write(
+            [
+                ("2025-03-03 06:40:00", 6.5, 95.0, "mnd"),
+                ("2025-03-03 11:00:00", 6.6, 95.0, "mnd"),
+                ("2025-03-10 06:40:00", 6.7, 95.0, "mnd"),
+            ],
+            [("2025-03-01 06:40:00", "^TNX", 4.1), ("2025-03-03 06:40:00", "^TNX", 4.2)],
+        )
+        with storage.connection() as conn:
+            analytics.update(conn)
+
+        spreads = [row[analytics.COLUMNS.index("spread")] for row in self._table()]
+        # A poll that left the quote unchanged reuses it; a week-old quote is too stale
+        self.assertAlmostEqual(spreads[0], 2.3)
+        self.assertAlmostEqual(spreads[1], 2.4)
+        self.assertIsNone(spreads[2])
+
+    def test_restart_resumes_from_the_stored_rows(self):
+        rates, quotes = daily_rows(120)
+        self._write(rates[:100], quotes)
+        with storage.connection() as conn:
+            analytics.update(conn)
+        # A new process loads its windows from the analytics table
+        analytics._state = None
+        self._write(rates[100:])
+        with storage.connection() as conn:
+            self.assertEqual(analytics.update(conn), 20)
+            self.assertEqual(analytics.update(conn), 0)
+        resumed = self._table()
+
+        with storage.connection() as conn:
+            analytics.rebuild(conn)
+        self.assertTablesEqual(resumed, self._table())
+
+    def test_backfilled_rows_are_merged_in_order(self):
+        rates, quotes = daily_rows(30)
+        self._write(rates[10:], quotes)
+        with storage.connection() as conn:
+            analytics.update(conn)
+        self._write(rates[:10])
+
+        with storage.connection() as conn:
+            self.assertEqual(analytics.update(conn), 30)
+        incremental = self._table()
+
+        with storage.connection() as conn:
+            analytics.rebuild(conn)
+        self.assertTablesEqual(incremental, self._table())
+
+    def test_follow_up_stored_after_a_poll_is_analyzed(self):
+        # A poll stores its 06:45 slot before the follow-up of the daily run
+        # stores the 06:40 slot
+        self._write([("2025-03-03 06:45:00", 6.4, 95.0, "mnd")])
+        with storage.connection() as conn:
+            analytics.update(conn)
+        self._write([("2025-03-03 06:40:00", 6.5, 95.5, "mnd")])
+
+        with storage.connection() as conn:
+            self.assertEqual(analytics.update(conn), 2)
+        rows = [dict(zip(analytics.COLUMNS, row)) for row in self._table()]
+        self.assertEqual([row["mortgage_rate"] for row in rows], [6.5, 6.4])
+        self.assertAlmostEqual(rows[1]["rate_ma7"], 6.45)
+
+    def test_rewritten_rows_are_recomputed(self):
+        rates, quotes = daily_rows(20)
+        self._write(rates, quotes)
+        with storage.connection() as conn:
+            analytics.update(conn)
+        # A rerun of the slot stores another value under the same key
+        timestamp, _, price, source = rates[15]
+        self._write([(timestamp, 6.5, price, source)])
+
+        with storage.connection() as conn:
+            self.assertEqual(analytics.update(conn), 5)
+            self.assertEqual(analytics.update(conn), 0)
+        incremental = self._table()
+        rate = incremental[15][analytics.COLUMNS.index("mortgage_rate")]
+        self.assertEqual(rate, 6.5)
+
+        with storage.connection() as conn:
+            analytics.rebuild(conn)
+        self.assertTablesEqual(incremental, self._table())
+        # Writing the same values again is not a rewrite
+        self._write([(timestamp, 6.5, price, source)])
+        with storage.connection() as conn:
+            self.assertEqual(analytics.update(conn), 0)
+
+    def test_spool_flush_updates_the_table(self):
+        queue = spool.Spool(os.path.join(self.tmpdir.name, "spool.ndjson"))
+        queue.append({"kind": "rate", "timestamp": "2025-09-01 06:40:00",
+                      "mortgage_rate": 6.3, "mbb_price": 95.0, "source": "mnd"})
+
+        self.assertTrue(spool.Flusher(queue).flush())
+        self.assertEqual(len(self._table()), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# Created by AI
@@ -0,0 +1,136 @@
+import json
+import os
+import tempfile
+import unittest
+import urllib.error
+import urllib.request
+from unittest.mock import patch
+
+import src.storage as storage
+import src.queries as queries
+import src.metrics as metrics
+from src.api import start_server
+
+
+class TestRatesApi(unittest.TestCase):
+
+    def setUp(self):
+        storage.USE_POSTGRES = False
+        storage.TABLE_NAME = "rates_mbb"
+        storage.QUOTES_TABLE = "quotes"
+        self.original_tz = storage.LOCAL_TZ
+        storage.LOCAL_TZ = "UTC"
+        self.tmpdir = tempfile.TemporaryDirectory()
+        storage.SQLITE_FILE = os.path.join(self.tmpdir.name, "api.sqlite3")
+        queries.clear_cache()
+
+        with storage.connection() as conn:
+            storage.init_db(conn)
+            storage.bulk_insert(conn, [
+                ("2025-09-01 06:40:00", 6.30, 95.0),
+                ("2025-09-02 06:40:00", 6.20, 95.5),
+                ("2025-09-08 06:40:00", None, 96.5),
+            ], source="mnd")
+
+        self.server = start_server("127.0.0.1", 0)
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        storage.close_connections()
+        storage.LOCAL_TZ = self.original_tz
+        self.tmpdir.cleanup()
+
+    def _get(self, path, headers=None):
+        request = urllib.request.Request(self.base + path, headers=headers or {})
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers, e.read()
+
+    def test_latest(self):
+        status, headers, body = self._get("/latest")
+        self.assertEqual(status, 200)
+        data = json.loads(body)["data"]
+        self.assertEqual(data["timestamp"], "2025-09-08 06:40:00")
+        self.assertEqual(data["ts"], "2025-09-08T06:40:00+00:00")
+        self.assertIsNone(data["mortgage_rate"])
+        self.assertEqual(headers["Last-Modified"], "Mon, 08 Sep 2025 06:40:00 GMT")
+
+    def test_range_filters_and_serializes_nulls(self):
+        status, _, body = self._get("/range?start=2025-09-02&end=2025-09-09")
+        self.assertEqual(status, 200)
+        data = json.loads(body)["data"]
+        self.assertEqual([row["mbb_price"] for row in data], [95.5, 96.5])
+        self.assertIsNone(data[-1]["mortgage_rate"])
+
+    def test_rollup(self):
+        status, _, body = self._get("/rollup?freq=W&how=max")
+        self.assertEqual(status, 200)
+        data = json.loads(body)["data"]
+        self.assertEqual(len(data), 2)
+        self.assertEqual(data[0]["mbb_price"], 95.5)
+
+    def test_summary(self):
+        status, _, body = self._get("/summary")
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)["data"]["mbb_price"]["count"], 3)
+
+    def test_etag_revalidation_returns_304(self):
+        _, headers, _ = self._get("/range")
+        status, _, body = self._get("/range", {"If-None-Match": headers["ETag"]})
+        self.assertEqual(status, 304)
+        self.assertEqual(body, b"")
+
+    def test_if_modified_since_returns_304(self):
+        _, headers, _ = self._get("/latest")
+        status, _, _ = self._get("/latest", {"If-Modified-Since": headers["Last-Modified"]})
+        self.assertEqual(status, 304)
+
+    def test_new_write_changes_etag(self):
+        _, headers, _ = self._get("/latest")
+        with storage.connection() as conn:
+            storage.update_table(conn, "2025-09-09 06:40:00", 6.0, 97.0)
+
+        status, new_headers, body = self._get("/latest", {"If-None-Match": headers["ETag"]})
+        self.assertEqual(status, 200)
+        self.assertNotEqual(new_headers["ETag"], headers["ETag"])
+        self.assertEqual(json.loads(body)["data"]["mbb_price"], 97.0)
+
+    def test_bad_parameters_return_400(self):
+        status, _, _ = self._get("/rollup?how=explode")
+        self.assertEqual(status, 400)
+        status, _, _ = self._get("/range?start=yesterday")
+        self.assertEqual(status, 400)
+
+    def test_unknown_route_returns_404(self):
+        status, _, _ = self._get("/nope")
+        self.assertEqual(status, 404)
+
+    def test_metrics_are_served_in_prometheus_format(self):
+        metrics.reset()
+        metrics.observe("ping", 0.2)
+        status, headers, body = self._get("/metrics")
+        self.assertEqual(status, 200)
+        self.assertTrue(headers["Content-Type"].startswith("text/plain"))
+        text = body.decode()
+        self.assertIn('mortgage_monitor_stage_duration_seconds_count{stage="ping"} 1', text)
+        self.assertIn("mortgage_monitor_data_age_seconds ", text)
+
+    def test_ready_reflects_data_age(self):
+        # The fixture rows are from 2025, far older than STALE_AFTER
+        status, _, body = self._get("/ready")
+        self.assertEqual(status, 503)
+        self.assertFalse(json.loads(body)["ready"])
+
+        with patch("src.health.STALE_AFTER", float("inf")):
+            status, _, body = self._get("/ready")
+        self.assertEqual(status, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# Created by AI
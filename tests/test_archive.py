@@ -0,0 +1,131 @@
+import os
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+import src.archive as archive
+import src.storage as storage
+
+# 2025-10-18, so July and August are closed months when September stays live
+NOW = datetime(2025, 10, 18, tzinfo=timezone.utc).timestamp()
+
+
+def daily_rows(first, last):
+    """
+    (rates rows, quote rows) for one sample a day in [first, last], with one missing rate.
+    """
+    rates, quotes = [], []
+    day = date.fromisoformat(first)
+    while day <= date.fromisoformat(last):
+        timestamp = f"{day} 06:40:00"
+        rate = None if day.day == 13 else 6.0 + day.day / 100
+        rates.append((timestamp, rate, 95.0 + day.day / 10, "mnd"))
+        quotes.append((timestamp, "MBB", 95.0 + day.day / 10))
+        quotes.append((timestamp, "^TNX", 4.0 + day.day / 100))
+        day += timedelta(days=1)
+    return rates, quotes
+
+
+class TestArchive(unittest.TestCase):
+
+    def setUp(self):
+        storage.USE_POSTGRES = False
+        storage.TABLE_NAME = "rates_mbb"
+        storage.QUOTES_TABLE = "quotes"
+        self.original_tz = storage.LOCAL_TZ
+        storage.LOCAL_TZ = "UTC"
+        self.tmpdir = tempfile.TemporaryDirectory()
+        storage.SQLITE_FILE = os.path.join(self.tmpdir.name, "archive.sqlite3")
+        self.original_dir = archive.ARCHIVE_DIR
+        archive.ARCHIVE_DIR = os.path.join(self.tmpdir.name, "archive")
+        with storage.connection() as conn:
+            storage.init_db(conn)
+            storage.write_batch(conn, *daily_rows("2025-07-01", "2025-09-30"))
+
+    def tearDown(self):
+        archive.ARCHIVE_DIR = self.original_dir
+        storage.close_connections()
+        storage.LOCAL_TZ = self.original_tz
+        self.tmpdir.cleanup()
+
+    def _live_count(self):
+        with storage.connection() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {storage.TABLE_NAME}").fetchone()[0]
+
+    def test_roll_archives_closed_months_once(self):
+        self.assertEqual(archive.roll(now=NOW, keep=2), 2)
+
+        partitions = archive.load_manifest()["partitions"]
+        self.assertEqual(sorted(partitions), ["2025-07", "2025-08"])
+        self.assertEqual(partitions["2025-07"]["rates"], 31)
+        self.assertEqual(partitions["2025-08"]["quotes"], {"MBB": 31, "^TNX": 31})
+        # Nothing changed, so nothing is rewritten; rows stay live without pruning
+        self.assertEqual(archive.roll(now=NOW, keep=2), 0)
+        self.assertEqual(self._live_count(), 92)
+
+    def test_read_inside_one_month_maps_the_files(self):
+        archive.roll(now=NOW, keep=2)
+
+        arrays = archive.read("2025-07-05", "2025-07-10", live=False)
+
+        self.assertIsInstance(arrays["ts"], np.memmap)
+        self.assertFalse(arrays["mortgage_rate"].flags.writeable)
+        self.assertEqual(len(arrays["ts"]), 5)
+        self.assertEqual(arrays["ts"][0], datetime(2025, 7, 5, 6, 40, tzinfo=timezone.utc).timestamp())
+        self.assertAlmostEqual(arrays["mortgage_rate"][0], 6.05)
+
+    def test_reads_match_the_live_table(self):
+        before = archive.read("2025-07-20", "2025-09-10")
+        quotes_before = archive.read(symbol="^TNX")
+
+        archive.roll(now=NOW, keep=2, prune=True)
+
+        self.assertEqual(self._live_count(), 30)
+        after = archive.read("2025-07-20", "2025-09-10")
+        for column in archive.READ_COLUMNS["rates"]:
+            np.testing.assert_array_equal(after[column], before[column])
+        self.assertTrue(np.isnan(after["mortgage_rate"][list(after["ts"]).index(
+            datetime(2025, 8, 13, 6, 40, tzinfo=timezone.utc).timestamp()
+        )]))
+        np.testing.assert_array_equal(archive.read(symbol="^TNX")["price"], quotes_before["price"])
+
+    def test_rows_added_to_an_archived_month_are_merged(self):
+        archive.roll(now=NOW, keep=2, prune=True)
+        with storage.connection() as conn:
+            storage.write_batch(conn, [("2025-07-15 12:00:00", 6.5, 96.0, "mnd")], [])
+
+        self.assertEqual(archive.roll(now=NOW, keep=2, prune=True), 1)
+
+        self.assertEqual(archive.load_manifest()["partitions"]["2025-07"]["rates"], 32)
+        self.assertEqual(self._live_count(), 30)
+        july = archive.read("2025-07-15", "2025-07-16")
+        self.assertEqual(list(july["mortgage_rate"]), [6.15, 6.5])
+
+    def test_rewrites_go_to_a_new_directory_named_by_the_manifest(self):
+        archive.roll(now=NOW, keep=2)
+        manifest = archive.load_manifest()
+        for day in ("2025-07-15 12:00:00", "2025-07-16 12:00:00"):
+            with storage.connection() as conn:
+                storage.write_batch(conn, [(day, 6.5, 96.0, "mnd")], [])
+            archive.roll(now=NOW, keep=2)
+
+        # Only the version before the current one is kept, for readers holding the old manifest
+        self.assertEqual(manifest["partitions"]["2025-07"]["dir"], "2025-07.v1")
+        self.assertEqual(archive.load_manifest()["partitions"]["2025-07"]["dir"], "2025-07.v3")
+        self.assertEqual(
+            sorted(name for name in os.listdir(archive.ARCHIVE_DIR) if name.startswith("2025-07")),
+            ["2025-07.v2", "2025-07.v3"]
+        )
+        self.assertEqual(len(archive.read("2025-07-01", "2025-08-01", live=False)["ts"]), 33)
+
+    def test_keep_zero_is_off(self):
+        self.assertEqual(archive.roll(now=NOW, keep=0), 0)
+        self.assertFalse(os.path.exists(archive.ARCHIVE_DIR))
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# Created by AI
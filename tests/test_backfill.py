@@ -0,0 +1,114 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import backfill
+import src.storage as storage
+
+
+class TestBackfillHelpers(unittest.TestCase):
+
+    def test_missing_weekdays_skips_weekends_and_present_days(self):
+        # 2025-09-05 is a Friday
+        missing = backfill.missing_weekdays("2025-09-04", "2025-09-09", {"2025-09-05"})
+        self.assertEqual(missing, ["2025-09-04", "2025-09-08", "2025-09-09"])
+
+    def test_year_windows_spans_each_year(self):
+        days = ["2023-03-01", "2023-11-30", "2024-01-02", "2024-06-05"]
+        self.assertEqual(
+            backfill.year_windows(days),
+            [("2023-03-01", "2023-11-30"), ("2024-01-02", "2024-06-05")]
+        )
+
+    def test_load_rates_csv(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as f:
+            f.write("date,rate\n2025-09-04,6.29\n2025-09-05,6.31\n")
+        try:
+            self.assertEqual(
+                backfill.load_rates_csv(f.name),
+                {"2025-09-04": 6.29, "2025-09-05": 6.31}
+            )
+        finally:
+            os.unlink(f.name)
+
+
+class TestBackfill(unittest.TestCase):
+
+    def setUp(self):
+        storage.USE_POSTGRES = False
+        storage.TABLE_NAME = "test_table"
+        self.tmpdir = tempfile.TemporaryDirectory()
+        storage.SQLITE_FILE = os.path.join(self.tmpdir.name, "backfill.sqlite3")
+
+    def tearDown(self):
+        storage.close_connections()
+        self.tmpdir.cleanup()
+
+    def _history(self, ticker, start, end):
+        prices = {
+            "2025-09-03": 95.0, "2025-09-04": 95.5,
+            "2025-09-05": 96.0, "2025-09-08": 96.5,
+        }
+        return {day: p for day, p in prices.items() if start <= day <= end}
+
+    def _rows(self):
+        with storage.connection() as conn:
+            return conn.execute(
+                f"SELECT timestamp, mortgage_rate, mbb_price FROM {storage.TABLE_NAME} ORDER BY timestamp"
+            ).fetchall()
+
+    def test_fills_only_missing_days(self):
+        with storage.connection() as conn:
+            storage.init_db(conn)
+            storage.update_table(conn, "2025-09-04 06:40:00", 6.3, 95.4)
+
+        with patch("backfill.get_price_history", side_effect=self._history):
+            inserted = backfill.backfill("2025-09-03", "2025-09-08", {"2025-09-05": 6.31})
+
+        self.assertEqual(inserted, 3)
+        self.assertEqual(self._rows(), [
+            ("2025-09-03 00:00:00", None, 95.0),
+            ("2025-09-04 06:40:00", 6.3, 95.4),
+            ("2025-09-05 00:00:00", 6.31, 96.0),
+            ("2025-09-08 00:00:00", None, 96.5),
+        ])
+        # The analytics table is rebuilt to include the older days
+        with storage.connection() as conn:
+            count = conn.execute(f"SELECT COUNT(*) FROM {storage.ANALYTICS_TABLE}").fetchone()[0]
+        self.assertEqual(count, 4)
+
+    def test_rerun_is_a_no_op(self):
+        with patch("backfill.get_price_history", side_effect=self._history) as mock_history:
+            backfill.backfill("2025-09-03", "2025-09-08")
+            mock_history.reset_mock()
+            inserted = backfill.backfill("2025-09-03", "2025-09-08")
+
+        self.assertEqual(inserted, 0)
+        mock_history.assert_not_called()
+        self.assertEqual(len(self._rows()), 4)
+
+    def test_rates_csv_fills_rates_into_earlier_backfill(self):
+        with patch("backfill.get_price_history", side_effect=self._history):
+            backfill.backfill("2025-09-03", "2025-09-08")
+            inserted = backfill.backfill("2025-09-03", "2025-09-08", {"2025-09-04": 6.29})
+
+        self.assertEqual(inserted, 1)
+        self.assertEqual(self._rows(), [
+            ("2025-09-03 00:00:00", None, 95.0),
+            ("2025-09-04 00:00:00", 6.29, 95.5),
+            ("2025-09-05 00:00:00", None, 96.0),
+            ("2025-09-08 00:00:00", None, 96.5),
+        ])
+
+    def test_failed_window_is_logged_and_skipped(self):
+        with patch("backfill.get_price_history", side_effect=RuntimeError("down")), \
+             self.assertLogs("backfill", level="ERROR"):
+            inserted = backfill.backfill("2025-09-03", "2025-09-08")
+        self.assertEqual(inserted, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# Created by AI
@@ -0,0 +1,43 @@
+import json
+import os
+import unittest
+
+from benchmarks import bench_e2e
+
+
+class TestBenchE2E(unittest.TestCase):
+
+    def test_run_reports_every_metric(self):
+        results = bench_e2e.run(iterations=2, rows=100)
+
+        with open(bench_e2e.BASELINE_FILE) as f:
+            baseline = json.load(f)["results"]
+        sqlite_metrics = {m for m in baseline if not m.startswith("postgres_")}
+        self.assertLessEqual(sqlite_metrics, set(results))
+        for metric, value in results.items():
+            self.assertGreater(value, 0, metric)
+
+    def test_compare_flags_slower_times_and_lower_throughput(self):
+        baseline = {"parse_ms": 1.0, "sqlite_bulk_rows_per_s": 1000.0, "job_p50_ms": 10.0}
+        results = {"parse_ms": 2.0, "sqlite_bulk_rows_per_s": 500.0, "job_p50_ms": 11.0}
+
+        regressions = bench_e2e.compare(results, baseline, tolerance=1.5)
+
+        self.assertEqual(
+            [metric for metric, _, _ in regressions],
+            ["parse_ms", "sqlite_bulk_rows_per_s"],
+        )
+
+    def test_compare_ignores_metrics_missing_from_the_run(self):
+        # e.g. Postgres numbers recorded on a machine with a database
+        self.assertEqual(bench_e2e.compare({}, {"postgres_bulk_rows_per_s": 1.0}), [])
+
+    def test_recorded_fixtures_exist(self):
+        for name in ("mnd_rates.html", "pmms_history.csv", "yahoo_chart_mbb.json"):
+            self.assertTrue(os.path.exists(os.path.join(bench_e2e.FIXTURE_DIR, name)))
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# Created by AI
@@ -0,0 +1,164 @@
+import csv
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import patch, MagicMock
+
+import export
+import src.storage as storage
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+
+class TestExport(unittest.TestCase):
+
+    def setUp(self):
+        storage.USE_POSTGRES = False
+        storage.TABLE_NAME = "rates_mbb"
+        storage.QUOTES_TABLE = "quotes"
+        self.original_tz = storage.LOCAL_TZ
+        storage.LOCAL_TZ = "UTC"
+        self.tmpdir = tempfile.TemporaryDirectory()
+        storage.SQLITE_FILE = os.path.join(self.tmpdir.name, "export.sqlite3")
+        self.state_file = os.path.join(self.tmpdir.name, "state.json")
+
+        with storage.connection() as conn:
+            storage.init_db(conn)
+            storage.bulk_insert(conn, [
+                (f"2025-09-{day:02d} 06:40:00", 6.0 + day / 100, 95.0 + day)
+                for day in range(1, 8)
+            ], source="mnd")
+
+    def tearDown(self):
+        storage.close_connections()
+        storage.LOCAL_TZ = self.original_tz
+        self.tmpdir.cleanup()
+
+    def _path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def test_csv_export_in_small_chunks(self):
+        output = self._path("rates.csv")
+        count = export.export("csv", output, chunk_size=3, state_file=self.state_file)
+
+        self.assertEqual(count, 7)
+        with open(output, newline="") as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(rows[0]["ts"], "2025-09-01T06:40:00+00:00")
+        self.assertEqual(float(rows[-1]["mbb_price"]), 102.0)
+        self.assertFalse(os.path.exists(output + ".tmp"))
+
+    def test_ndjson_gzip_with_time_range(self):
+        output = self._path("rates.ndjson.gz")
+        count = export.export(
+            "ndjson", output, start="2025-09-03", end="2025-09-05",
+            compression="gzip", state_file=self.state_file
+        )
+
+        self.assertEqual(count, 2)
+        with gzip.open(output, "rt") as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([r["timestamp"] for r in records],
+                         ["2025-09-03 06:40:00", "2025-09-04 06:40:00"])
+        self.assertEqual(records[0]["source"], "mnd")
+
+    @unittest.skipIf(pq is None, "pyarrow is not installed")
+    def test_parquet_export(self):
+        output = self._path("rates.parquet")
+        count = export.export("parquet", output, chunk_size=2, compression="zstd",
+                              state_file=self.state_file)
+
+        self.assertEqual(count, 7)
+        table = pq.read_table(output)
+        self.assertEqual(table.num_rows, 7)
+        # Parquet has no second resolution, so pyarrow stores ts as milliseconds
+        self.assertEqual(table.schema.field("ts").type.tz, "UTC")
+        self.assertEqual(
+            table.column("ts")[0].as_py().isoformat(), "2025-09-01T06:40:00+00:00"
+        )
+        # One row group per streamed chunk
+        self.assertEqual(pq.ParquetFile(output).num_row_groups, 4)
+
+    def test_incremental_exports_only_new_rows(self):
+        first = export.export("csv", self._path("a.csv"), incremental=True,
+                              state_file=self.state_file)
+        with storage.connection() as conn:
+            storage.update_table(conn, "2025-09-08 06:40:00", 6.2, 103.0)
+        second = export.export("csv", self._path("b.csv"), incremental=True,
+                               state_file=self.state_file)
+        third = export.export("csv", self._path("c.csv"), incremental=True,
+                              state_file=self.state_file)
+
+        self.assertEqual((first, second, third), (7, 1, 0))
+        with open(self._path("b.csv"), newline="") as f:
+            self.assertEqual(list(csv.DictReader(f))[0]["mbb_price"], "103.0")
+        # Nothing new means no file is written
+        self.assertFalse(os.path.exists(self._path("c.csv")))
+
+    def test_incremental_exports_back_dated_and_rewritten_rows(self):
+        export.export("csv", self._path("a.csv"), incremental=True, state_file=self.state_file)
+        with storage.connection() as conn:
+            # A follow-up stored under an earlier slot, and a slot stored again
+            storage.update_table(conn, "2025-09-06 12:00:00", 6.1, 101.0)
+            storage.update_table(conn, "2025-09-02 06:40:00", 6.5, 97.0)
+            storage.update_table(conn, "2025-09-03 06:40:00", 6.03, 98.0)
+
+        self.assertEqual(export.export("csv", self._path("b.csv"), incremental=True,
+                                       state_file=self.state_file), 2)
+        with open(self._path("b.csv"), newline="") as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([row["mortgage_rate"] for row in rows], ["6.5", "6.1"])
+        self.assertEqual(rows[0]["id"], "2")
+
+    def test_incremental_state_from_before_ids_is_honoured(self):
+        with open(self.state_file, "w") as f:
+            json.dump({"last_ts": int(datetime(2025, 9, 5, 6, 40, tzinfo=timezone.utc).timestamp())}, f)
+
+        self.assertEqual(export.export("csv", self._path("a.csv"), incremental=True,
+                                       state_file=self.state_file), 2)
+        self.assertEqual(export.export("csv", self._path("b.csv"), incremental=True,
+                                       state_file=self.state_file), 0)
+
+    def test_failed_export_leaves_no_partial_file_or_state(self):
+        output = self._path("broken.csv")
+        with patch("export.iter_rows", side_effect=RuntimeError("db gone")):
+            with self.assertRaises(RuntimeError):
+                export.export("csv", output, incremental=True, state_file=self.state_file)
+        self.assertFalse(os.path.exists(output))
+        self.assertFalse(os.path.exists(output + ".tmp"))
+        self.assertFalse(os.path.exists(self.state_file))
+
+
+class TestIterRowsPostgres(unittest.TestCase):
+
+    def setUp(self):
+        storage.USE_POSTGRES = True
+
+    def tearDown(self):
+        storage.USE_POSTGRES = False
+
+    def test_uses_named_server_side_cursor(self):
+        conn = MagicMock()
+        cursor = conn.cursor.return_value
+        cursor.fetchmany.side_effect = [[(1,)], []]
+
+        chunks = list(storage.iter_rows(conn, start="2025-09-01", chunk_size=500))
+
+        conn.cursor.assert_called_once_with(name="iter_rows")
+        self.assertEqual(cursor.itersize, 500)
+        self.assertEqual(chunks, [[(1,)]])
+        cursor.fetchmany.assert_called_with(500)
+        cursor.close.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# Created by AI
@@ -0,0 +1,40 @@
+import unittest
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from src.retry import reset_breakers
+from src.fetch import get_price_history
+
+
+class TestGetPriceHistory(unittest.TestCase):
+
+    def setUp(self):
+        reset_breakers()
+
+    @patch.object(yf, "download")
+    def test_returns_closes_keyed_by_day(self, mock_download):
+        index = pd.to_datetime(["2025-09-04", "2025-09-05", "2025-09-08"])
+        columns = pd.MultiIndex.from_product([["Close"], ["MBB"]])
+        mock_download.return_value = pd.DataFrame(
+            [[95.0], [np.nan], [96.5]], index=index, columns=columns
+        )
+
+        result = get_price_history("MBB", "2025-09-04", "2025-09-08")
+
+        self.assertEqual(result, {"2025-09-04": 95.0, "2025-09-08": 96.5})
+        # The requested end day is included
+        self.assertEqual(mock_download.call_args.kwargs["end"], "2025-09-09")
+
+    @patch("src.retry.time.sleep")
+    @patch.object(yf, "download")
+    def test_empty_history(self, mock_download, mock_sleep):
+        mock_download.return_value = pd.DataFrame()
+        self.assertEqual(get_price_history("MBB", "2025-09-04", "2025-09-08"), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# Created by AI
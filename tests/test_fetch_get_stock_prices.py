@@ -0,0 +1,62 @@
+import unittest
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from src.retry import reset_breakers
+from src.fetch import get_stock_prices
+
+
+def _download_frame(closes):
+    # Mimic yf.download(group_by="column", multi_level_index=True)
+    columns = pd.MultiIndex.from_product([["Close", "Open"], list(closes)], names=["Price", "Ticker"])
+    values = [[*closes.values(), *closes.values()] for _ in range(2)]
+    frame = pd.DataFrame(values, columns=columns)
+    return frame
+
+
+class TestGetStockPrices(unittest.TestCase):
+
+    def setUp(self):
+        reset_breakers()
+
+    @patch.object(yf, "download")
+    def test_single_batched_download_for_all_symbols(self, mock_download):
+        mock_download.return_value = _download_frame({"MBB": 95.5, "TLT": 88.25})
+
+        result = get_stock_prices(["MBB", "TLT"])
+
+        mock_download.assert_called_once()
+        self.assertEqual(mock_download.call_args[0][0], ["MBB", "TLT"])
+        self.assertEqual(result, {"MBB": 95.5, "TLT": 88.25})
+
+    @patch.object(yf, "download")
+    def test_missing_symbols_are_dropped(self, mock_download):
+        frame = _download_frame({"MBB": 95.5, "JMBS": np.nan})
+        mock_download.return_value = frame
+
+        result = get_stock_prices(["MBB", "JMBS"])
+        self.assertEqual(result, {"MBB": 95.5})
+
+    @patch.object(yf, "download")
+    def test_last_valid_close_is_used(self, mock_download):
+        columns = pd.MultiIndex.from_product([["Close"], ["MBB", "TLT"]])
+        mock_download.return_value = pd.DataFrame(
+            [[95.0, 88.0], [96.0, np.nan]], columns=columns
+        )
+
+        result = get_stock_prices(["MBB", "TLT"])
+        self.assertEqual(result, {"MBB": 96.0, "TLT": 88.0})
+
+    @patch("src.retry.time.sleep")
+    @patch.object(yf, "download")
+    def test_empty_download_returns_empty_dict(self, mock_download, mock_sleep):
+        mock_download.return_value = pd.DataFrame()
+        self.assertEqual(get_stock_prices(["MBB"]), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# Created by AI
@@ -1,14 +1,17 @@
 import unittest
 from unittest.mock import patch, Mock
-from src.fetch import extract_30yr_rate
+import requests
+from src.fetch import fetch_page, parse_30yr_rate
+from src.retry import reset_breakers
 
-class TestExtract30YrRate(unittest.TestCase):
+class TestParse30YrRate(unittest.TestCase):
 
     def setUp(self):
         self.url = "http://example.com/mortgage-rates"
+        reset_breakers()
 
-    @patch("src.fetch.requests.get")
-    def test_successful_rate_extraction(self, mock_get):
+    @patch("src.fetch.get_session")
+    def test_successful_rate_extraction(self, mock_session):
         # HTML contains a 30 Yr. Fixed row with a percentage value
         html = """
             <table>
@@ -19,13 +22,13 @@ class TestExtract30YrRate(unittest.TestCase):
             </table>
         """
         mock_response = Mock(status_code=200, text=html)
-        mock_get.return_value = mock_response
+        mock_session.return_value.get.return_value = mock_response
 
-        rate = extract_30yr_rate(self.url)
+        rate = parse_30yr_rate(fetch_page(self.url).text)
         self.assertEqual(rate, 3.75)
 
-    @patch("src.fetch.requests.get")
-    def test_raw_value_returned_on_value_error(self, mock_get):
+    @patch("src.fetch.get_session")
+    def test_raw_value_returned_on_value_error(self, mock_session):
         # HTML has non-numeric rate cell (e.g., “TBD”)
         html = """
             <table>
@@ -36,24 +39,25 @@ class TestExtract30YrRate(unittest.TestCase):
             </table>
         """
         mock_response = Mock(status_code=200, text=html)
-        mock_get.return_value = mock_response
+        mock_session.return_value.get.return_value = mock_response
 
-        rate = extract_30yr_rate(self.url)
+        rate = parse_30yr_rate(fetch_page(self.url).text)
         self.assertEqual(rate, "TBD")
 
-    @patch("src.fetch.requests.get")
-    def test_raises_exception_on_bad_status(self, mock_get):
+    @patch("src.fetch.get_session")
+    def test_raises_exception_on_bad_status(self, mock_session):
         # Simulate a non-200 HTTP response
         mock_response = Mock(status_code=404, text="Not Found")
-        mock_get.return_value = mock_response
+        mock_response.raise_for_status.side_effect = requests.HTTPError("404 Client Error")
+        mock_session.return_value.get.return_value = mock_response
 
-        with self.assertRaises(Exception) as cm:
-            extract_30yr_rate(self.url)
+        with self.assertRaises(requests.HTTPError) as cm:
+            parse_30yr_rate(fetch_page(self.url).text)
 
-        self.assertIn("Error fetching page: 404", str(cm.exception))
+        self.assertIn("404", str(cm.exception))
 
-    @patch("src.fetch.requests.get")
-    def test_returns_none_if_no_30yr_row(self, mock_get):
+    @patch("src.fetch.get_session")
+    def test_returns_none_if_no_30yr_row(self, mock_session):
         # HTML does not include any “30 Yr. Fixed” row
         html = """
             <table>
@@ -64,9 +68,9 @@ class TestExtract30YrRate(unittest.TestCase):
             </table>
         """
         mock_response = Mock(status_code=200, text=html)
-        mock_get.return_value = mock_response
+        mock_session.return_value.get.return_value = mock_response
 
-        rate = extract_30yr_rate(self.url)
+        rate = parse_30yr_rate(fetch_page(self.url).text)
         self.assertIsNone(rate)
 
 
@@ -0,0 +1,66 @@
+import os
+import unittest
+from unittest.mock import patch
+
+from src.fetch import parse_rate_table, parse_30yr_rate
+from benchmarks.bench_extract import legacy_extract_30yr_rate, compare
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "mnd_rates.html")
+
+
+class TestParseRateTable(unittest.TestCase):
+
+    def setUp(self):
+        with open(FIXTURE, encoding="utf-8") as f:
+            self.html = f.read()
+
+    def test_returns_every_product_with_change(self):
+        products = parse_rate_table(self.html)
+
+        self.assertEqual(products["30 Yr. Fixed"], {"rate": 6.30, "change": -0.02})
+        self.assertEqual(products["15 Yr. Fixed"], {"rate": 5.79, "change": 0.01})
+        self.assertEqual(products["30 Yr. FHA"]["rate"], 5.84)
+        self.assertEqual(products["30 Yr. Jumbo"]["rate"], 6.48)
+        self.assertEqual(products["30 Yr. VA"]["rate"], 5.86)
+        # Header rows without data cells are skipped
+        self.assertNotIn("Product", products)
+
+    def test_matches_legacy_extractor(self):
+        self.assertEqual(parse_30yr_rate(self.html), legacy_extract_30yr_rate(self.html))
+
+    def test_handles_unclosed_cells_and_rows(self):
+        html = "<table><tr><th>30 Yr. Fixed<td>6.10%<td>-0.05<tr><th>15 Yr. Fixed<td>5.50%</table>"
+        products = parse_rate_table(html)
+        self.assertEqual(products["30 Yr. Fixed"], {"rate": 6.10, "change": -0.05})
+        self.assertEqual(products["15 Yr. Fixed"], {"rate": 5.50, "change": None})
+
+    def test_rows_outside_tables_are_still_found(self):
+        html = "<tr><th>30 Yr. Fixed</th><td>7.00%</td></tr>"
+        self.assertEqual(parse_30yr_rate(html), 7.0)
+
+    def test_unchanged_tables_reuse_the_last_parse(self):
+        first = parse_rate_table(self.html)
+
+        # Markup outside the rate tables does not count as a change
+        with patch("src.fetch._RateTableParser") as parser:
+            again = parse_rate_table("<p>Updated headline</p>" + self.html)
+        parser.assert_not_called()
+        self.assertEqual(again, first)
+
+        # Callers get their own copy of the reused result
+        again["30 Yr. Fixed"]["rate"] = 0.0
+        self.assertEqual(parse_30yr_rate(self.html), 6.30)
+        self.assertEqual(parse_30yr_rate(self.html.replace("6.30%", "6.25%")), 6.25)
+
+    def test_benchmark_reports_each_fixture(self):
+        results = compare(iterations=1)
+        self.assertIn("mnd_rates.html", [r["fixture"] for r in results])
+        for r in results:
+            self.assertGreater(r["legacy_ms"], 0)
+            self.assertGreater(r["table_ms"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# Created by AI
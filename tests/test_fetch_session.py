@@ -0,0 +1,62 @@
+import unittest
+from unittest.mock import patch, Mock
+import requests
+
+import src.fetch as fetch
+
+
+class TestSharedSession(unittest.TestCase):
+
+    def setUp(self):
+        fetch.close_session()
+
+    def tearDown(self):
+        fetch.close_session()
+
+    def test_get_session_reuses_one_session(self):
+        first = fetch.get_session()
+        second = fetch.get_session()
+        self.assertIs(first, second)
+        self.assertIsInstance(first, requests.Session)
+
+    def test_get_session_mounts_pooled_adapter(self):
+        session = fetch.get_session()
+        adapter = session.get_adapter("https://example.com")
+        self.assertEqual(adapter._pool_maxsize, fetch.HTTP_POOL_SIZE)
+        self.assertEqual(session.headers["User-Agent"], fetch.HTTP_USER_AGENT)
+
+    def test_close_session_discards_session(self):
+        first = fetch.get_session()
+        fetch.close_session()
+        self.assertIsNot(fetch.get_session(), first)
+
+
+class TestFetchPage(unittest.TestCase):
+
+    @patch("src.fetch.get_session")
+    def test_fetch_page_uses_session_and_timeout(self, mock_session):
+        mock_response = Mock(status_code=200, text="<html></html>")
+        mock_session.return_value.get.return_value = mock_response
+
+        response = fetch.fetch_page("http://example.com")
+
+        mock_session.return_value.get.assert_called_once_with(
+            "http://example.com", timeout=fetch.HTTP_TIMEOUT
+        )
+        mock_response.raise_for_status.assert_called_once()
+        self.assertIs(response, mock_response)
+
+    @patch("src.fetch.get_session")
+    def test_fetch_page_raises_on_http_error(self, mock_session):
+        mock_response = Mock(status_code=503)
+        mock_response.raise_for_status.side_effect = requests.HTTPError("503")
+        mock_session.return_value.get.return_value = mock_response
+
+        with self.assertRaises(requests.RequestException):
+            fetch.fetch_page("http://example.com")
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# Created by AI
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import src.storage as storage
+import src.queries as queries
+import src.health as health
+
+
+class TestHealth(unittest.TestCase):
+
+    def setUp(self):
+        storage.USE_POSTGRES = False
+        storage.TABLE_NAME = "rates_mbb"
+        storage.QUOTES_TABLE = "quotes"
+        self.original_tz = storage.LOCAL_TZ
+        storage.LOCAL_TZ = "UTC"
+        self.tmpdir = tempfile.TemporaryDirectory()
+        storage.SQLITE_FILE = os.path.join(self.tmpdir.name, "health.sqlite3")
+        queries.clear_cache()
+        with storage.connection() as conn:
+            storage.init_db(conn)
+        self.newest = datetime(2025, 9, 8, 6, 40, tzinfo=timezone.utc).timestamp()
+
+    def tearDown(self):
+        storage.close_connections()
+        storage.LOCAL_TZ = self.original_tz
+        self.tmpdir.cleanup()
+
+    def _insert(self):
+        with storage.connection() as conn:
+            storage.update_table(conn, "2025-09-08 06:40:00", 6.3, 95.0)
+
+    def test_readiness_is_not_served_from_the_query_cache(self):
+        self.assertIsNone(queries.latest())
+        # A row written by another replica leaves this process's write counter alone
+        with patch("src.queries.storage.data_version", return_value=queries._cache_version):
+            self._insert()
+            ready, details = health.readiness(now=self.newest + 60)
+        self.assertTrue(ready)
+        self.assertEqual(details["data_age_seconds"], 60)
+
+    def test_fresh_data_is_ready(self):
+        self._insert()
+        ready, details = health.readiness(now=self.newest + 3600)
+        self.assertTrue(ready)
+        self.assertEqual(details["data_age_seconds"], 3600)
+
+    def test_stale_data_is_not_ready(self):
+        self._insert()
+        ready, _ = health.readiness(now=self.newest + health.STALE_AFTER + 1)
+        self.assertFalse(ready)
+
+    def test_empty_database_gets_grace_from_creation(self):
+        now = datetime.now(timezone.utc).timestamp()
+        self.assertTrue(health.readiness(now=now)[0])
+        self.assertFalse(health.readiness(now=now + health.STALE_AFTER + 60)[0])
+
+    def test_job_runs_are_recorded(self):
+        started = datetime(2025, 9, 8, 13, 40, tzinfo=timezone.utc)
+        with storage.connection() as conn:
+            storage.record_job_run(
+                conn, started, "daily", False, 1.5, {"ping": 0.4, "quote": 1.2}, "scrape: boom"
+            )
+            rows = conn.execute(
+                "SELECT ts, job, success, duration, ping, scrape, quote, persist, error FROM job_runs"
+            ).fetchall()
+        self.assertEqual(
+            rows, [(int(started.timestamp()), "daily", 0, 1.5, 0.4, None, 1.2, None, "scrape: boom")]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# Created by AI
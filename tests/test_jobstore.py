@@ -0,0 +1,127 @@
+import os
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from apscheduler.events import EVENT_JOB_MISSED
+from apscheduler.job import Job
+from apscheduler.jobstores.base import ConflictingIdError, JobLookupError
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
+
+import src.storage as storage
+import scheduler as app_scheduler
+from src.jobstore import DatabaseJobStore
+
+runs = []
+ran = threading.Event()
+
+def record_run():
+    runs.append(datetime.now(timezone.utc))
+    ran.set()
+
+
+class TestDatabaseJobStore(unittest.TestCase):
+
+    def setUp(self):
+        storage.USE_POSTGRES = False
+        self.tmpdir = tempfile.TemporaryDirectory()
+        storage.SQLITE_FILE = os.path.join(self.tmpdir.name, "jobs.sqlite3")
+        with storage.connection() as conn:
+            storage.init_db(conn)
+        self.now = datetime.now(timezone.utc).replace(microsecond=0)
+        runs.clear()
+        ran.clear()
+
+    def tearDown(self):
+        storage.close_connections()
+        self.tmpdir.cleanup()
+
+    def _scheduler(self, grace=3600):
+        store = DatabaseJobStore()
+        sched = BackgroundScheduler(
+            timezone=timezone.utc, jobstores={"default": store},
+            job_defaults={"misfire_grace_time": grace, "coalesce": True},
+        )
+        return sched, store
+
+    def _job(self, job_id, trigger, next_run_time):
+        sched, store = self._scheduler()
+        store.start(sched, "default")
+        job = Job(
+            sched, id=job_id, func=record_run, trigger=trigger, executor="default",
+            args=(), kwargs={}, name=job_id, misfire_grace_time=3600, coalesce=True,
+            max_instances=1, next_run_time=next_run_time,
+        )
+        return job, store
+
+    def _store_job(self, next_run_time):
+        # A previous process registered the job, then stopped before it ran
+        job, store = self._job(
+            "daily", CronTrigger(hour=6, minute=40, timezone=timezone.utc), next_run_time
+        )
+        store.add_job(job)
+
+    def test_round_trip(self):
+        job, store = self._job(
+            "once", DateTrigger(self.now + timedelta(hours=1)), self.now + timedelta(hours=1)
+        )
+        store.add_job(job)
+
+        self.assertEqual(store.lookup_job("once").func, record_run)
+        self.assertEqual(store.get_next_run_time(), self.now + timedelta(hours=1))
+        self.assertEqual(store.get_due_jobs(self.now), [])
+        self.assertEqual([j.id for j in store.get_due_jobs(self.now + timedelta(hours=2))], ["once"])
+        with self.assertRaises(ConflictingIdError):
+            store.add_job(job)
+
+        job.next_run_time = None
+        store.update_job(job)
+        self.assertIsNone(store.get_next_run_time())
+        self.assertIsNone(store.stored_next_run_time("once"))
+
+        store.remove_job("once")
+        self.assertIsNone(store.lookup_job("once"))
+        with self.assertRaises(JobLookupError):
+            store.remove_job("once")
+
+    def test_missed_run_is_caught_up_after_restart(self):
+        missed = self.now - timedelta(minutes=10)
+        self._store_job(missed)
+
+        sched, store = self._scheduler(grace=3600)
+        options = app_scheduler.restore_options(store, "daily")
+        self.assertEqual(options["next_run_time"], missed)
+        sched.add_job(record_run, CronTrigger(hour=6, minute=40, timezone=timezone.utc),
+                      id="daily", **options)
+        sched.start()
+        try:
+            self.assertTrue(ran.wait(5))
+        finally:
+            sched.shutdown()
+
+        self.assertEqual(len(runs), 1)
+        self.assertGreater(store.stored_next_run_time("daily"), self.now)
+
+    def test_run_older_than_grace_is_skipped(self):
+        self._store_job(self.now - timedelta(hours=3))
+
+        sched, store = self._scheduler(grace=3600)
+        missed = threading.Event()
+        sched.add_listener(lambda event: missed.set(), EVENT_JOB_MISSED)
+        sched.add_job(record_run, CronTrigger(hour=6, minute=40, timezone=timezone.utc),
+                      id="daily", **app_scheduler.restore_options(store, "daily"))
+        sched.start()
+        try:
+            self.assertTrue(missed.wait(5))
+        finally:
+            sched.shutdown()
+        self.assertEqual(runs, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# Created by AI
@@ -0,0 +1,119 @@
+import asyncio
+import unittest
+from unittest.mock import MagicMock, call, patch
+
+import psycopg
+
+import main
+import src.leader as leader
+import src.storage as storage
+
+
+def lock_connection(*lock_results):
+    """
+    Fake psycopg connection whose pg_try_advisory_lock answers come from `lock_results`.
+    """
+    conn = MagicMock(name="lock_connection")
+    conn.closed = False
+    answers = iter(lock_results)
+
+    def execute(sql, params=None):
+        result = MagicMock()
+        if "pg_try_advisory_lock" in sql:
+            result.fetchone.return_value = (next(answers),)
+        return result
+
+    conn.execute.side_effect = execute
+    return conn
+
+
+class TestLeaderLock(unittest.TestCase):
+
+    def setUp(self):
+        storage.USE_POSTGRES = True
+
+    def tearDown(self):
+        storage.USE_POSTGRES = False
+
+    def _statements(self, conn):
+        return [c.args[0] for c in conn.execute.call_args_list]
+
+    def test_sqlite_always_leads(self):
+        storage.USE_POSTGRES = False
+        with patch("src.storage.get_connection") as connect:
+            self.assertTrue(leader.LeaderLock().check())
+        connect.assert_not_called()
+
+    def test_standby_takes_over_once_the_lock_is_free(self):
+        conn = lock_connection(False, True)
+        lock = leader.LeaderLock(key=42, retry=5)
+
+        with patch("src.storage.get_connection", return_value=conn) as connect:
+            self.assertFalse(lock.check())
+            self.assertTrue(lock.check())
+            # The leader only confirms its session is alive from then on
+            self.assertTrue(lock.check())
+
+        connect.assert_called_once()
+        self.assertTrue(conn.autocommit)
+        self.assertEqual(self._statements(conn), [
+            "SET idle_session_timeout = 15000",
+            "SELECT pg_try_advisory_lock(%s)",
+            "SELECT pg_try_advisory_lock(%s)",
+            "SELECT 1",
+        ])
+        self.assertEqual(conn.execute.call_args_list[1], call("SELECT pg_try_advisory_lock(%s)", (42,)))
+
+    def test_broken_connection_gives_up_leadership(self):
+        first = lock_connection(True)
+        second = lock_connection(False)
+        lock = leader.LeaderLock()
+
+        with patch("src.storage.get_connection", side_effect=[first, second]):
+            self.assertTrue(lock.check())
+            first.execute.side_effect = psycopg.OperationalError("server closed the connection")
+            with self.assertLogs("src.leader", level="WARNING"):
+                self.assertFalse(lock.check())
+            first.close.assert_called_once()
+            # Reconnects and competes for the lock again
+            self.assertFalse(lock.check())
+
+
+class FakeLock:
+    """
+    Leader lock that answers check() from a script, then stops the loop.
+    """
+    retry = 0
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.closed = False
+
+    def check(self):
+        if not self.results:
+            raise KeyboardInterrupt
+        return self.results.pop(0)
+
+    def close(self):
+        self.closed = True
+
+
+class TestRunScheduler(unittest.TestCase):
+
+    def test_jobs_run_only_while_leading(self):
+        scheduler = MagicMock()
+        lock = FakeLock(False, True, True, False, True)
+
+        with self.assertRaises(KeyboardInterrupt), self.assertLogs("main", level="INFO"):
+            asyncio.run(main.run_scheduler(scheduler, lock))
+
+        self.assertEqual(scheduler.method_calls, [
+            call.start(paused=True), call.resume(), call.pause(), call.resume(), call.shutdown(),
+        ])
+        self.assertTrue(lock.closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# Created by AI
@@ -0,0 +1,54 @@
+import unittest
+from unittest.mock import patch
+
+import src.metrics as metrics
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        metrics.reset()
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = metrics.Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [1, 2])
+        self.assertEqual(histogram.count, 3)
+        self.assertAlmostEqual(histogram.sum, 5.55)
+
+    def test_timed_records_duration_and_outcome(self):
+        stages = {}
+        with metrics.timed("scrape", stages):
+            pass
+        with self.assertRaises(ValueError):
+            with metrics.timed("scrape", stages):
+                raise ValueError("no table")
+
+        self.assertIn("scrape", stages)
+        text = metrics.render()
+        self.assertIn('mortgage_monitor_stage_runs_total{stage="scrape",result="success"} 1', text)
+        self.assertIn('mortgage_monitor_stage_runs_total{stage="scrape",result="failure"} 1', text)
+        self.assertIn('mortgage_monitor_stage_duration_seconds_count{stage="scrape"} 2', text)
+
+    @patch("src.metrics.time.time", return_value=1757000000.0)
+    def test_last_success_is_only_set_by_successes(self, _):
+        metrics.observe("job", 1.0, success=False)
+        self.assertIsNone(metrics.last_success())
+        metrics.observe("job", 1.0)
+        self.assertEqual(metrics.last_success(), 1757000000.0)
+        self.assertIn(
+            'mortgage_monitor_last_success_timestamp_seconds{stage="job"} 1757000000.0',
+            metrics.render()
+        )
+
+    def test_render_includes_extra_gauges(self):
+        text = metrics.render({"ready": 1, "data_age_seconds": None})
+        self.assertIn("mortgage_monitor_ready 1.0", text)
+        self.assertNotIn("data_age_seconds", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# Created by AI
@@ -0,0 +1,142 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import src.storage as storage
+import src.migrations as migrations
+
+LEGACY_DDL = """
+    CREATE TABLE rates_mbb (
+        id              INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp       TEXT    NOT NULL,
+        mortgage_rate   REAL,
+        mbb_price       REAL
+    );
+"""
+
+
+class TestMigrations(unittest.TestCase):
+
+    def setUp(self):
+        storage.USE_POSTGRES = False
+        storage.TABLE_NAME = "rates_mbb"
+        storage.QUOTES_TABLE = "quotes"
+        self.original_tz = storage.LOCAL_TZ
+        storage.LOCAL_TZ = "America/Los_Angeles"
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "legacy.sqlite3")
+
+        # A database written by the original, unversioned schema
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute(LEGACY_DDL)
+        self.conn.executemany(
+            "INSERT INTO rates_mbb (timestamp, mortgage_rate, mbb_price) VALUES (?, ?, ?)",
+            [(f"2025-09-{day:02d} 06:40:00", 6.0 + day / 100, 95.0) for day in range(1, 6)]
+        )
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+        storage.LOCAL_TZ = self.original_tz
+        self.tmpdir.cleanup()
+
+    def _columns(self, table):
+        return [row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")]
+
+    def test_migrates_legacy_table_in_place(self):
+        version = migrations.migrate(self.conn, chunk_size=2)
+
+        self.assertEqual(version, migrations.MIGRATIONS[-1][0])
+        self.assertIn("ts", self._columns("rates_mbb"))
+        self.assertIn("source", self._columns("rates_mbb"))
+        self.assertIn("ts", self._columns("quotes"))
+
+        rows = self.conn.execute("SELECT timestamp, ts, source FROM rates_mbb ORDER BY id").fetchall()
+        self.assertEqual(len(rows), 5)
+        for text, ts, source in rows:
+            # Naive legacy text is read as LOCAL_TZ wall-clock time
+            local = datetime.fromisoformat(text).replace(tzinfo=ZoneInfo("America/Los_Angeles"))
+            self.assertEqual(ts, int(local.timestamp()))
+            self.assertEqual(source, "mnd")
+
+    def test_creates_time_and_source_indexes(self):
+        migrations.migrate(self.conn)
+
+        indexes = {row[1] for row in self.conn.execute("PRAGMA index_list(rates_mbb)")}
+        self.assertIn("idx_rates_mbb_ts", indexes)
+        self.assertIn("idx_rates_mbb_source_ts", indexes)
+        plan = " ".join(
+            str(row) for row in self.conn.execute(
+                "EXPLAIN QUERY PLAN SELECT * FROM rates_mbb WHERE ts >= 0 ORDER BY ts"
+            )
+        )
+        self.assertIn("idx_rates_mbb_ts", plan)
+
+    def test_rerun_is_a_no_op(self):
+        migrations.migrate(self.conn)
+        applied = self.conn.execute(f"SELECT COUNT(*) FROM {migrations.SCHEMA_TABLE}").fetchone()[0]
+
+        self.assertEqual(migrations.migrate(self.conn), migrations.MIGRATIONS[-1][0])
+        self.assertEqual(
+            self.conn.execute(f"SELECT COUNT(*) FROM {migrations.SCHEMA_TABLE}").fetchone()[0],
+            applied
+        )
+
+    def test_resumes_after_interrupted_conversion(self):
+        # Column added but conversion never finished and no version recorded
+        self.conn.execute("ALTER TABLE rates_mbb ADD COLUMN ts INTEGER")
+        self.conn.execute("UPDATE rates_mbb SET ts = 1 WHERE id = 1")
+        self.conn.commit()
+
+        migrations.migrate(self.conn)
+
+        nulls = self.conn.execute("SELECT COUNT(*) FROM rates_mbb WHERE ts IS NULL").fetchone()[0]
+        self.assertEqual(nulls, 0)
+        # Rows converted before the interruption are left alone
+        self.assertEqual(self.conn.execute("SELECT ts FROM rates_mbb WHERE id = 1").fetchone()[0], 1)
+
+    def test_unparseable_timestamp_is_left_empty(self):
+        self.conn.execute("INSERT INTO rates_mbb (timestamp) VALUES ('not a time')")
+        self.conn.commit()
+
+        with self.assertLogs("src.migrations", level="WARNING"):
+            migrations.migrate(self.conn)
+
+        self.assertIsNone(
+            self.conn.execute("SELECT ts FROM rates_mbb WHERE timestamp = 'not a time'").fetchone()[0]
+        )
+
+    def test_duplicate_samples_are_removed(self):
+        # Two replicas wrote the same sample twice
+        self.conn.execute(
+            "INSERT INTO rates_mbb (timestamp, mortgage_rate, mbb_price) "
+            "VALUES ('2025-09-02 06:40:00', 9.9, 95.0)"
+        )
+        self.conn.commit()
+
+        with self.assertLogs("src.migrations", level="INFO"):
+            migrations.migrate(self.conn)
+
+        rows = self.conn.execute(
+            "SELECT mortgage_rate FROM rates_mbb WHERE timestamp = '2025-09-02 06:40:00'"
+        ).fetchall()
+        self.assertEqual(rows, [(6.02,)])
+        indexes = {row[1] for row in self.conn.execute("PRAGMA index_list(rates_mbb)")}
+        self.assertIn("idx_rates_mbb_ts_source_unique", indexes)
+
+    def test_new_rows_carry_typed_timestamp(self):
+        migrations.migrate(self.conn)
+        storage.update_table(self.conn, "2025-09-08 06:40:00", 6.2, 96.0)
+
+        ts = self.conn.execute("SELECT ts FROM rates_mbb ORDER BY id DESC LIMIT 1").fetchone()[0]
+        expected = datetime(2025, 9, 8, 6, 40, tzinfo=ZoneInfo("America/Los_Angeles"))
+        self.assertEqual(ts, int(expected.timestamp()))
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# Created by AI
@@ -0,0 +1,89 @@
+import time
+import unittest
+from unittest.mock import patch
+
+from src.parallel import run_sources, SourceTimeout
+
+
+class TestRunSources(unittest.TestCase):
+
+    def test_sources_run_concurrently(self):
+        def slow(value):
+            def func():
+                time.sleep(0.2)
+                return value
+            return func
+
+        start = time.monotonic()
+        results, errors, timings = run_sources(
+            {"a": slow(1), "b": slow(2)}, timeouts={}, deadline=5
+        )
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(results, {"a": 1, "b": 2})
+        self.assertEqual(errors, {})
+        # Wall-clock is close to the slowest source, not the sum
+        self.assertLess(elapsed, 0.35)
+        self.assertGreaterEqual(timings["a"], 0.2)
+
+    def test_per_source_timeout_returns_partial_results(self):
+        results, errors, timings = run_sources(
+            {"fast": lambda: "ok", "slow": lambda: time.sleep(1)},
+            timeouts={"slow": 0.1},
+            deadline=5,
+        )
+        self.assertEqual(results, {"fast": "ok"})
+        self.assertIsInstance(errors["slow"], SourceTimeout)
+        self.assertLess(timings["slow"], 0.5)
+
+    def test_job_deadline_caps_every_source(self):
+        start = time.monotonic()
+        results, errors, _ = run_sources(
+            {"slow": lambda: time.sleep(1)},
+            timeouts={"slow": 10},
+            deadline=0.1,
+        )
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(results, {})
+        self.assertIsInstance(errors["slow"], SourceTimeout)
+
+    @patch("src.parallel.SOURCE_WORKERS", 1)
+    def test_timeouts_count_from_when_a_queued_source_starts(self):
+        def slow():
+            time.sleep(0.2)
+            return "ok"
+
+        results, errors, timings = run_sources(
+            {"first": slow, "second": slow},
+            timeouts={"first": 0.3, "second": 0.3},
+            deadline=5,
+        )
+        self.assertEqual(results, {"first": "ok", "second": "ok"})
+        self.assertLess(timings["second"], 0.3)
+
+    @patch("src.parallel.SOURCE_WORKERS", 1)
+    def test_queued_source_times_out_at_the_deadline(self):
+        results, errors, timings = run_sources(
+            {"hog": lambda: time.sleep(0.5), "queued": lambda: "ok"},
+            timeouts={"hog": 10},
+            deadline=0.1,
+        )
+        self.assertEqual(results, {})
+        self.assertIn("did not start", str(errors["queued"]))
+
+    def test_exceptions_are_collected_with_timing(self):
+        def boom():
+            raise ValueError("bad")
+
+        results, errors, timings = run_sources(
+            {"boom": boom}, timeouts={}, deadline=5
+        )
+        self.assertEqual(results, {})
+        self.assertIsInstance(errors["boom"], ValueError)
+        self.assertIn("boom", timings)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# Created by AI
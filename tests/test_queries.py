@@ -0,0 +1,127 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+import src.storage as storage
+import src.queries as queries
+
+
+class TestQueries(unittest.TestCase):
+
+    def setUp(self):
+        storage.USE_POSTGRES = False
+        storage.TABLE_NAME = "rates_mbb"
+        storage.QUOTES_TABLE = "quotes"
+        self.original_tz = storage.LOCAL_TZ
+        storage.LOCAL_TZ = "UTC"
+        self.tmpdir = tempfile.TemporaryDirectory()
+        storage.SQLITE_FILE = os.path.join(self.tmpdir.name, "queries.sqlite3")
+        queries.clear_cache()
+
+        with storage.connection() as conn:
+            storage.init_db(conn)
+            storage.bulk_insert(conn, [
+                ("2025-09-01 06:40:00", 6.30, 95.0),
+                ("2025-09-02 06:40:00", 6.20, 95.5),
+                ("2025-09-03 06:40:00", None, 96.0),
+                ("2025-09-08 06:40:00", 6.10, 96.5),
+            ], source="mnd")
+
+    def tearDown(self):
+        storage.close_connections()
+        storage.LOCAL_TZ = self.original_tz
+        self.tmpdir.cleanup()
+
+    def test_latest_returns_newest_row(self):
+        row = queries.latest()
+        self.assertEqual(row["timestamp"], "2025-09-08 06:40:00")
+        self.assertEqual(row["mortgage_rate"], 6.10)
+        self.assertEqual(row["mbb_price"], 96.5)
+
+    def test_latest_skips_rows_without_ts(self):
+        with storage.connection() as conn:
+            conn.execute(f"DELETE FROM {storage.TABLE_NAME}")
+            conn.execute(
+                f"INSERT INTO {storage.TABLE_NAME} (timestamp, source, mbb_price) "
+                f"VALUES ('06/09/2019 6:40', 'legacy', 90.0)"
+            )
+            conn.commit()
+
+        self.assertIsNone(queries.latest())
+
+    def test_latest_quotes_returns_newest_price_per_symbol(self):
+        with storage.connection() as conn:
+            storage.update_quotes(conn, "2025-09-01 06:40:00", {"MBB": 95.0, "TLT": 88.0})
+            storage.update_quotes(conn, "2025-09-02 06:40:00", {"MBB": 95.5})
+        self.assertEqual(queries.latest_quotes(), {"MBB": 95.5, "TLT": 88.0})
+
+    def test_get_range_is_half_open(self):
+        frame = queries.get_range("2025-09-02", "2025-09-08")
+        self.assertEqual(len(frame), 2)
+        self.assertEqual(frame["mbb_price"].tolist(), [95.5, 96.0])
+        self.assertTrue(np.isnan(frame["mortgage_rate"].iloc[-1]))
+        self.assertEqual(str(frame.index.tz), "UTC")
+
+    def test_get_arrays_returns_numpy(self):
+        seconds, columns = queries.get_arrays()
+        self.assertEqual(seconds.dtype, np.int64)
+        self.assertIsInstance(columns["mbb_price"], np.ndarray)
+        self.assertEqual(columns["mbb_price"].tolist(), [95.0, 95.5, 96.0, 96.5])
+
+    def test_resample_weekly_mean(self):
+        frame = queries.resample("W")
+        self.assertEqual(len(frame), 2)
+        self.assertAlmostEqual(frame["mbb_price"].iloc[0], 95.5)
+        self.assertAlmostEqual(frame["mortgage_rate"].iloc[0], 6.25)
+
+    def test_summary_statistics_ignore_missing_values(self):
+        stats = queries.summary()
+        self.assertEqual(stats["mortgage_rate"]["count"], 3)
+        self.assertAlmostEqual(stats["mortgage_rate"]["mean"], 6.2)
+        self.assertEqual(stats["mortgage_rate"]["last"], 6.10)
+        self.assertEqual(stats["mbb_price"]["min"], 95.0)
+        self.assertEqual(stats["mbb_price"]["max"], 96.5)
+
+    def test_repeated_reads_are_served_from_cache(self):
+        queries.get_range("2025-09-01", "2025-09-09")
+        with patch("src.queries.storage.connection") as mock_connection:
+            frame = queries.get_range("2025-09-01", "2025-09-09")
+            queries.get_range("2025-09-01", "2025-09-09")
+        mock_connection.assert_not_called()
+        self.assertEqual(len(frame), 4)
+
+    def test_cached_frames_are_not_shared(self):
+        first = queries.get_range()
+        first.loc[first.index[0], "mbb_price"] = 0.0
+        self.assertEqual(queries.get_range()["mbb_price"].iloc[0], 95.0)
+
+    def test_update_table_invalidates_cache(self):
+        self.assertEqual(queries.latest()["mbb_price"], 96.5)
+
+        with storage.connection() as conn:
+            storage.update_table(conn, "2025-09-09 06:40:00", 6.05, 97.0)
+
+        self.assertEqual(queries.latest()["mbb_price"], 97.0)
+        self.assertEqual(len(queries.get_range()), 5)
+
+    def test_rows_written_by_another_process_show_up_after_the_ttl(self):
+        self.assertEqual(queries.latest()["mbb_price"], 96.5)
+        # Another replica's write is not counted by this process
+        with patch("src.queries.storage.data_version", return_value=queries._cache_version), \
+             storage.connection() as conn:
+            storage.update_table(conn, "2025-09-09 06:40:00", 6.05, 97.0)
+            self.assertEqual(queries.latest()["mbb_price"], 96.5)
+            self.assertEqual(queries.latest(use_cache=False)["mbb_price"], 97.0)
+
+            later = queries.time.monotonic() + queries.READ_CACHE_TTL
+            with patch("src.queries.time.monotonic", return_value=later):
+                self.assertEqual(queries.latest()["mbb_price"], 97.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# Created by AI
@@ -0,0 +1,152 @@
+import json
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+from urllib.parse import unquote, urlsplit
+
+import src.fetch as fetch
+import src.quotes as quotes
+import src.retry as retry
+from tests.stub_server import StubServer
+
+
+def chart_payload(price=None, closes=()):
+    meta = {"symbol": "MBB", "currency": "USD"}
+    if price is not None:
+        meta["regularMarketPrice"] = price
+    return {"chart": {"result": [{
+        "meta": meta,
+        "timestamp": [1756900800 + 86400 * i for i in range(len(closes))],
+        "indicators": {"quote": [{"close": list(closes)}]},
+    }], "error": None}}
+
+
+class ChartServer(StubServer):
+    """
+    Stands in for the chart endpoint, answering from {symbol: payload}.
+    """
+    def __init__(self, payloads, delays=None):
+        self.payloads = payloads
+        self.delays = delays or {}
+        self.paths = []
+        super().__init__()
+
+    def respond(self, request):
+        self.paths.append(request.path)
+        symbol = unquote(urlsplit(request.path).path.rsplit("/", 1)[-1])
+        time.sleep(self.delays.get(symbol, 0))
+        if symbol not in self.payloads:
+            return 404, {}, b""
+        return 200, {"Content-Type": "application/json"}, json.dumps(self.payloads[symbol]).encode()
+
+
+class TestParseChart(unittest.TestCase):
+
+    def test_prefers_regular_market_price(self):
+        self.assertEqual(quotes.parse_chart(chart_payload(95.12, [94.0, 95.0])), 95.12)
+
+    def test_falls_back_to_last_close(self):
+        self.assertEqual(quotes.parse_chart(chart_payload(None, [94.0, 95.5, None])), 95.5)
+
+    def test_empty_chart_returns_none(self):
+        self.assertIsNone(quotes.parse_chart(chart_payload(None, [None])))
+
+    def test_error_response_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            quotes.parse_chart({"chart": {"result": None, "error": {"code": "Not Found"}}})
+
+
+class TestChartProvider(unittest.TestCase):
+
+    def setUp(self):
+        retry.reset_breakers()
+        fetch.close_session()
+        self.server = ChartServer({
+            "MBB": chart_payload(95.12),
+            "^TNX": chart_payload(None, [4.21, 4.25]),
+        })
+        self.provider = quotes.ChartProvider(base_url=f"{self.server.url}/v8/finance/chart/")
+
+    def tearDown(self):
+        self.server.close()
+        fetch.close_session()
+
+    def test_prices_are_parsed_into_floats(self):
+        prices = self.provider.prices(["MBB", "^TNX"])
+        self.assertEqual(prices, {"MBB": 95.12, "^TNX": 4.25})
+        # One request per symbol, with the symbol escaped in the path
+        self.assertEqual(len(self.server.paths), 2)
+        self.assertTrue(any("/%5ETNX?" in path for path in self.server.paths))
+
+    def test_unknown_symbol_is_left_out(self):
+        with self.assertLogs("src.quotes", level="WARNING"):
+            prices = self.provider.prices(["MBB", "NOPE"])
+        self.assertEqual(prices, {"MBB": 95.12})
+
+    def test_slow_symbol_does_not_cost_the_others(self):
+        self.server.delays["^TNX"] = 1.0
+        start = time.monotonic()
+        with self.assertLogs("src.quotes", level="WARNING"):
+            prices = self.provider.prices(["MBB", "^TNX"], deadline=start + 0.3)
+
+        self.assertLess(time.monotonic() - start, 0.6)
+        self.assertEqual(prices, {"MBB": 95.12})
+
+
+class TestGetQuotes(unittest.TestCase):
+
+    def setUp(self):
+        self.chart = MagicMock()
+        self.fallback = MagicMock()
+        self.patcher = patch.dict(quotes.PROVIDERS, {"chart": self.chart, "yfinance": self.fallback})
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def test_fallback_only_fetches_missing_symbols(self):
+        self.chart.prices.return_value = {"MBB": 95.0}
+        self.fallback.prices.return_value = {"TLT": 88.0}
+
+        prices = quotes.get_quotes(["MBB", "TLT"], providers=["chart", "yfinance"])
+
+        self.assertEqual(prices, {"MBB": 95.0, "TLT": 88.0})
+        self.assertEqual(self.fallback.prices.call_args[0][0], ["TLT"])
+
+    def test_fallback_is_skipped_when_complete(self):
+        self.chart.prices.return_value = {"MBB": 95.0}
+        quotes.get_quotes(["MBB"], providers=["chart", "yfinance"])
+        self.fallback.prices.assert_not_called()
+
+    def test_failing_provider_falls_through(self):
+        self.chart.prices.side_effect = RuntimeError("down")
+        self.fallback.prices.return_value = {"MBB": 95.0}
+        with self.assertLogs("src.quotes", level="WARNING"):
+            prices = quotes.get_quotes(["MBB"], providers=["chart", "yfinance"])
+        self.assertEqual(prices, {"MBB": 95.0})
+
+    def test_hanging_provider_leaves_the_fallback_time(self):
+        self.chart.prices.side_effect = lambda *args, **kwargs: time.sleep(2)
+        self.fallback.prices.return_value = {"MBB": 95.0}
+        start = time.monotonic()
+
+        with self.assertLogs("src.quotes", level="WARNING"):
+            prices = quotes.get_quotes(
+                ["MBB"], deadline=start + 1.0, providers=["chart", "yfinance"]
+            )
+
+        self.assertEqual(prices, {"MBB": 95.0})
+        self.assertLess(time.monotonic() - start, 1.0)
+
+    def test_raises_when_every_provider_fails(self):
+        self.chart.prices.side_effect = RuntimeError("down")
+        self.fallback.prices.side_effect = RuntimeError("also down")
+        with self.assertLogs("src.quotes", level="WARNING"), \
+             self.assertRaisesRegex(RuntimeError, "also down"):
+            quotes.get_quotes(["MBB"], providers=["chart", "yfinance"])
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# Created by AI
@@ -0,0 +1,141 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import src.fetch as fetch
+import src.rates as rates
+import src.retry as retry
+from tests.stub_server import StubServer
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURE_DIR, name), "rb") as f:
+        return f.read()
+
+
+class RateServer(StubServer):
+    """
+    Serves the recorded MND page at /mnd and the PMMS CSV at /pmms.
+
+    Pages given an ETag in `etags` answer a matching If-None-Match with 304.
+    """
+    def __init__(self):
+        self.pages = {
+            "/mnd": read_fixture("mnd_rates.html"),
+            "/pmms": read_fixture("pmms_history.csv"),
+        }
+        self.etags = {}
+        self.hits = []
+        self.statuses = []
+        super().__init__()
+
+    def respond(self, request):
+        self.hits.append(request.path)
+        body = self.pages.get(request.path)
+        etag = self.etags.get(request.path)
+        headers = {} if etag is None else {"ETag": etag}
+        if etag is not None and request.headers.get("If-None-Match") == etag:
+            self.statuses.append(304)
+            return 304, headers, b""
+        self.statuses.append(200 if body is not None else 404)
+        return self.statuses[-1], headers, body or b""
+
+
+class TestParsePmms(unittest.TestCase):
+
+    def test_returns_the_newest_30_year_rate(self):
+        self.assertEqual(rates.parse_pmms(read_fixture("pmms_history.csv").decode()), 6.29)
+
+    def test_skips_weeks_without_a_value(self):
+        self.assertEqual(rates.parse_pmms("date,pmms30,pmms15\n1/2/2025,6.91,6.13\n1/9/2025,,\n"), 6.91)
+
+    def test_missing_column_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            rates.parse_pmms("date,rate\n1/2/2025,6.91\n")
+
+
+class TestRateProvider(unittest.TestCase):
+
+    def setUp(self):
+        retry.reset_breakers()
+        fetch.close_session()
+        self.server = RateServer()
+
+    def tearDown(self):
+        self.server.close()
+        fetch.close_session()
+
+    def test_providers_fetch_and_parse_their_pages(self):
+        mnd = rates.RateProvider("mnd", f"{self.server.url}/mnd", fetch.parse_30yr_rate)
+        pmms = rates.RateProvider("freddiemac", f"{self.server.url}/pmms", rates.parse_pmms)
+        stages = {}
+
+        self.assertEqual(mnd.fetch(stages=stages), (6.3, True))
+        self.assertEqual(pmms.fetch(stages=stages), (6.29, True))
+        self.assertEqual(set(stages), {"ping", "scrape"})
+
+    def test_value_is_reused_within_the_ttl(self):
+        provider = rates.RateProvider("freddiemac", f"{self.server.url}/pmms", rates.parse_pmms, ttl=60)
+
+        self.assertEqual(provider.fetch(), (6.29, True))
+        self.assertEqual(provider.fetch(), (6.29, False))
+        self.assertEqual(len(self.server.hits), 1)
+
+        # Once the TTL has passed the page is fetched again
+        with patch("src.rates.time.monotonic", return_value=provider._cached[1] + 61):
+            self.assertEqual(provider.fetch(), (6.29, True))
+        self.assertEqual(len(self.server.hits), 2)
+
+    def test_unchanged_page_is_revalidated_from_the_disk_cache(self):
+        self.server.etags["/mnd"] = '"v1"'
+        url = f"{self.server.url}/mnd"
+
+        with tempfile.TemporaryDirectory() as cache_dir, patch("src.fetch.HTTP_CACHE_DIR", cache_dir):
+            self.assertEqual(rates.RateProvider("mnd", url, fetch.parse_30yr_rate).fetch(), (6.3, True))
+            # A provider in a new process starts from the cached copy
+            self.assertEqual(rates.RateProvider("mnd", url, fetch.parse_30yr_rate).fetch(), (6.3, True))
+            self.assertEqual(self.server.statuses, [200, 304])
+
+            self.server.etags["/mnd"] = '"v2"'
+            self.server.pages["/mnd"] = self.server.pages["/mnd"].replace(b"6.30%", b"6.25%")
+            self.assertEqual(rates.RateProvider("mnd", url, fetch.parse_30yr_rate).fetch(), (6.25, True))
+            self.assertEqual(self.server.statuses, [200, 304, 200])
+            self.assertEqual(fetch.load_cached(url)["etag"], '"v2"')
+
+    def test_pages_without_validators_are_not_cached(self):
+        url = f"{self.server.url}/pmms"
+        with tempfile.TemporaryDirectory() as cache_dir, patch("src.fetch.HTTP_CACHE_DIR", cache_dir):
+            rates.RateProvider("freddiemac", url, rates.parse_pmms).fetch()
+            self.assertIsNone(fetch.load_cached(url))
+            self.assertEqual(os.listdir(cache_dir), [])
+
+    def test_page_without_a_rate_raises_value_error(self):
+        provider = rates.RateProvider("mnd", f"{self.server.url}/pmms", fetch.parse_30yr_rate)
+        with self.assertRaises(ValueError):
+            provider.fetch()
+        self.assertIsNone(provider.cached())
+
+
+class TestConsensus(unittest.TestCase):
+
+    def test_median_of_several_providers(self):
+        self.assertEqual(rates.consensus({"a": 6.3, "b": 6.9, "c": 6.35}), (6.35, "consensus"))
+
+    def test_single_provider_keeps_its_name(self):
+        self.assertEqual(rates.consensus({"freddiemac": 6.29}), (6.29, "freddiemac"))
+
+    def test_no_providers(self):
+        self.assertEqual(rates.consensus({}), (None, None))
+
+    def test_configured_providers_are_registered(self):
+        self.assertEqual([p.name for p in rates.get_rate_providers(["mnd", "freddiemac"])],
+                         ["mnd", "freddiemac"])
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# Created by AI
@@ -0,0 +1,140 @@
+import time
+import unittest
+from unittest.mock import patch
+
+import requests
+
+import src.fetch as fetch
+import src.retry as retry
+from tests.stub_server import StubServer
+
+
+class StatusServer(StubServer):
+    """
+    Answers each request with the next queued status.
+    """
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.hits = 0
+        super().__init__()
+
+    def respond(self, request):
+        self.hits += 1
+        status = self.statuses.pop(0) if self.statuses else 200
+        return status, {}, b"<table><tr><th>30 Yr. Fixed</th><td>6.25%</td></tr></table>"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@patch("src.retry.time.sleep")
+class TestFetchPageRetries(unittest.TestCase):
+
+    def setUp(self):
+        retry.reset_breakers()
+        fetch.close_session()
+
+    def tearDown(self):
+        fetch.close_session()
+        retry.reset_breakers()
+
+    def test_transient_errors_are_retried(self, mock_sleep):
+        stub = StatusServer([503, 502])
+        try:
+            response = fetch.fetch_page(stub.url)
+        finally:
+            stub.close()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(fetch.parse_30yr_rate(response.text), 6.25)
+        self.assertEqual(stub.hits, 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+
+    def test_client_errors_are_not_retried(self, mock_sleep):
+        stub = StatusServer([404])
+        try:
+            with self.assertRaises(requests.HTTPError):
+                fetch.fetch_page(stub.url)
+        finally:
+            stub.close()
+        self.assertEqual(stub.hits, 1)
+        mock_sleep.assert_not_called()
+
+    def test_retry_budget_limits_retries(self, mock_sleep):
+        stub = StatusServer([503] * 10)
+        budget = retry.RetryBudget(1)
+        try:
+            with self.assertRaises(requests.HTTPError):
+                fetch.fetch_page(stub.url, budget=budget)
+        finally:
+            stub.close()
+        # First attempt plus the single budgeted retry
+        self.assertEqual(stub.hits, 2)
+        self.assertEqual(budget.remaining, 0)
+
+    def test_deadline_stops_retries(self, mock_sleep):
+        stub = StatusServer([503] * 10)
+        try:
+            with self.assertRaises(requests.HTTPError):
+                fetch.fetch_page(stub.url, deadline=time.monotonic())
+        finally:
+            stub.close()
+        self.assertEqual(stub.hits, 1)
+
+    def test_breaker_opens_and_probes_later(self, mock_sleep):
+        clock = FakeClock()
+        stub = StatusServer([503] * 4)
+        host = stub.url.split("/")[2]
+        breaker = retry.CircuitBreaker(host, failure_threshold=3, reset_timeout=60, clock=clock)
+        retry._breakers[host] = breaker
+        try:
+            with self.assertRaises(retry.CircuitOpen):
+                fetch.fetch_page(stub.url)
+            self.assertEqual(stub.hits, 3)
+            self.assertEqual(breaker.state, breaker.OPEN)
+
+            # While open, the host is not contacted at all
+            with self.assertRaises(retry.CircuitOpen):
+                fetch.fetch_page(stub.url)
+            self.assertEqual(stub.hits, 3)
+
+            # After the reset timeout one probe goes out; its failure re-opens
+            clock.now = 61
+            with self.assertRaises(retry.CircuitOpen):
+                fetch.fetch_page(stub.url)
+            self.assertEqual(stub.hits, 4)
+            self.assertEqual(breaker.state, breaker.OPEN)
+
+            # The next probe succeeds and closes the breaker
+            clock.now = 122
+            response = fetch.fetch_page(stub.url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(breaker.state, breaker.CLOSED)
+        finally:
+            stub.close()
+
+
+class TestBackoff(unittest.TestCase):
+
+    def test_full_jitter_stays_within_cap(self):
+        for attempt in range(10):
+            delay = retry.backoff_delay(attempt, base_delay=1, max_delay=30)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(30, 2 ** attempt))
+
+    def test_budget_is_shared_and_bounded(self):
+        budget = retry.RetryBudget(2)
+        self.assertTrue(budget.take())
+        self.assertTrue(budget.take())
+        self.assertFalse(budget.take())
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# Created by AI
@@ -1,6 +1,9 @@
 import unittest
 from unittest.mock import MagicMock, patch
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from datetime import datetime, time
 import pytz
 
 import scheduler
@@ -52,13 +55,15 @@ class TestScheduler(unittest.TestCase):
             func, trigger, id="test_job", max_instances=1
         )
 
+    @patch("scheduler.DatabaseJobStore")
     @patch("scheduler.add_unique_job")
-    @patch("scheduler.BlockingScheduler")
-    def test_create_scheduler_schedules_daily_job(self, mock_blocking_scheduler, mock_add_unique_job):
+    @patch("scheduler.AsyncIOScheduler")
+    def test_create_scheduler_schedules_daily_job(self, mock_scheduler_class, mock_add_unique_job,
+                                                  mock_store):
         
         # Mock the scheduler instance
         mock_scheduler_instance = MagicMock()
-        mock_blocking_scheduler.return_value = mock_scheduler_instance
+        mock_scheduler_class.return_value = mock_scheduler_instance
 
         # Explicitly mock add_unique_job to ensure the trigger is passed
         def mock_add_unique_job_side_effect(*args, **kwargs):
@@ -71,7 +76,7 @@ class TestScheduler(unittest.TestCase):
         sched = scheduler.create_scheduler()
 
         # Verify that the scheduler instance was created
-        mock_blocking_scheduler.assert_called_once()
+        mock_scheduler_class.assert_called_once()
 
         # Verify that add_unique_job was called with the correct arguments
         mock_add_unique_job.assert_called_once()
@@ -94,6 +99,119 @@ class TestScheduler(unittest.TestCase):
         self.assertIn("hour='6'", trigger_str)
         self.assertIn("minute='40'", trigger_str)
 
+    @patch("scheduler.POLL_INTERVAL", 5)
+    @patch("scheduler.DatabaseJobStore")
+    @patch("scheduler.add_unique_job")
+    @patch("scheduler.AsyncIOScheduler")
+    def test_create_scheduler_adds_poll_job(self, mock_scheduler_class, mock_add_unique_job,
+                                            mock_store):
+        scheduler.create_scheduler()
+
+        job_ids = [call.args[1] for call in mock_add_unique_job.call_args_list]
+        self.assertEqual(job_ids, ["daily_fetch_and_store", "poll_fetch_and_store"])
+        poll_args = mock_add_unique_job.call_args_list[1].args
+        self.assertIs(poll_args[2], scheduler.poll_fetch_and_store)
+        self.assertIsInstance(poll_args[3], IntervalTrigger)
+        self.assertEqual(poll_args[3].interval.total_seconds(), 300)
+
+    @patch("scheduler.ARCHIVE_KEEP_MONTHS", 3)
+    @patch("scheduler.DatabaseJobStore")
+    @patch("scheduler.add_unique_job")
+    @patch("scheduler.AsyncIOScheduler")
+    def test_create_scheduler_adds_archive_job(self, mock_scheduler_class, mock_add_unique_job,
+                                               mock_store):
+        scheduler.create_scheduler()
+
+        job_ids = [call.args[1] for call in mock_add_unique_job.call_args_list]
+        self.assertEqual(job_ids, ["daily_fetch_and_store", "monthly_archive"])
+        archive_args = mock_add_unique_job.call_args_list[1].args
+        self.assertIs(archive_args[2], scheduler.roll_archive)
+        self.assertIn("day='1'", str(archive_args[3]))
+
+class TestPollWindows(unittest.TestCase):
+
+    def setUp(self):
+        self.windows = scheduler.parse_windows("mon-fri 06:30-13:00; sat 08:00-10:00")
+
+    def _at(self, day, hour, minute):
+        # 2025-09-01 is a Monday
+        return scheduler.SCHEDULE_TZ.localize(datetime(2025, 9, day, hour, minute))
+
+    def test_parse_windows(self):
+        days, start, end = self.windows[0]
+        self.assertEqual(days, frozenset(range(5)))
+        self.assertEqual((start, end), (time(6, 30), time(13, 0)))
+        self.assertEqual(self.windows[1][0], frozenset({5}))
+
+    def test_day_ranges_may_wrap_the_week(self):
+        days = scheduler.parse_windows("fri-mon 00:00-23:59")[0][0]
+        self.assertEqual(days, frozenset({4, 5, 6, 0}))
+
+    def test_bad_window_raises(self):
+        with self.assertRaises(ValueError):
+            scheduler.parse_windows("weekdays 06:30-13:00")
+        with self.assertRaises(ValueError):
+            scheduler.parse_windows("mon-fri 6.30")
+
+    def test_in_windows(self):
+        self.assertTrue(scheduler.in_windows(self._at(1, 6, 30), self.windows))
+        self.assertTrue(scheduler.in_windows(self._at(5, 13, 0), self.windows))
+        self.assertFalse(scheduler.in_windows(self._at(1, 13, 5), self.windows))
+        self.assertTrue(scheduler.in_windows(self._at(6, 9, 0), self.windows))
+        self.assertFalse(scheduler.in_windows(self._at(7, 9, 0), self.windows))
+
+    @patch("scheduler.fetch_and_store_data")
+    def test_poll_skips_outside_window(self, mock_fetch):
+        with patch("scheduler.in_windows", return_value=False):
+            self.assertIsNone(scheduler.poll_fetch_and_store())
+        mock_fetch.assert_not_called()
+
+        with patch("scheduler.in_windows", return_value=True):
+            scheduler.poll_fetch_and_store()
+        mock_fetch.assert_called_once_with(only_changes=True)
+
+class TestFollowUpListener(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = MagicMock()
+        self.scheduler.timezone = pytz.UTC
+        self.listener = scheduler.make_follow_up_listener(self.scheduler)
+
+    def _event(self, job_id="daily_fetch_and_store", retval=None, exception=None):
+        return MagicMock(job_id=job_id, retval=retval, exception=exception)
+
+    @patch("scheduler.add_unique_job")
+    def test_failed_run_schedules_follow_up(self, mock_add_unique_job):
+        self.listener(self._event(retval=False))
+
+        mock_add_unique_job.assert_called_once()
+        args = mock_add_unique_job.call_args[0]
+        self.assertEqual(args[1], "follow_up_fetch_and_store")
+        self.assertEqual(args[2], fetch_and_store_data)
+        self.assertIsInstance(args[3], DateTrigger)
+
+    @patch("scheduler.add_unique_job")
+    def test_job_exception_schedules_follow_up(self, mock_add_unique_job):
+        self.listener(self._event(exception=RuntimeError("boom")))
+        mock_add_unique_job.assert_called_once()
+
+    @patch("scheduler.add_unique_job")
+    def test_successful_run_schedules_nothing(self, mock_add_unique_job):
+        self.listener(self._event(retval=True))
+        mock_add_unique_job.assert_not_called()
+
+    @patch("scheduler.add_unique_job")
+    def test_follow_ups_are_capped(self, mock_add_unique_job):
+        for _ in range(scheduler.FOLLOW_UP_ATTEMPTS + 1):
+            self.listener(self._event(job_id="follow_up_fetch_and_store", retval=False))
+        self.assertEqual(mock_add_unique_job.call_count, scheduler.FOLLOW_UP_ATTEMPTS)
+
+    @patch("scheduler.add_unique_job")
+    def test_other_jobs_are_ignored(self, mock_add_unique_job):
+        self.listener(self._event(job_id="something_else", retval=False))
+        mock_add_unique_job.assert_not_called()
+
+
 if __name__ == "__main__":
     unittest.main()
 
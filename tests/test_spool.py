@@ -0,0 +1,148 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import src.storage as storage
+import src.spool as spool
+from src.spool import Spool, Flusher, drain
+
+
+class TestSpool(unittest.TestCase):
+
+    def setUp(self):
+        storage.USE_POSTGRES = False
+        storage.TABLE_NAME = "rates_mbb"
+        storage.QUOTES_TABLE = "quotes"
+        self.tmpdir = tempfile.TemporaryDirectory()
+        storage.SQLITE_FILE = os.path.join(self.tmpdir.name, "spool.sqlite3")
+        with storage.connection() as conn:
+            storage.init_db(conn)
+        self.path = os.path.join(self.tmpdir.name, "spool", "writes.ndjson")
+        self.spool = Spool(self.path)
+
+    def tearDown(self):
+        storage.close_connections()
+        self.tmpdir.cleanup()
+
+    def _rate(self, day):
+        return {"kind": "rate", "timestamp": f"2025-09-{day:02d} 06:40:00",
+                "mortgage_rate": 6.0, "mbb_price": 95.0 + day, "source": "mnd"}
+
+    def _count(self, table):
+        with storage.connection() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def test_drain_writes_rates_and_quotes_then_truncates(self):
+        self.spool.append(self._rate(1))
+        self.spool.append({"kind": "quotes", "timestamp": "2025-09-01 06:40:00",
+                           "prices": {"MBB": 96.0, "TLT": 88.0}})
+
+        self.assertEqual(drain(self.spool), 2)
+        self.assertEqual(self._count("rates_mbb"), 1)
+        self.assertEqual(self._count("quotes"), 2)
+        self.assertEqual(os.path.getsize(self.path), 0)
+        self.assertEqual(self.spool.backlog_bytes(), 0)
+
+    def test_drain_writes_provider_rates(self):
+        self.spool.append({"kind": "provider_rates", "timestamp": "2025-09-01 06:40:00",
+                           "rates": {"mnd": 6.3, "freddiemac": 6.29}})
+
+        self.assertEqual(drain(self.spool), 1)
+        with storage.connection() as conn:
+            rows = conn.execute(
+                "SELECT provider, rate FROM provider_rates ORDER BY provider"
+            ).fetchall()
+        self.assertEqual(rows, [("freddiemac", 6.29), ("mnd", 6.3)])
+
+    def test_drain_writes_job_runs(self):
+        spool._spool = self.spool
+        try:
+            spool.spool_job_run(
+                datetime(2025, 9, 1, 13, 40, tzinfo=timezone.utc), "daily", True, 1.5,
+                {"scrape": 0.5, "persist": 0.25}
+            )
+        finally:
+            spool._spool = None
+
+        self.assertEqual(drain(self.spool), 1)
+        with storage.connection() as conn:
+            row = conn.execute(
+                "SELECT ts, job, success, duration, scrape, persist, error FROM job_runs"
+            ).fetchone()
+        self.assertEqual(tuple(row), (1756734000, "daily", 1, 1.5, 0.5, 0.25, None))
+
+    def test_one_transaction_per_batch(self):
+        for day in range(1, 6):
+            self.spool.append(self._rate(day))
+
+        with patch("src.spool.write_batch", wraps=storage.write_batch) as mock_write:
+            drain(self.spool, batch_size=2)
+
+        self.assertEqual(mock_write.call_count, 3)
+        self.assertEqual(self._count("rates_mbb"), 5)
+
+    def test_database_failure_keeps_records(self):
+        self.spool.append(self._rate(1))
+
+        with patch("src.spool.write_batch", side_effect=RuntimeError("db down")):
+            with self.assertRaises(RuntimeError):
+                drain(self.spool)
+
+        self.assertGreater(self.spool.backlog_bytes(), 0)
+        self.assertEqual(drain(self.spool), 1)
+        self.assertEqual(self._count("rates_mbb"), 1)
+
+    def test_offset_survives_restart(self):
+        for day in range(1, 4):
+            self.spool.append(self._rate(day))
+        records, end_offset = self.spool.pending(1)
+        self.spool.commit(end_offset)
+
+        reopened = Spool(self.path)
+        records, _ = reopened.pending(10)
+        self.assertEqual([r["timestamp"][:10] for r in records], ["2025-09-02", "2025-09-03"])
+
+    def test_torn_tail_is_discarded_on_open(self):
+        self.spool.append(self._rate(1))
+        with open(self.path, "ab") as f:
+            f.write(b'{"kind":"rate","timest')
+
+        reopened = Spool(self.path)
+        reopened.append(self._rate(2))
+
+        records, _ = reopened.pending(10)
+        self.assertEqual(len(records), 2)
+
+    def test_flusher_backs_off_and_drains_on_stop(self):
+        flusher = Flusher(self.spool, interval=60)
+        self.spool.append(self._rate(1))
+
+        with patch("src.spool.write_batch", side_effect=RuntimeError("db down")), \
+             self.assertLogs("src.spool", level="WARNING"):
+            self.assertFalse(flusher.flush())
+        self.assertEqual(flusher._failures, 1)
+
+        flusher.start()
+        flusher.stop(timeout=1)
+        self.assertEqual(self._count("rates_mbb"), 1)
+        self.assertEqual(flusher._failures, 0)
+
+    def test_start_flusher_creates_the_spool(self):
+        path = os.path.join(self.tmpdir.name, "process.ndjson")
+        with patch("src.spool.SPOOL_FILE", path), \
+             patch("src.spool._spool", None), \
+             patch("src.spool._flusher", None):
+            flusher = spool.start_flusher()
+            spool.spool_rate("2025-09-01 06:40:00", 6.0, 95.0)
+            spool.stop_flusher()
+
+        self.assertFalse(flusher.is_alive())
+        self.assertEqual(self._count("rates_mbb"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# Created by AI
@@ -0,0 +1,36 @@
+import unittest
+
+from benchmarks.bench_startup import (
+    import_report, parse_importtime, STARTUP_BUDGET_MS, IDLE_RSS_BUDGET_MIB
+)
+
+
+class TestStartup(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.report = import_report("main")
+
+    def test_heavy_dependencies_are_not_imported_at_startup(self):
+        self.assertEqual(self.report["heavy"], [])
+
+    def test_startup_stays_within_budget(self):
+        self.assertLess(self.report["total_ms"], STARTUP_BUDGET_MS)
+        self.assertLess(self.report["rss_mib"], IDLE_RSS_BUDGET_MIB)
+
+    def test_parse_importtime(self):
+        stderr = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   json.decoder\n"
+            "import time:       300 |        420 | json\n"
+        )
+        self.assertEqual(
+            parse_importtime(stderr),
+            {"json.decoder": (120, 120), "json": (300, 420)},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# Created by AI
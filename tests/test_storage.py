@@ -1,5 +1,9 @@
+import os
 import sqlite3
+import tempfile
+import threading
 import unittest
+from datetime import datetime, timezone
 from unittest.mock import patch, MagicMock
 
 import src.storage as storage
@@ -55,7 +59,83 @@ class TestStorageSQLite(unittest.TestCase):
             f"SELECT timestamp, mortgage_rate, mbb_price FROM {storage.TABLE_NAME}"
         )
         row = cursor.fetchone()
-        self.assertEqual(row, (timestamp, mortgage_rate, mbb_price))
+        self.assertEqual(row, ("2025-09-04 12:34:56", mortgage_rate, mbb_price))
+
+    def test_bulk_insert_writes_batches_in_one_transaction(self):
+        conn = storage.get_connection()
+        storage.init_db(conn)
+
+        rows = [(f"2025-01-{day:02d} 00:00:00", 6.0, 90.0 + day) for day in range(1, 11)]
+        inserted = storage.bulk_insert(conn, iter(rows), source="backfill", batch_size=3)
+
+        self.assertEqual(inserted, 10)
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT COUNT(*) FROM {storage.TABLE_NAME}")
+        self.assertEqual(cursor.fetchone()[0], 10)
+
+    def test_rewriting_a_sample_updates_it_in_place(self):
+        conn = storage.get_connection()
+        storage.init_db(conn)
+        rates = [("2025-09-04 06:40:00", 6.1, 95.0, "mnd"), ("2025-09-04 06:40:00", 6.2, 95.0, "consensus")]
+        quotes = [("2025-09-04 06:40:00", "MBB", 95.0)]
+
+        storage.write_batch(conn, rates, quotes)
+        # A replayed batch, then a corrected value for one sample
+        storage.write_batch(conn, rates, quotes)
+        storage.update_table(conn, "2025-09-04 06:40:00", 6.15, 95.5, source="mnd")
+
+        self.assertEqual(
+            conn.execute(
+                f"SELECT source, mortgage_rate, mbb_price FROM {storage.TABLE_NAME} ORDER BY id"
+            ).fetchall(),
+            [("mnd", 6.15, 95.5), ("consensus", 6.2, 95.0)]
+        )
+        self.assertEqual(conn.execute(f"SELECT COUNT(*) FROM {storage.QUOTES_TABLE}").fetchone()[0], 1)
+
+    def test_existing_dates_is_inclusive(self):
+        conn = storage.get_connection()
+        storage.init_db(conn)
+        for ts in ("2025-09-03 06:40:00", "2025-09-04 06:40:00", "2025-09-05 23:59:59"):
+            storage.update_table(conn, ts, 6.0, 95.0)
+
+        self.assertEqual(
+            storage.existing_dates(conn, "2025-09-04", "2025-09-05"),
+            {"2025-09-04", "2025-09-05"}
+        )
+
+    def test_update_quotes_inserts_one_row_per_symbol(self):
+        conn = storage.get_connection()
+        storage.init_db(conn)
+
+        timestamp = "2025-09-04T12:34:56Z"
+        storage.update_quotes(conn, timestamp, {"MBB": 95.1, "TLT": 88.2})
+
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT timestamp, symbol, price FROM {storage.QUOTES_TABLE} ORDER BY symbol"
+        )
+        # The legacy column holds LOCAL_TZ (UTC here) wall-clock text
+        self.assertEqual(
+            cursor.fetchall(),
+            [("2025-09-04 12:34:56", "MBB", 95.1), ("2025-09-04 12:34:56", "TLT", 88.2)]
+        )
+
+    @patch("src.storage.LOCAL_TZ", "America/Los_Angeles")
+    def test_fall_back_hour_keeps_both_samples(self):
+        conn = storage.get_connection()
+        storage.init_db(conn)
+
+        # 01:30 PDT and 01:30 PST on 2025-11-02 read the same on the wall clock
+        storage.update_table(conn, "2025-11-02T08:30:00+00:00", 6.1, 95.0)
+        storage.update_table(conn, "2025-11-02T09:30:00+00:00", 6.2, 95.1)
+
+        rows = conn.execute(
+            f"SELECT timestamp, ts, mortgage_rate FROM {storage.TABLE_NAME} ORDER BY ts"
+        ).fetchall()
+        self.assertEqual(rows, [
+            ("2025-11-02 01:30:00", 1762072200, 6.1),
+            ("2025-11-02 01:30:00", 1762075800, 6.2),
+        ])
 
 
 class TestStoragePostgres(unittest.TestCase):
@@ -83,17 +163,25 @@ class TestStoragePostgres(unittest.TestCase):
         self.assertIs(conn, self.mock_conn)
 
     def test_init_db_executes_postgres_ddl(self):
+        # Fresh database: no schema version, no columns, no rows to convert
+        self.mock_cursor.fetchone.return_value = None
+        self.mock_cursor.fetchall.return_value = []
+
         storage.init_db(self.mock_conn)
 
-        # Grab the SQL string passed to execute
-        self.mock_cursor.execute.assert_called_once()
-        ddl_sql = self.mock_cursor.execute.call_args[0][0]
-        self.assertIn("CREATE TABLE IF NOT EXISTS pg_table", ddl_sql)
+        # Grab the SQL strings passed to execute
+        statements = [c[0][0] for c in self.mock_cursor.execute.call_args_list]
+        ddl_sql = next(s for s in statements if "CREATE TABLE IF NOT EXISTS pg_table" in s)
         self.assertIn("SERIAL PRIMARY KEY", ddl_sql)
         self.assertIn("mbb_price       REAL", ddl_sql)
+        self.assertTrue(any(
+            f"CREATE TABLE IF NOT EXISTS {storage.QUOTES_TABLE}" in s for s in statements
+        ))
+        self.assertIn("ALTER TABLE pg_table ADD COLUMN ts TIMESTAMPTZ", statements)
+        self.assertTrue(any("CREATE INDEX IF NOT EXISTS idx_pg_table_ts" in s for s in statements))
 
-        # Ensure commit
-        self.mock_conn.commit.assert_called_once()
+        # Ensure changes are committed
+        self.mock_conn.commit.assert_called()
 
     def test_update_table_uses_placeholder_and_params(self):
         timestamp = "2025-09-05T01:02:03Z"
@@ -106,14 +194,127 @@ class TestStoragePostgres(unittest.TestCase):
         self.mock_conn.cursor.assert_called_once()
         sql, params = self.mock_cursor.execute.call_args[0]
         self.assertIn("INSERT INTO pg_table", sql)
-        # three %s placeholders
-        self.assertEqual(sql.count("%s"), 3)
-        # Correct param tuple
-        self.assertEqual(params, (timestamp, mortgage_rate, mbb_price))
+        # five %s placeholders: text and typed timestamps, source and values
+        self.assertEqual(sql.count("%s"), 5)
+        # Correct param tuple; the typed timestamp is an aware datetime
+        expected_ts = datetime(2025, 9, 5, 1, 2, 3, tzinfo=timezone.utc)
+        self.assertEqual(
+            params, ("2025-09-05 01:02:03", expected_ts, "mnd", mortgage_rate, mbb_price)
+        )
 
         # Ensure commit after insert
         self.mock_conn.commit.assert_called_once()
 
+    def test_bulk_insert_streams_rows_with_copy(self):
+        copy = self.mock_cursor.copy.return_value.__enter__.return_value
+        rows = [("2025-01-01 00:00:00", 6.0, 90.0), ("2025-01-02 00:00:00", None, 91.0)]
+
+        inserted = storage.bulk_insert(self.mock_conn, rows, source="backfill")
+
+        self.assertEqual(inserted, 2)
+        copy_sql = self.mock_cursor.copy.call_args[0][0]
+        self.assertIn("COPY rates_stage", copy_sql)
+        self.assertIn("FROM STDIN", copy_sql)
+        self.assertEqual(copy.write_row.call_count, 2)
+        # The staged rows are upserted into the rates table
+        upsert_sql = self.mock_cursor.execute.call_args[0][0]
+        self.assertIn("INSERT INTO pg_table", upsert_sql)
+        self.assertIn("ON CONFLICT (ts, source) DO UPDATE", upsert_sql)
+        self.mock_conn.commit.assert_called_once()
+
+    def test_update_quotes_batches_rows_in_one_commit(self):
+        storage.update_quotes(self.mock_conn, "2025-09-05T01:02:03Z", {"MBB": 1.0, "TLT": 2.0})
+
+        sql, rows = self.mock_cursor.executemany.call_args[0]
+        self.assertIn(f"INSERT INTO {storage.QUOTES_TABLE}", sql)
+        self.assertEqual(sql.count("%s"), 4)
+        self.assertEqual(len(rows), 2)
+        self.mock_conn.commit.assert_called_once()
+
+
+class TestStorageEngineSQLite(unittest.TestCase):
+    def setUp(self):
+        storage.USE_POSTGRES = False
+        storage.TABLE_NAME = "test_table"
+        self.tmpdir = tempfile.TemporaryDirectory()
+        storage.SQLITE_FILE = os.path.join(self.tmpdir.name, "engine.sqlite3")
+
+    def tearDown(self):
+        storage.close_connections()
+        self.tmpdir.cleanup()
+
+    def test_connection_is_persistent_across_borrows(self):
+        with storage.connection() as first:
+            pass
+        with storage.connection() as second:
+            pass
+        self.assertIs(first, second)
+
+    def test_connection_is_tuned(self):
+        with storage.connection() as conn:
+            journal = conn.execute("PRAGMA journal_mode").fetchone()[0]
+            synchronous = conn.execute("PRAGMA synchronous").fetchone()[0]
+        self.assertEqual(journal, "wal")
+        # 1 == NORMAL
+        self.assertEqual(synchronous, 1)
+
+    def test_connection_usable_from_other_threads(self):
+        with storage.connection() as conn:
+            storage.init_db(conn)
+
+        def write():
+            with storage.connection() as conn:
+                storage.update_table(conn, "2025-09-04 06:40:00", 6.1, 95.0)
+
+        worker = threading.Thread(target=write)
+        worker.start()
+        worker.join()
+
+        with storage.connection() as conn:
+            count = conn.execute(f"SELECT COUNT(*) FROM {storage.TABLE_NAME}").fetchone()[0]
+        self.assertEqual(count, 1)
+
+    def test_close_connections_closes_sqlite(self):
+        with storage.connection() as conn:
+            pass
+        storage.close_connections()
+        with self.assertRaises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+
+
+class TestStorageEnginePostgres(unittest.TestCase):
+    def setUp(self):
+        storage.USE_POSTGRES = True
+        storage.POSTGRES_VARS = {"host": "localhost", "port": 5432}
+        self.patcher = patch("src.storage.ConnectionPool")
+        self.mock_pool_cls = self.patcher.start()
+
+    def tearDown(self):
+        storage.close_connections()
+        self.patcher.stop()
+
+    def test_pool_is_created_once_and_lends_connections(self):
+        pool = self.mock_pool_cls.return_value
+        pool.connection.return_value.__enter__.return_value = "pg_conn"
+
+        with storage.connection() as first:
+            pass
+        with storage.connection() as second:
+            pass
+
+        self.mock_pool_cls.assert_called_once()
+        kwargs = self.mock_pool_cls.call_args.kwargs
+        self.assertEqual(kwargs["kwargs"], storage.POSTGRES_VARS)
+        self.assertEqual(kwargs["max_size"], storage.PG_POOL_MAX)
+        self.assertEqual(first, "pg_conn")
+        self.assertEqual(pool.connection.call_count, 2)
+
+    def test_close_connections_closes_pool(self):
+        with storage.connection():
+            pass
+        storage.close_connections()
+        self.mock_pool_cls.return_value.close.assert_called_once()
+
 
 if __name__ == "__main__":
     unittest.main()
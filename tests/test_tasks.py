@@ -1,11 +1,27 @@
+import os
+import tempfile
+import time
 import unittest
-from datetime import datetime as real_datetime
+from contextlib import contextmanager
+from datetime import datetime as real_datetime, timezone
 from unittest.mock import patch
 import requests
 
 import tasks
 
 
+# Keep the fetch lock file out of the working tree
+def setUpModule():
+    global _lock_dir, _lock_file
+    _lock_dir = tempfile.TemporaryDirectory()
+    _lock_file = patch('tasks.FETCH_LOCK_FILE', os.path.join(_lock_dir.name, 'fetch.lock'))
+    _lock_file.start()
+
+def tearDownModule():
+    _lock_file.stop()
+    _lock_dir.cleanup()
+
+
 # A fake database connection that lets us verify close() was called
 class DummyConn:
     def __init__(self):
@@ -15,19 +31,39 @@ class DummyConn:
         self.closed = True
 
 
-# A fake HTTP response that tracks whether raise_for_status() was invoked
-class DummyResponse:
-    def __init__(self, status_code=200, raise_exc=None):
-        self.status_code = status_code
-        # If raise_exc is set, raise it when raise_for_status() is called
-        self._raise_exc = raise_exc
-        self.raise_called = False
+# Stand-in for storage.connection() that hands out a DummyConn and "returns" it on exit
+def dummy_connection(conn):
+    @contextmanager
+    def _connection():
+        yield conn
+        conn.close()
+    return _connection
+
+
+# Stand-in for a src.rates.RateProvider that returns a fixed rate or raises
+class StubProvider:
+    def __init__(self, name="mnd", rate=4.2, error=None, fresh=True, delay=0):
+        self.name = name
+        self.url = f"https://{name}.example/"
+        self.rate = rate
+        self.error = error
+        self.fresh = fresh
+        self.delay = delay
+        self.calls = []
 
-    def raise_for_status(self):
-        self.raise_called = True
-        if self._raise_exc:
-            # Simulate HTTP errors
-            raise self._raise_exc
+    def fetch(self, budget=None, deadline=None, stages=None):
+        self.calls.append({"budget": budget, "deadline": deadline})
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        if stages is not None and self.fresh:
+            stages["ping"] = stages["scrape"] = 0.0
+        return self.rate, self.fresh
+
+
+# Patches the configured rate providers (one default StubProvider when none given)
+def rate_providers(*providers):
+    return patch('tasks.get_rate_providers', return_value=list(providers) or [StubProvider()])
 
 
 class TestTasks(unittest.TestCase):
@@ -35,108 +71,409 @@ class TestTasks(unittest.TestCase):
     Test suite for tasks.initialize_db() and tasks.fetch_and_store_data()
     """
 
-    def test_initialize_db_calls_init_and_closes(self):
+    def setUp(self):
+        # Job runs are recorded in the database; keep that out of these tests
+        patcher = patch('tasks.store_job_run')
+        self.mock_store_job_run = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch('tasks.spool_provider_rates')
+        self.mock_spool_provider_rates = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_initialize_db_calls_init_and_releases(self):
         # Prepare a dummy connection and spy on init_db
         dummy_conn = DummyConn()
 
-        # Patch get_connection() to return our dummy, and init_db() to a mock
-        with patch('tasks.get_connection', return_value=dummy_conn), \
+        # Patch connection() to hand out our dummy, and init_db() to a mock
+        with patch('tasks.connection', dummy_connection(dummy_conn)), \
              patch('tasks.init_db') as mock_init_db:
             # Call the function under test
             tasks.initialize_db()
 
         # Verify init_db was called with our dummy connection
         mock_init_db.assert_called_once_with(dummy_conn)
-        # And ensure that close() was called on the connection
+        # And ensure that the connection was returned to the engine
         self.assertTrue(dummy_conn.closed)
 
     def test_fetch_and_store_data_on_request_failure(self):
-        # Simulate requests.get() throwing a network error
-        # Stub out extraction and price functions (should never run)
-        # Provide a dummy DB connection and spy on update_table()
-        with patch('tasks.requests.get',
-                   side_effect=requests.RequestException("network error")), \
-             patch('tasks.extract_30yr_rate', return_value=1.0), \
-             patch('tasks.get_stock_price', return_value=2.0), \
-             patch('tasks.get_connection', return_value=DummyConn()), \
-             patch('tasks.update_table') as mock_update_table:
-
-            # Running fetch_and_store_data() should catch the exception and return None
+        # Simulate the rate provider throwing a network error
+        # Spy on the spool writers
+        with rate_providers(StubProvider(error=requests.RequestException("network error"))), \
+             patch('tasks.get_quotes', return_value={'MBB': 2.0}), \
+             patch('tasks.spool_quotes') as mock_spool_quotes, \
+             patch('tasks.spool_rate') as mock_spool_rate:
+
+            # Running fetch_and_store_data() should catch the exception and report failure
             result = tasks.fetch_and_store_data()
 
-        self.assertIsNone(result)
-        # Because HTTP failed, we never call update_table()
-        mock_update_table.assert_not_called()
+        self.assertFalse(result)
+        # Because HTTP failed, we never queue a rates row
+        mock_spool_rate.assert_not_called()
 
     def test_fetch_and_store_data_on_extraction_error(self):
         # Simulate a successful HTTP ping
-        dummy_resp = DummyResponse()
-        # Now extract_30yr_rate() throws, so mortgage_rate becomes None
+        # The provider finds no rate, so mortgage_rate becomes None
         # Stock price still succeeds
-        with patch('tasks.requests.get', return_value=dummy_resp), \
-             patch('tasks.extract_30yr_rate', side_effect=ValueError("no rate")), \
-             patch('tasks.get_stock_price', return_value=100.0), \
-             patch('tasks.get_connection', return_value=DummyConn()), \
-             patch('tasks.update_table') as mock_update_table:
+        with rate_providers(StubProvider(error=ValueError("no rate"))), \
+             patch('tasks.get_quotes', return_value={'MBB': 100.0}), \
+             patch('tasks.spool_quotes') as mock_spool_quotes, \
+             patch('tasks.spool_rate') as mock_spool_rate:
 
             tasks.fetch_and_store_data()
 
-        # On extraction error, we skip persisting data
-        mock_update_table.assert_not_called()
+        # On extraction error, we skip the rate row but keep the quotes
+        mock_spool_rate.assert_not_called()
+        mock_spool_quotes.assert_called_once()
 
     def test_fetch_and_store_data_on_stock_error(self):
-        # Simulate a successful HTTP ping
-        dummy_resp = DummyResponse()
         # Mortgage extraction succeeds
         # Stock fetch throws, so stock_price becomes None
-        with patch('tasks.requests.get', return_value=dummy_resp), \
-             patch('tasks.extract_30yr_rate', return_value=3.5), \
-             patch('tasks.get_stock_price', side_effect=RuntimeError("bad ticker")), \
-             patch('tasks.get_connection', return_value=DummyConn()), \
-             patch('tasks.update_table') as mock_update_table:
+        with rate_providers(StubProvider(rate=3.5)), \
+             patch('tasks.get_quotes', side_effect=RuntimeError("bad ticker")), \
+             patch('tasks.spool_quotes') as mock_spool_quotes, \
+             patch('tasks.spool_rate') as mock_spool_rate:
 
             tasks.fetch_and_store_data()
 
         # On stock fetch error, we skip persisting data
-        mock_update_table.assert_not_called()
+        mock_spool_rate.assert_not_called()
+        mock_spool_quotes.assert_not_called()
+
+    def test_fetch_and_store_data_slow_quote_hits_deadline(self):
+        # A stalled quote source must not hold the job past its deadline
+        with patch('tasks.JOB_DEADLINE', 0.1), \
+             rate_providers(StubProvider(rate=3.5)), \
+             patch('tasks.get_quotes', side_effect=lambda t, **kwargs: time.sleep(1)), \
+             patch('tasks.spool_quotes') as mock_spool_quotes, \
+             patch('tasks.spool_rate') as mock_spool_rate, \
+             self.assertLogs('tasks', level='INFO') as logs:
+
+            start = time.monotonic()
+            tasks.fetch_and_store_data()
+            elapsed = time.monotonic() - start
+
+        self.assertLess(elapsed, 0.5)
+        mock_spool_rate.assert_not_called()
+        # The source that finished in time is still reported
+        self.assertTrue(any("3.5%" in line for line in logs.output))
+        self.assertTrue(any("Source quote failed" in line for line in logs.output))
 
     def test_fetch_and_store_data_success(self):
         # Freeze datetime.now() so we can predict the timestamp string
-        fixed_dt = real_datetime(2021, 5, 6, 7, 8, 9)
+        fixed_dt = real_datetime(2021, 5, 6, 15, 8, 9, tzinfo=timezone.utc)
 
         class DummyDateTime(real_datetime):
             @classmethod
             def now(cls, tz=None):
                 return fixed_dt
 
-        # Prepare dummy HTTP response and DB connection
-        dummy_resp = DummyResponse()
-        dummy_conn = DummyConn()
-
-        # HTTP ping returns OK
         # Mortgage and stock fetches succeed
-        # Provide our dummy connection and spy on update_table()
+        # Spy on the spool writers
         with patch('tasks.datetime', DummyDateTime), \
-             patch('tasks.requests.get', return_value=dummy_resp), \
-             patch('tasks.extract_30yr_rate', return_value=4.2), \
-             patch('tasks.get_stock_price', return_value=123.45), \
-             patch('tasks.get_connection', return_value=dummy_conn), \
-             patch('tasks.update_table') as mock_update_table:
+             rate_providers(StubProvider(rate=4.2)) as mock_providers, \
+             patch('tasks.get_quotes', return_value={'MBB': 123.45, 'TLT': 88.0}), \
+             patch('tasks.spool_quotes') as mock_spool_quotes, \
+             patch('tasks.spool_rate') as mock_spool_rate:
+
+            result = tasks.fetch_and_store_data()
+
+        self.assertTrue(result)
+        # The page is downloaded once and the same response is parsed
+        # Every configured provider is asked once
+        provider = mock_providers.return_value[0]
+        self.assertEqual(len(provider.calls), 1)
+
+        # Samples are stored under the day's 6:40 AM slot in Los Angeles
+        expected_ts = "2021-05-06T13:40:00+00:00"
+
+        # Verify the rates row was queued with the right parameters
+        mock_spool_rate.assert_called_once_with(expected_ts, 4.2, 123.45, source="mnd")
+        # Every fetched symbol is queued for the long-format quotes table
+        mock_spool_quotes.assert_called_once_with(
+            expected_ts, {'MBB': 123.45, 'TLT': 88.0}
+        )
+
+    def test_sources_share_one_retry_budget(self):
+        with rate_providers(StubProvider(rate=4.2)) as mock_providers, \
+             patch('tasks.get_quotes', return_value={'MBB': 123.45}) as mock_prices, \
+             patch('tasks.spool_quotes'), \
+             patch('tasks.spool_rate'):
+
+            tasks.fetch_and_store_data()
+
+        page_budget = mock_providers.return_value[0].calls[0]["budget"]
+        self.assertIs(page_budget, mock_prices.call_args.kwargs["budget"])
+        self.assertEqual(page_budget.remaining, tasks.JOB_RETRY_BUDGET)
+
+    def test_fetch_and_store_data_survives_spool_failure(self):
+        # A failing write is logged instead of escaping the scheduled job
+        with rate_providers(StubProvider(rate=4.2)), \
+             patch('tasks.get_quotes', return_value={'MBB': 123.45}), \
+             patch('tasks.spool_quotes', side_effect=OSError("disk full")), \
+             patch('tasks.spool_rate') as mock_spool_rate, \
+             self.assertLogs('tasks', level='ERROR'):
+
+            tasks.fetch_and_store_data()
+
+        mock_spool_rate.assert_not_called()
+
+    def test_job_run_is_recorded_with_stage_timings(self):
+        with rate_providers(StubProvider(rate=4.2)) as mock_providers, \
+             patch('tasks.get_quotes', return_value={'MBB': 123.45}), \
+             patch('tasks.spool_quotes'), \
+             patch('tasks.spool_rate'):
+
+            tasks.fetch_and_store_data()
+
+        started, job, success, duration, stages, error = self.mock_store_job_run.call_args[0]
+        self.assertEqual(job, "daily")
+        self.assertTrue(success)
+        self.assertEqual(set(stages), {"ping", "scrape", "quote", "persist", "alert"})
+        self.assertGreaterEqual(duration, max(stages.values()))
+        self.assertIsNone(error)
+
+    def test_failed_job_run_records_the_error(self):
+        with rate_providers(StubProvider(error=requests.ConnectionError("refused"))), \
+             patch('tasks.get_quotes', return_value={}), \
+             patch('src.retry.time.sleep'):
 
             tasks.fetch_and_store_data()
 
-        # Ensure we actually called raise_for_status() on the response
-        self.assertTrue(dummy_resp.raise_called)
+        _, _, success, _, stages, error = self.mock_store_job_run.call_args[0]
+        self.assertFalse(success)
+        self.assertIn("rate:mnd: refused", error)
+        self.assertNotIn("scrape", stages)
+
+
+class TestStoreJobRun(unittest.TestCase):
+    """
+    Test suite for store_job_run()
+    """
+
+    @patch('tasks.connection', side_effect=AssertionError("job runs must not wait for the database"))
+    @patch('tasks.spool_job_run')
+    def test_job_run_is_spooled(self, mock_spool_job_run, mock_connection):
+        started = real_datetime(2025, 9, 1, 13, 40, tzinfo=timezone.utc)
+        tasks.store_job_run(started, "poll", True, 0.5, {"scrape": 0.25})
 
-        # Build the timestamp string we expect from our frozen datetime
-        expected_ts = fixed_dt.strftime("%Y-%m-%d %H:%M:%S")
+        mock_spool_job_run.assert_called_once_with(started, "poll", True, 0.5, {"scrape": 0.25}, None)
 
-        # Verify update_table() got called with the right parameters
-        mock_update_table.assert_called_once_with(
-            dummy_conn, expected_ts, 4.2, 123.45
+
+class TestRateProviders(unittest.TestCase):
+    """
+    Test suite for the consensus of several rate providers in fetch_and_store_data()
+    """
+
+    def setUp(self):
+        patcher = patch('tasks.store_job_run')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _run(self, *providers):
+        with rate_providers(*providers), \
+             patch('tasks.get_quotes', return_value={'MBB': 95.0}), \
+             patch('tasks.spool_quotes'), \
+             patch('tasks.spool_provider_rates') as mock_spool_provider_rates, \
+             patch('tasks.spool_rate') as mock_spool_rate:
+            result = tasks.fetch_and_store_data()
+        return result, mock_spool_rate, mock_spool_provider_rates
+
+    def test_rate_comes_from_the_primary_provider(self):
+        result, mock_spool_rate, mock_spool_provider_rates = self._run(
+            StubProvider("mnd", 6.3), StubProvider("freddiemac", 6.35), StubProvider("other", 6.9)
         )
-        # And ensure the connection was closed at the end
-        self.assertTrue(dummy_conn.closed)
+
+        self.assertTrue(result)
+        self.assertEqual(mock_spool_rate.call_args[0][1:], (6.3, 95.0))
+        self.assertEqual(mock_spool_rate.call_args.kwargs, {"source": "mnd"})
+        # Each provider's own value and their median are stored as provider rates
+        self.assertEqual(
+            mock_spool_provider_rates.call_args[0][1],
+            {"mnd": 6.3, "freddiemac": 6.35, "other": 6.9, "consensus": 6.35}
+        )
+
+    def test_failed_primary_falls_back_to_the_next_provider(self):
+        with self.assertLogs('tasks', level='WARNING') as logs:
+            result, mock_spool_rate, mock_spool_provider_rates = self._run(
+                StubProvider("mnd", error=requests.ConnectionError("refused")),
+                StubProvider("freddiemac", 6.35),
+                StubProvider("other", 6.9),
+            )
+
+        self.assertTrue(result)
+        self.assertEqual(mock_spool_rate.call_args[0][1], 6.35)
+        self.assertEqual(mock_spool_rate.call_args.kwargs, {"source": "freddiemac"})
+        self.assertTrue(any("freddiemac rate while mnd" in line for line in logs.output))
+        self.assertEqual(
+            mock_spool_provider_rates.call_args[0][1],
+            {"freddiemac": 6.35, "other": 6.9, "consensus": 6.625}
+        )
+
+    def test_no_rates_row_when_every_provider_fails(self):
+        result, mock_spool_rate, _ = self._run(
+            StubProvider("mnd", error=requests.ConnectionError("refused")),
+            StubProvider("freddiemac", error=requests.ConnectionError("refused")),
+        )
+
+        self.assertFalse(result)
+        mock_spool_rate.assert_not_called()
+
+    @patch('tasks.RATE_CONSENSUS', True)
+    def test_consensus_rate_is_the_median_of_the_providers(self):
+        result, mock_spool_rate, _ = self._run(
+            StubProvider("mnd", 6.3), StubProvider("freddiemac", 6.35), StubProvider("other", 6.9)
+        )
+
+        self.assertTrue(result)
+        self.assertEqual(mock_spool_rate.call_args[0][1:], (6.35, 95.0))
+        self.assertEqual(mock_spool_rate.call_args.kwargs, {"source": "consensus"})
+
+    @patch('tasks.RATE_CONSENSUS', True)
+    def test_consensus_survives_a_failed_provider(self):
+        result, mock_spool_rate, mock_spool_provider_rates = self._run(
+            StubProvider("mnd", error=requests.ConnectionError("refused")),
+            StubProvider("freddiemac", 6.35),
+        )
+
+        self.assertTrue(result)
+        self.assertEqual(mock_spool_rate.call_args[0][1], 6.35)
+        self.assertEqual(mock_spool_rate.call_args.kwargs, {"source": "freddiemac"})
+        self.assertEqual(mock_spool_provider_rates.call_args[0][1], {"freddiemac": 6.35})
+
+    def test_slow_provider_does_not_delay_the_job(self):
+        with patch('tasks.MORTGAGE_TIMEOUT', 0.1):
+            start = time.monotonic()
+            result, mock_spool_rate, _ = self._run(
+                StubProvider("mnd", 6.3), StubProvider("freddiemac", 6.35, delay=1)
+            )
+            elapsed = time.monotonic() - start
+
+        self.assertLess(elapsed, 0.5)
+        self.assertTrue(result)
+        self.assertEqual(mock_spool_rate.call_args[0][1], 6.3)
+
+    def test_cached_rate_counts_but_is_not_stored_again(self):
+        _, mock_spool_rate, mock_spool_provider_rates = self._run(
+            StubProvider("mnd", 6.3), StubProvider("freddiemac", 6.4, fresh=False)
+        )
+
+        self.assertEqual(mock_spool_rate.call_args[0][1], 6.3)
+        provider_rates = mock_spool_provider_rates.call_args[0][1]
+        self.assertEqual(list(provider_rates), ["mnd", "consensus"])
+        self.assertAlmostEqual(provider_rates["consensus"], 6.35)
+
+
+class TestChangeDetection(unittest.TestCase):
+    """
+    Test suite for fetch_and_store_data(only_changes=True)
+    """
+
+    def setUp(self):
+        tasks._last_stored = None
+        patcher = patch('tasks.store_job_run')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch('tasks.spool_provider_rates')
+        self.mock_spool_provider_rates = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        tasks._last_stored = None
+
+    def _poll(self, rate, prices):
+        with rate_providers(StubProvider(rate=rate)), \
+             patch('tasks.get_quotes', return_value=prices), \
+             patch('tasks.spool_quotes') as mock_spool_quotes, \
+             patch('tasks.spool_rate') as mock_spool_rate:
+            result = tasks.fetch_and_store_data(only_changes=True)
+        return result, mock_spool_rate, mock_spool_quotes
+
+    @patch('tasks.queries.latest_quotes', return_value={'MBB': 95.0, 'TLT': 88.0})
+    @patch('tasks.queries.latest', return_value={'mortgage_rate': 6.3, 'mbb_price': 95.0})
+    def test_unchanged_values_are_not_written(self, mock_latest, mock_quotes):
+        result, mock_spool_rate, mock_spool_quotes = self._poll(6.3, {'MBB': 95.0, 'TLT': 88.0})
+
+        self.assertTrue(result)
+        mock_spool_rate.assert_not_called()
+        mock_spool_quotes.assert_not_called()
+
+    @patch('tasks.queries.latest_quotes', return_value={'MBB': 95.0, 'TLT': 88.0})
+    @patch('tasks.queries.latest', return_value={'mortgage_rate': 6.3, 'mbb_price': 95.0})
+    def test_only_moved_values_are_written(self, mock_latest, mock_quotes):
+        result, mock_spool_rate, mock_spool_quotes = self._poll(6.3, {'MBB': 95.2, 'TLT': 88.0})
+
+        mock_spool_quotes.assert_called_once()
+        self.assertEqual(mock_spool_quotes.call_args[0][1], {'MBB': 95.2})
+        self.assertEqual(mock_spool_rate.call_args[0][1:], (6.3, 95.2))
+
+        # The seeded state follows what was queued, so the next identical poll is quiet
+        _, mock_spool_rate, mock_spool_quotes = self._poll(6.3, {'MBB': 95.2, 'TLT': 88.0})
+        mock_spool_rate.assert_not_called()
+        mock_spool_quotes.assert_not_called()
+        mock_latest.assert_called_once()
+
+    @patch('tasks.queries.latest_quotes', return_value={'MBB': 95.0})
+    @patch('tasks.queries.latest', return_value={'mortgage_rate': 6.3, 'mbb_price': 95.0})
+    def test_provider_rates_are_written_once_until_they_move(self, mock_latest, mock_quotes):
+        self._poll(6.3, {'MBB': 95.0})
+        self.mock_spool_provider_rates.assert_called_once()
+        self.assertEqual(self.mock_spool_provider_rates.call_args[0][1], {'mnd': 6.3})
+
+        self._poll(6.3, {'MBB': 95.0})
+        self.mock_spool_provider_rates.assert_called_once()
+
+    def test_poll_is_skipped_while_another_fetch_runs(self):
+        with tasks.fetch_lock(), self.assertLogs('tasks', level='INFO') as logs:
+            result, mock_spool_rate, mock_spool_quotes = self._poll(6.3, {'MBB': 95.0})
+
+        self.assertIsNone(result)
+        mock_spool_rate.assert_not_called()
+        self.assertTrue(any("Skipping poll" in line for line in logs.output))
+
+    @patch('tasks.queries.latest', side_effect=RuntimeError("database down"))
+    def test_unreadable_database_stores_everything(self, mock_latest):
+        with self.assertLogs('tasks', level='WARNING'):
+            _, mock_spool_rate, mock_spool_quotes = self._poll(6.3, {'MBB': 95.0})
+
+        mock_spool_rate.assert_called_once()
+        mock_spool_quotes.assert_called_once()
+
+
+def frozen_now(moment):
+    class DummyDateTime(real_datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return moment
+    return patch('tasks.datetime', DummyDateTime)
+
+
+class TestSampleTime(unittest.TestCase):
+
+    def _slot(self, moment, only_changes=False):
+        with frozen_now(moment):
+            return tasks.sample_time(only_changes).isoformat()
+
+    def test_daily_runs_and_follow_ups_share_the_day_slot(self):
+        daily = self._slot(real_datetime(2025, 11, 3, 14, 40, 2, tzinfo=timezone.utc))
+        follow_up = self._slot(real_datetime(2025, 11, 3, 15, 10, 30, tzinfo=timezone.utc))
+
+        self.assertEqual(daily, "2025-11-03T14:40:00+00:00")
+        self.assertEqual(follow_up, daily)
+        # Before 6:40 AM a run belongs to the previous day's slot
+        self.assertEqual(
+            self._slot(real_datetime(2025, 11, 3, 13, 0, tzinfo=timezone.utc)),
+            "2025-11-02T14:40:00+00:00"
+        )
+
+    @patch('tasks.POLL_INTERVAL', 15)
+    def test_polls_use_the_interval_slot(self):
+        first = self._slot(real_datetime(2025, 11, 3, 16, 30, 1, tzinfo=timezone.utc), True)
+        late = self._slot(real_datetime(2025, 11, 3, 16, 44, 59, tzinfo=timezone.utc), True)
+        next_slot = self._slot(real_datetime(2025, 11, 3, 16, 45, 0, tzinfo=timezone.utc), True)
+
+        self.assertEqual(first, "2025-11-03T16:30:00+00:00")
+        self.assertEqual(late, first)
+        self.assertEqual(next_slot, "2025-11-03T16:45:00+00:00")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,138 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+
+import scheduler
+import tasks
+import src.metrics as metrics
+import src.retry as retry
+import src.workers as workers
+
+
+# Jobs below run in spawned workers, so they live at module level where pickle finds them
+
+def scrape_job(value):
+    with metrics.timed("scrape"):
+        pass
+    metrics.observe("job", 0.5)
+    return value, os.getpid()
+
+def failing_job():
+    with metrics.timed("persist"):
+        raise RuntimeError("database is locked")
+
+def worker_pid():
+    return os.getpid()
+
+def open_breaker():
+    breaker = retry.get_breaker("mnd")
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    return os.getpid()
+
+def poll_lock_taken(lock_file):
+    tasks.FETCH_LOCK_FILE = lock_file
+    with tasks.fetch_lock(blocking=False) as locked:
+        return not locked
+
+def breaker_state():
+    return retry.get_breaker("mnd").state, os.getpid()
+
+
+class TestWorkerPool(unittest.TestCase):
+
+    def setUp(self):
+        metrics.reset()
+        self.pool = workers.WorkerPool(max_workers=1, max_tasks_per_child=1)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_result_and_timings_come_back(self):
+        value, pid = self.pool.run(scrape_job, 42)
+
+        self.assertEqual(value, 42)
+        self.assertNotEqual(pid, os.getpid())
+        text = metrics.render()
+        self.assertIn('mortgage_monitor_stage_runs_total{stage="scrape",result="success"} 1', text)
+        self.assertIn('mortgage_monitor_stage_duration_seconds_sum{stage="job"} 0.5', text)
+        self.assertIsNotNone(metrics.last_success())
+
+    def test_errors_are_raised_after_replaying_timings(self):
+        with self.assertRaises(RuntimeError) as raised:
+            self.pool.run(failing_job)
+
+        self.assertIn("failing_job", "".join(raised.exception.__notes__))
+        self.assertIn(
+            'mortgage_monitor_stage_runs_total{stage="persist",result="failure"} 1',
+            metrics.render()
+        )
+
+    def test_workers_are_replaced_after_max_tasks(self):
+        self.assertNotEqual(self.pool.run(worker_pid), self.pool.run(worker_pid))
+
+        reused = workers.WorkerPool(max_workers=1, max_tasks_per_child=0)
+        try:
+            self.assertEqual(reused.run(worker_pid), reused.run(worker_pid))
+        finally:
+            reused.shutdown()
+
+    def test_job_state_outlives_replaced_workers(self):
+        first = self.pool.run(open_breaker)
+        state, second = self.pool.run(breaker_state)
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(state, "open")
+
+    def test_fetch_lock_holds_across_processes(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            lock_file = os.path.join(tmpdir, "fetch.lock")
+            with patch("tasks.FETCH_LOCK_FILE", lock_file):
+                with tasks.fetch_lock():
+                    self.assertTrue(self.pool.run(poll_lock_taken, lock_file))
+                self.assertFalse(self.pool.run(poll_lock_taken, lock_file))
+
+
+class TestIsolatedExecutor(unittest.TestCase):
+
+    def test_job_events_carry_the_worker_result(self):
+        sched = MagicMock()
+        executor = workers.IsolatedExecutor(max_workers=1)
+        executor.start(sched, "default")
+        job = MagicMock(
+            id="daily_fetch_and_store", func=worker_pid, args=(), kwargs={},
+            max_instances=1, misfire_grace_time=None, _jobstore_alias="default",
+        )
+
+        executor.submit_job(job, [datetime.now(timezone.utc)])
+        executor.shutdown()
+
+        event = sched._dispatch_event.call_args.args[0]
+        self.assertEqual(event.job_id, "daily_fetch_and_store")
+        self.assertIsInstance(event.retval, int)
+        self.assertNotEqual(event.retval, os.getpid())
+
+    def test_workers_are_replaced_after_every_job_by_default(self):
+        executor = workers.IsolatedExecutor()
+        try:
+            self.assertEqual(executor.workers.max_workers, 1)
+            self.assertNotEqual(executor.workers.run(worker_pid), executor.workers.run(worker_pid))
+        finally:
+            executor.workers.shutdown()
+
+    def test_create_executor_follows_job_isolation(self):
+        with patch("scheduler.JOB_ISOLATION", "process"):
+            executor = scheduler.create_executor()
+        self.assertIsInstance(executor, workers.IsolatedExecutor)
+        executor.shutdown()
+        with patch("scheduler.JOB_ISOLATION", "fork"):
+            with self.assertRaises(ValueError):
+                scheduler.create_executor()
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# Created by AI